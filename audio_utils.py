@@ -0,0 +1,448 @@
+"""
+Outils audio pour Emanet Subtitle Translator
+Décodage, analyse d'énergie et découpage de l'audio (tableaux NumPy mono float32)
+"""
+
+import bisect
+import hashlib
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+def decode_audio(source, sample_rate=16000, raw_path=None):
+    """Décode un fichier média en mono float32 à sample_rate Hz, en un seul passage ffmpeg
+
+    Sans raw_path, l'audio est lu directement en mémoire. Avec raw_path, il
+    est écrit brut sur disque puis projeté en mémoire (np.memmap), ce qui
+    évite de garder un long épisode entièrement en RAM.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-threads", "0",
+        "-i", str(source),
+        "-ac", "1", "-ar", str(sample_rate), "-f", "f32le",
+    ]
+    try:
+        if raw_path is None:
+            out = subprocess.run(cmd + ["-"], capture_output=True, check=True).stdout
+            # Copie modifiable (torch refuse les tampons en lecture seule)
+            return np.frombuffer(out, np.float32).copy()
+        subprocess.run(cmd + ["-y", str(raw_path)], capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Échec du décodage audio : {e.stderr.decode(errors='replace').strip()}") from e
+
+    # Copie à l'écriture : le tableau est modifiable sans toucher au fichier
+    return np.memmap(raw_path, dtype=np.float32, mode="c")
+
+
+def audio_sha256(audio):
+    """Empreinte SHA-256 des échantillons (identique quel que soit le conteneur d'origine)"""
+    digest = hashlib.sha256()
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    step = 1 << 20
+    for start in range(0, len(audio), step):
+        digest.update(audio[start:start + step].tobytes())
+    return digest.hexdigest()
+
+
+def frame_energy(audio, sample_rate, frame_seconds=0.03):
+    """Énergie RMS de chaque trame de frame_seconds secondes"""
+    frame = max(1, int(frame_seconds * sample_rate))
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = np.asarray(audio[:count * frame], dtype=np.float32).reshape(count, frame)
+    return np.sqrt(np.mean(frames ** 2, axis=1)), frame
+
+
+def find_silence_cuts(audio, sample_rate, num_shards, search_seconds=10.0, smooth_seconds=0.3):
+    """Positions (en échantillons) où couper l'audio en num_shards morceaux
+
+    Chaque coupe est placée au point le plus silencieux (énergie lissée) à
+    moins de search_seconds de la coupe régulière, pour ne pas couper un mot.
+    """
+    if num_shards <= 1 or len(audio) == 0:
+        return []
+
+    energy, frame = frame_energy(audio, sample_rate)
+    if len(energy) == 0:
+        return []
+
+    smooth = max(1, int(smooth_seconds * sample_rate / frame))
+    energy = np.convolve(energy, np.ones(smooth) / smooth, mode="same")
+    search = int(search_seconds * sample_rate / frame)
+
+    cuts = []
+    for k in range(1, num_shards):
+        target = k * len(energy) // num_shards
+        low = max(0, target - search)
+        high = min(len(energy), target + search + 1)
+        best = low + int(np.argmin(energy[low:high]))
+        cut = best * frame + frame // 2
+        if (not cuts or cut > cuts[-1]) and 0 < cut < len(audio):
+            cuts.append(cut)
+    return cuts
+
+
+def split_at_silences(audio, sample_rate, num_shards, search_seconds=10.0):
+    """Découpe l'audio en morceaux aux silences : liste de (décalage en échantillons, tableau)"""
+    bounds = [0] + find_silence_cuts(audio, sample_rate, num_shards, search_seconds) + [len(audio)]
+    return [(start, audio[start:end]) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _frame_features(frames, sample_rate):
+    """Énergie (dB), part de l'énergie dans la bande de la voix et platitude spectrale de chaque trame"""
+    frame = frames.shape[1]
+    window = np.hanning(frame).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame, 1.0 / sample_rate)
+    voice_band = (freqs >= 300) & (freqs <= 3400)
+
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2 + 1e-12
+    voice_ratio = power[:, voice_band].sum(axis=1) / power.sum(axis=1)
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db.astype(np.float32), voice_ratio, flatness
+
+
+class SpeechDetector:
+    """Détection d'activité vocale au fil de l'audio, bloc par bloc
+
+    Une trame est considérée comme de la parole si son énergie dépasse le
+    plancher de bruit de energy_margin_db, si l'essentiel de son énergie est
+    dans la bande de la voix (300-3400 Hz) et si son spectre n'est pas plat
+    (bruit, souffle). Les trous courts sont comblés, les régions trop courtes
+    ignorées et chaque région est élargie de padding_seconds.
+
+    L'audio est analysé par unités de unit_seconds secondes, comptées depuis
+    le début : le plancher de bruit d'une unité est le 10e centile de
+    l'énergie de tout ce qui précède et de l'unité elle-même, et une région
+    ouverte (avec sa marge) continue d'une unité à l'autre. Le résultat ne
+    dépend donc pas du découpage en blocs : un fichier entier et le même
+    audio reçu en flux donnent les mêmes régions.
+    """
+
+    def __init__(self, sample_rate, energy_margin_db=8.0, min_speech_seconds=0.3,
+                 min_silence_seconds=0.8, padding_seconds=0.2, frame_seconds=0.03, unit_seconds=30.0):
+        self.sample_rate = sample_rate
+        self.energy_margin_db = energy_margin_db
+        self.frame = max(1, int(frame_seconds * sample_rate))
+        self.min_speech = min_speech_seconds / frame_seconds
+        self.min_silence = min_silence_seconds / frame_seconds
+        self.padding = int(padding_seconds * sample_rate)
+        self.unit = max(1, int(unit_seconds / frame_seconds)) * self.frame
+        self.received = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._frames = 0
+        self._energies = []
+        # Région en cours [début, fin) en trames, encore prolongeable
+        self._open = None
+        self._emitted_end = 0
+
+    @property
+    def analysed(self):
+        """Échantillons déjà analysés"""
+        return self._frames * self.frame
+
+    @property
+    def needed_from(self):
+        """Premier échantillon qu'une région à venir peut encore inclure"""
+        start = self._open[0] if self._open is not None else self._frames
+        return max(self._emitted_end, start * self.frame - self.padding, 0)
+
+    def push(self, chunk):
+        """Analyse un bloc ; retourne les régions (début, fin) en échantillons désormais définitives"""
+        self.received += len(chunk)
+        regions = []
+        offset = 0
+        if len(self._pending):
+            offset = min(len(chunk), self.unit - len(self._pending))
+            self._pending = np.concatenate([self._pending, np.asarray(chunk[:offset], dtype=np.float32)])
+            if len(self._pending) < self.unit:
+                return regions
+            self._analyse(self._pending, regions)
+            self._pending = np.zeros(0, dtype=np.float32)
+        # Unités complètes lues directement dans le bloc, sans copie
+        while len(chunk) - offset >= self.unit:
+            self._analyse(chunk[offset:offset + self.unit], regions)
+            offset += self.unit
+        self._pending = np.array(chunk[offset:], dtype=np.float32)
+        return regions
+
+    def finish(self):
+        """Analyse la fin de l'audio ; retourne les dernières régions"""
+        regions = []
+        if len(self._pending) >= self.frame:
+            self._analyse(self._pending, regions)
+        self._pending = np.zeros(0, dtype=np.float32)
+        if self._open is not None:
+            self._close(regions, self.received)
+        return regions
+
+    def _analyse(self, audio, regions):
+        count = len(audio) // self.frame
+        frames = np.asarray(audio[:count * self.frame], dtype=np.float32).reshape(count, self.frame)
+        # Par blocs pour que la FFT reste légère en mémoire
+        features = [_frame_features(frames[start:start + 4096], self.sample_rate)
+                    for start in range(0, count, 4096)]
+        energy_db, voice_ratio, flatness = (np.concatenate(values) for values in zip(*features))
+
+        self._energies.append(energy_db)
+        noise_floor = np.percentile(np.concatenate(self._energies), 10)
+        speech = (energy_db > noise_floor + self.energy_margin_db) & (voice_ratio > 0.5) & (flatness < 0.5)
+
+        # Trames -> régions ; une pause courte prolonge la région ouverte
+        edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1) + self._frames
+        ends = np.flatnonzero(edges == -1) + self._frames
+        for start, end in zip(starts, ends):
+            if self._open is not None and start - self._open[1] < self.min_silence:
+                self._open[1] = end
+            else:
+                if self._open is not None:
+                    self._close(regions, self.analysed + count * self.frame)
+                self._open = [start, end]
+
+        self._frames += count
+        # Région définitive quand aucune parole à venir ne peut plus la prolonger
+        if self._open is not None and self._frames - self._open[1] >= self.min_silence:
+            self._close(regions, self.analysed)
+
+    def _close(self, regions, limit):
+        start, end = self._open
+        self._open = None
+        if end - start < self.min_speech:
+            return
+        # Marges qui se chevauchent : la région suit directement la précédente
+        start = max(self._emitted_end, int(start) * self.frame - self.padding)
+        end = min(limit, int(end) * self.frame + self.padding)
+        if end > start:
+            regions.append((start, end))
+            self._emitted_end = end
+
+
+def detect_speech(audio, sample_rate, **options):
+    """Détection d'activité vocale sur un audio complet : liste de régions (début, fin) en échantillons
+
+    Voir SpeechDetector pour les options ; des régions qui se touchent sont fusionnées.
+    """
+    detector = SpeechDetector(sample_rate, **options)
+    regions = []
+    for start, end in detector.push(audio) + detector.finish():
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+class SpeechTimeline:
+    """Correspondance entre l'audio réduit aux régions de parole et la chronologie d'origine"""
+
+    def __init__(self, pieces=None):
+        # (début dans l'audio réduit, début d'origine, durée), en secondes
+        self.pieces = []
+        self._starts = []
+        for piece in pieces or []:
+            self.append(*piece)
+
+    def append(self, compressed_start, original_start, length):
+        """Ajoute une région (les régions arrivent dans l'ordre chronologique)"""
+        self.pieces.append((compressed_start, original_start, length))
+        self._starts.append(compressed_start)
+
+    def to_original(self, seconds):
+        """Convertit un instant de l'audio réduit en instant de la vidéo"""
+        if not self.pieces:
+            return seconds
+        index = max(0, bisect.bisect_right(self._starts, seconds) - 1)
+        compressed_start, original_start, length = self.pieces[index]
+        return float(original_start + min(max(seconds - compressed_start, 0.0), length))
+
+    def to_original_range(self, start, end):
+        """Convertit un segment
+
+        Un segment peut couvrir plusieurs zones de parole (réplique qui
+        continue après une pause). Si sa fin tombe dans le silence inséré
+        entre deux zones, elle est ramenée à la fin de la zone qui précède
+        pour ne pas s'afficher pendant la musique ou le silence qui suit.
+        """
+        original_start = self.to_original(start)
+        if not self.pieces:
+            return original_start, end
+        # to_original borne déjà un instant du silence inséré à la fin de sa zone
+        return original_start, max(original_start, self.to_original(end))
+
+
+class SpeechCompressor:
+    """Réduit l'audio à ses régions de parole, bloc par bloc
+
+    Les blocs poussés passent par un SpeechDetector ; les régions retenues
+    sont concaténées (séparées par gap_seconds de silence, sauf si elles se
+    suivent) et la SpeechTimeline permet de replacer les timestamps sur la
+    chronologie d'origine. Une région n'est rendue qu'une fois définitive,
+    parfois avec un bloc de retard : finish() rend la fin de l'audio. Un
+    fichier complet est poussé en un seul bloc et donne la même sortie que
+    le même audio reçu en flux.
+    """
+
+    def __init__(self, sample_rate, gap_seconds=0.3, **vad_options):
+        self.sample_rate = sample_rate
+        self.detector = SpeechDetector(sample_rate, **vad_options)
+        self.timeline = SpeechTimeline()
+        self.regions = 0
+        self.original_samples = 0
+        self.speech_samples = 0
+        self._gap = np.zeros(int(gap_seconds * sample_rate), dtype=np.float32)
+        self._position = 0
+        self._last_end = None
+        # Audio reçu encore utile aux régions à venir, à partir de _kept_start
+        self._kept = np.zeros(0, dtype=np.float32)
+        self._kept_start = 0
+
+    def push(self, chunk):
+        """Analyse un bloc et retourne la parole devenue définitive (éventuellement vide)"""
+        regions = self.detector.push(chunk)
+        self.original_samples += len(chunk)
+        speech = self._extract(regions, chunk)
+        # Ne garder que ce qu'une région à venir peut encore inclure
+        keep_from = self.detector.needed_from
+        kept_start = self.original_samples - len(chunk)
+        if keep_from >= kept_start:
+            self._kept = np.array(chunk[keep_from - kept_start:], dtype=np.float32)
+        else:
+            self._kept = np.concatenate([
+                self._kept[keep_from - self._kept_start:], np.asarray(chunk, dtype=np.float32)
+            ])
+        self._kept_start = keep_from
+        return speech
+
+    def finish(self):
+        """Retourne la parole de la fin de l'audio (à appeler après le dernier bloc)"""
+        speech = self._extract(self.detector.finish(), np.zeros(0, dtype=np.float32))
+        self._kept = np.zeros(0, dtype=np.float32)
+        return speech
+
+    def _extract(self, regions, chunk):
+        """Concatène les régions (échantillons d'origine) lues dans l'audio gardé et dans chunk"""
+        chunk_start = self.original_samples - len(chunk)
+        parts = []
+        for start, end in regions:
+            if self._last_end is None or start > self._last_end:
+                if self._last_end is not None:
+                    parts.append(self._gap)
+                    self._position += len(self._gap)
+                self.regions += 1
+            self.timeline.append(
+                self._position / self.sample_rate,
+                start / self.sample_rate,
+                (end - start) / self.sample_rate
+            )
+            if start < chunk_start:
+                parts.append(self._kept[start - self._kept_start:min(end, chunk_start) - self._kept_start])
+            if end > chunk_start:
+                parts.append(np.asarray(chunk[max(start, chunk_start) - chunk_start:end - chunk_start],
+                                        dtype=np.float32))
+            self._position += end - start
+            self._last_end = end
+            self.speech_samples += end - start
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    @property
+    def kept_fraction(self):
+        return self.speech_samples / self.original_samples if self.original_samples else 1.0
+
+
+class ThrottledReader:
+    """Lecteur de fichier à débit limité
+
+    Remplace un téléchargement YouTube pour tester la lecture en flux avec un
+    fichier média local.
+    """
+
+    def __init__(self, fileobj, bytes_per_second):
+        self.fileobj = fileobj
+        self.bytes_per_second = bytes_per_second
+        self._start = time.monotonic()
+        self._sent = 0
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size if size and size > 0 else 64 * 1024)
+        self._sent += len(data)
+        delay = self._sent / self.bytes_per_second - (time.monotonic() - self._start)
+        if delay > 0:
+            time.sleep(delay)
+        return data
+
+    def close(self):
+        self.fileobj.close()
+
+
+def stream_audio(reader, sample_rate=16000, block_seconds=30, read_size=64 * 1024):
+    """Décode un flux média au fur et à mesure de sa réception
+
+    reader est un objet avec read() (réponse HTTP, fichier...). ffmpeg lit le
+    flux sur son entrée standard et le générateur produit des blocs mono
+    float32 de block_seconds secondes dès qu'ils sont décodés (le dernier
+    peut être plus court).
+    """
+    stderr = tempfile.TemporaryFile()
+    process = subprocess.Popen(
+        [
+            "ffmpeg", "-loglevel", "error", "-threads", "0",
+            "-i", "pipe:0",
+            "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "pipe:1",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=stderr
+    )
+
+    def feed():
+        # Copie le flux vers ffmpeg dans un thread pour ne jamais bloquer la lecture du PCM
+        try:
+            while True:
+                data = reader.read(read_size)
+                if not data:
+                    break
+                process.stdin.write(data)
+        except (BrokenPipeError, ValueError, OSError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+
+    block_bytes = int(block_seconds * sample_rate) * 4
+    buffer = bytearray()
+    try:
+        while True:
+            data = process.stdout.read(read_size)
+            if not data:
+                break
+            buffer.extend(data)
+            while len(buffer) >= block_bytes:
+                yield np.frombuffer(bytes(buffer[:block_bytes]), np.float32).copy()
+                del buffer[:block_bytes]
+
+        usable = len(buffer) - len(buffer) % 4
+        if usable:
+            yield np.frombuffer(bytes(buffer[:usable]), np.float32).copy()
+
+        if process.wait() != 0:
+            stderr.seek(0)
+            message = stderr.read().decode(errors="replace").strip()
+            raise RuntimeError(f"Échec du décodage du flux audio : {message}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        stderr.close()
+        feeder.join(timeout=1)
@@ -1,16 +1,25 @@
 #!/usr/bin/env python3
 """
 Script de traitement par lot pour Emanet Subtitle Translator
-Permet de traduire plusieurs épisodes automatiquement
+Permet de traduire plusieurs épisodes automatiquement : une playlist, une
+chaîne YouTube, un fichier texte d'URLs ou la liste EPISODES ci-dessous.
+Les épisodes déjà traités avec les mêmes modèles et réglages sont ignorés.
+
+Exemples :
+    python batch_process.py "https://www.youtube.com/playlist?list=..."
+    python batch_process.py episodes.txt --download-workers 2
 """
 
 import sys
-import time
-from pathlib import Path
+import argparse
 
 # Importer le traducteur principal
 try:
-    from emanet_translator import EmanetTranslator
+    from emanet_translator import EmanetTranslator, TRANSLATION_MODEL_SIZES
+    from config import BATCH, DECODING
+    from ingest import EpisodeIndex, enumerate_episodes, output_settings
+    from metrics import format_duration
+    from scheduler import EpisodeScheduler
 except ImportError:
     print("Erreur : emanet_translator.py non trouvé dans le dossier")
     sys.exit(1)
@@ -24,13 +33,65 @@ EPISODES = [
     # "https://www.youtube.com/watch?v=XXXXXXXXXX",  # Episode 3
 ]
 
+def parse_args():
+    """Options de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Traduit plusieurs épisodes d'Emanet")
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        help="URLs de vidéos, de playlists ou de chaînes, ou fichiers texte d'URLs "
+             "(par défaut : la liste EPISODES)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Retraite aussi les épisodes déjà présents dans l'index"
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=BATCH["download_workers"],
+        help="Téléchargements simultanés (limite les connexions à YouTube)"
+    )
+    parser.add_argument(
+        "--refresh-transcriptions",
+        action="store_true",
+        help="Ignore les transcriptions en cache et refait téléchargement et transcription"
+    )
+    parser.add_argument(
+        "--clear-transcription-cache",
+        action="store_true",
+        help="Vide le cache des transcriptions avant de commencer"
+    )
+    parser.add_argument(
+        "--translation-model",
+        default="medium",
+        choices=TRANSLATION_MODEL_SIZES,
+        help="Modèle NLLB (suffixe -int8 : quantifié, plus rapide et plus léger sur CPU)"
+    )
+    parser.add_argument(
+        "--profile",
+        default=DECODING["profile"],
+        choices=list(DECODING["profiles"]),
+        help="Profil de décodage : fast (rapide), balanced (équilibré) ou quality (qualité)"
+    )
+    return parser.parse_args()
+
+
 def main():
     """Traite tous les épisodes de la liste"""
+    args = parse_args()
+    DECODING["profile"] = args.profile
+    BATCH["download_workers"] = max(1, args.download_workers)
     
-    if not EPISODES:
+    sources = args.sources or EPISODES
+    if not sources:
         print("⚠️  Aucun épisode à traiter !")
         print("")
-        print("Modifiez ce fichier et ajoutez les URLs YouTube dans la liste EPISODES")
+        print("Donnez une playlist, une chaîne ou un fichier d'URLs :")
+        print('  python batch_process.py "https://www.youtube.com/playlist?list=..."')
+        print("")
+        print("ou modifiez ce fichier et ajoutez les URLs YouTube dans la liste EPISODES")
         print("Exemple :")
         print('EPISODES = [')
         print('    "https://www.youtube.com/watch?v=ABC123",  # Episode 1')
@@ -38,60 +99,79 @@ def main():
         print(']')
         return
     
-    print(f"=== Traitement par lot de {len(EPISODES)} épisodes ===\n")
+    episodes = enumerate_episodes(sources)
+    print(f"✓ {len(episodes)} épisodes trouvés\n")
     
     # Créer le traducteur
     translator = EmanetTranslator()
     
-    # Charger le modèle une seule fois
-    print("Chargement du modèle Whisper...")
-    translator.load_whisper_model("base")  # Vous pouvez changer pour "small" ou "medium"
-    print("✓ Modèle Whisper chargé\n")
+    if args.clear_transcription_cache and translator.transcription_cache is not None:
+        translator.transcription_cache.clear()
+        print("✓ Cache des transcriptions vidé\n")
+    
+    if translator.server is not None:
+        print(f"✓ Serveur de modèles connecté ({translator.server.address})\n")
     
+    # Charger le modèle une seule fois (instantané si le serveur l'a déjà chargé)
     print("Chargement du modèle de traduction NLLB...")
-    translator.load_translation_model("medium")  # Vous pouvez changer pour "small" ou "large"
+    translator.load_translation_model(args.translation_model)
     print("✓ Modèle NLLB chargé\n")
     
-    # Traiter chaque épisode
-    successful = 0
-    failed = 0
+    # Épisodes déjà traités avec les mêmes modèles et réglages : ignorés
+    whisper_size = "base"  # Vous pouvez changer pour "small" ou "medium"
+    settings = output_settings(translator, whisper_size)
+    index = EpisodeIndex(BATCH["index"])
+    todo = episodes if args.force else index.pending(episodes, settings)
+    if len(todo) < len(episodes):
+        print(f"✓ {len(episodes) - len(todo)} épisodes déjà traités avec ces réglages (--force pour les refaire)\n")
+    if not todo:
+        print(f"Rien à faire : les sous-titres sont dans {translator.output_dir}/")
+        return
+    
+    print("Chargement du modèle Whisper...")
+    translator.load_whisper_model(whisper_size)
+    print("✓ Modèle Whisper chargé\n")
     
-    for i, url in enumerate(EPISODES, 1):
-        print(f"--- Episode {i}/{len(EPISODES)} ---")
-        print(f"URL : {url}")
-        
-        try:
-            # Traiter l'épisode
-            start_time = time.time()
-            
-            def progress_callback(message, value=None):
-                if isinstance(message, str) and value is not None:
-                    print(f"{message} ({value}%)")
-            
-            srt_path = translator.process_video(url, progress_callback=progress_callback)
-            
-            elapsed = time.time() - start_time
+    print(f"=== Traitement par lot de {len(todo)} épisodes ===\n")
+    
+    # Traiter les épisodes en recouvrant téléchargement, transcription et traduction
+    by_url = {episode["url"]: episode for episode in todo}
+    
+    def on_event(job, message):
+        print(f"[Episode {job.index}/{len(todo)}] {message}")
+        if job.srt_path and message == "terminé":
+            index.record(by_url[job.url], job.title, job.srt_paths, settings)
+            elapsed = job.finished_at - job.submitted_at
             minutes = int(elapsed // 60)
             seconds = int(elapsed % 60)
-            
             print(f"✓ Terminé en {minutes}m {seconds}s")
-            print(f"✓ Sous-titres : {srt_path}\n")
-            successful += 1
-            
-        except Exception as e:
-            print(f"✗ Erreur : {e}\n")
-            failed += 1
-            continue
-        
-        # Pause entre les épisodes pour éviter la surcharge
-        if i < len(EPISODES):
-            print("Pause de 10 secondes avant le prochain épisode...")
-            time.sleep(10)
+            print(f"✓ Sous-titres : {job.srt_path}")
+            eta = scheduler.eta()
+            if eta:
+                print(f"⏱ Temps restant estimé pour le lot : ~{format_duration(eta)}")
+            print("")
+    
+    scheduler = EpisodeScheduler(
+        translator,
+        on_event=on_event,
+        refresh_transcription=args.refresh_transcriptions
+    )
+    scheduler.run(list(by_url))
+    summary = scheduler.summary()
+    successful = summary["successful"]
     
     # Résumé
     print("\n=== Résumé ===")
     print(f"✓ Réussis : {successful}")
-    print(f"✗ Échoués : {failed}")
+    print(f"✗ Échoués : {summary['failed']}")
+    for job in scheduler.jobs:
+        if job.error is not None:
+            print(f"  - {job.url} : {job.error}")
+    print(f"Durée totale : {int(summary['elapsed'] // 60)}m {int(summary['elapsed'] % 60)}s")
+    print(f"Débit : {summary['episodes_per_hour']:.2f} épisodes/heure")
+    for stage, busy in summary["stage_busy"].items():
+        occupation = busy / summary["elapsed"] * 100 if summary["elapsed"] > 0 else 0
+        print(f"  {stage} : occupé {occupation:.0f}% du temps")
     print(f"\nLes sous-titres sont dans : {translator.output_dir}/")
     
     if successful > 0:
@@ -0,0 +1,950 @@
+#!/usr/bin/env python3
+"""
+Mesures de performance pour Emanet Subtitle Translator
+Compare les différents modes de traitement sur des fichiers locaux
+
+Exemples :
+    python benchmark.py transcription --audio episode.wav --model tiny --workers 4
+    python benchmark.py streaming --media episode.webm --rate 200000
+    python benchmark.py startup --max-import 1.0
+    python benchmark.py quantization --model medium
+    python benchmark.py backends --model small
+    python benchmark.py profiles --audio episode.wav --model base --translation-model small
+    python benchmark.py --output baseline.json stages
+    python benchmark.py stages --baseline baseline.json
+    python benchmark.py compare baseline.json current.json
+    python benchmark.py loading --model base --translation-model small
+    python benchmark.py memory --model small --translation-model medium --budget-mb 4000
+    python benchmark.py languages --languages fra_Latn eng_Latn deu_Latn
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import numpy as np
+    from audio_utils import decode_audio, ThrottledReader
+    from config import AUDIO, DECODING, LANGUAGES, LOW_MEMORY_MODE, MODELS
+    from emanet_translator import EmanetTranslator
+    from metrics import MetricsRecorder, PeakMemory
+except ImportError as e:
+    print(f"Erreur d'importation : {e}")
+    sys.exit(1)
+
+
+def timed(function, *args, repeat=1, **kwargs):
+    """Exécute function repeat fois et retourne (meilleur temps, dernier résultat)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark_transcription(args):
+    """Transcription sur un seul processus contre transcription par morceaux"""
+    translator = EmanetTranslator()
+    translator.load_whisper_model(args.model)
+    audio = decode_audio(args.audio, AUDIO["sample_rate"])
+    duration = len(audio) / AUDIO["sample_rate"]
+
+    print(f"=== Transcription : {args.audio} ({duration:.0f}s, Whisper {args.model}) ===\n")
+
+    results = {}
+    for label, workers in [("single", 1), ("sharded", args.workers)]:
+        # Le premier passage par morceaux inclut le chargement du modèle dans chaque processus
+        elapsed, segments = timed(
+            translator.transcribe_audio, audio, num_workers=workers, repeat=args.repeat
+        )
+        results[label] = {
+            "workers": workers,
+            "seconds": elapsed,
+            "real_time_factor": elapsed / duration,
+            "segments": len(segments),
+        }
+        print(f"{label:8} ({workers} processus) : {elapsed:7.1f}s  "
+              f"RTF {elapsed / duration:.3f}  {len(segments)} segments")
+
+    speedup = results["single"]["seconds"] / results["sharded"]["seconds"]
+    print(f"\nAccélération : x{speedup:.2f}")
+    results["speedup"] = speedup
+    return results
+
+
+def benchmark_streaming(args):
+    """Délai avant le premier sous-titre : flux lu au débit --rate contre fichier complet"""
+    translator = EmanetTranslator()
+    translator.load_whisper_model(args.model)
+    translator.load_translation_model(args.translation_model)
+    translator.translation_cache = None
+
+    size = os.path.getsize(args.media)
+    download_seconds = size / args.rate
+    print(f"=== Réception en flux : {args.media} ({size / 1e6:.1f} Mo à {args.rate / 1e3:.0f} ko/s, "
+          f"téléchargement simulé {download_seconds:.0f}s) ===\n")
+
+    first = {}
+    start = time.perf_counter()
+
+    def on_stage(stage, percent):
+        if stage == "traduction" and "traduction" not in first:
+            first["traduction"] = time.perf_counter() - start
+
+    reader = ThrottledReader(open(args.media, "rb"), args.rate)
+    try:
+        segments, _ = translator.transcribe_and_translate(reader, stage_callback=on_stage)
+    finally:
+        reader.close()
+    total = time.perf_counter() - start
+
+    results = {
+        "bytes_per_second": args.rate,
+        "download_seconds": download_seconds,
+        "first_subtitle_seconds": first.get("traduction"),
+        "total_seconds": total,
+        # Sans flux, rien n'est disponible avant la fin du téléchargement
+        "download_then_process_first_subtitle_seconds": download_seconds,
+        "segments": len(segments),
+    }
+    print(f"Premier sous-titre : {results['first_subtitle_seconds'] or 0:7.1f}s "
+          f"(au mieux {download_seconds:.1f}s en téléchargeant d'abord)")
+    print(f"Total              : {total:7.1f}s  {len(segments)} segments")
+    return results
+
+
+def load_testset(path):
+    """Fichier TSV (réplique turque, référence française) -> (sources, références)"""
+    sources, references = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            source, reference = line.split("\t")
+            sources.append(source)
+            references.append(reference)
+    return sources, references
+
+
+def _ngrams(items, n):
+    return Counter(tuple(items[i:i + n]) for i in range(len(items) - n + 1))
+
+
+def corpus_bleu(hypotheses, references, max_order=4):
+    """BLEU de corpus (une référence par phrase, tokenisation mots / ponctuation)"""
+    matches = [0] * max_order
+    totals = [0] * max_order
+    hypothesis_length = reference_length = 0
+    for hypothesis, reference in zip(hypotheses, references):
+        hypothesis = re.findall(r"\w+|[^\w\s]", hypothesis)
+        reference = re.findall(r"\w+|[^\w\s]", reference)
+        hypothesis_length += len(hypothesis)
+        reference_length += len(reference)
+        for n in range(1, max_order + 1):
+            matches[n - 1] += sum((_ngrams(hypothesis, n) & _ngrams(reference, n)).values())
+            totals[n - 1] += max(len(hypothesis) - n + 1, 0)
+
+    if min(matches) == 0:
+        return 0.0
+    log_precision = sum(math.log(m / t) for m, t in zip(matches, totals)) / max_order
+    brevity = 1.0 if hypothesis_length > reference_length else math.exp(1 - reference_length / max(hypothesis_length, 1))
+    return 100 * brevity * math.exp(log_precision)
+
+
+def corpus_chrf(hypotheses, references, max_order=6, beta=2):
+    """chrF de corpus (n-grammes de caractères sans espaces, n = 1 à 6)"""
+    matches = [0] * max_order
+    hypothesis_totals = [0] * max_order
+    reference_totals = [0] * max_order
+    for hypothesis, reference in zip(hypotheses, references):
+        hypothesis = "".join(hypothesis.split())
+        reference = "".join(reference.split())
+        for n in range(1, max_order + 1):
+            hypothesis_ngrams = _ngrams(hypothesis, n)
+            reference_ngrams = _ngrams(reference, n)
+            matches[n - 1] += sum((hypothesis_ngrams & reference_ngrams).values())
+            hypothesis_totals[n - 1] += sum(hypothesis_ngrams.values())
+            reference_totals[n - 1] += sum(reference_ngrams.values())
+
+    precision = sum(m / t for m, t in zip(matches, hypothesis_totals) if t) / max_order
+    recall = sum(m / t for m, t in zip(matches, reference_totals) if t) / max_order
+    if precision + recall == 0:
+        return 0.0
+    return 100 * (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+
+
+def _measure_translation(model_size, sources, backend=None):
+    """Traduit le jeu de test dans un processus neuf (pic de mémoire propre au modèle)"""
+    import resource
+
+    if backend:
+        MODELS["nllb"]["backend"] = backend
+    translator = EmanetTranslator(use_server=False)
+    translator.translation_cache = None
+
+    start = time.perf_counter()
+    if not translator.load_translation_model(model_size):
+        raise Exception(f"Impossible de charger le modèle NLLB '{model_size}'")
+    load_seconds = time.perf_counter() - start
+
+    segments = [{"start": i, "end": i + 1, "text": text} for i, text in enumerate(sources)]
+    start = time.perf_counter()
+    translated = translator.translate_segments(segments)
+    seconds = time.perf_counter() - start
+
+    hypotheses = [segment["text"] for segment in translated]
+    tokens = sum(len(ids) for ids in translator.translation_backend.tokenizer(hypotheses)["input_ids"])
+    return {
+        "hypotheses": hypotheses,
+        "load_seconds": load_seconds,
+        "seconds": seconds,
+        "tokens": tokens,
+        "tokens_per_second": tokens / seconds if seconds > 0 else 0.0,
+        # ru_maxrss est en kilo-octets sous Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def benchmark_quantization(args):
+    """NLLB float32 contre INT8 : vitesse, mémoire et qualité sur un jeu de test fixe"""
+    sources, references = load_testset(args.testset)
+    print(f"=== Quantification : NLLB {args.model}, {len(sources)} répliques ({args.testset}) ===\n")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for label, model_size in [("float32", args.model), ("int8", f"{args.model}-int8")]:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            measure = pool.submit(_measure_translation, model_size, sources).result()
+        measure["bleu"] = corpus_bleu(measure["hypotheses"], references)
+        measure["chrf"] = corpus_chrf(measure["hypotheses"], references)
+        results[label] = measure
+        print(f"{label:8} : chargement {measure['load_seconds']:6.1f}s  "
+              f"{measure['tokens_per_second']:6.1f} tokens/s  "
+              f"pic RSS {measure['peak_rss_mb']:7.0f} Mo  "
+              f"BLEU {measure['bleu']:5.1f}  chrF {measure['chrf']:5.1f}")
+
+    results["delta"] = {
+        "bleu": results["int8"]["bleu"] - results["float32"]["bleu"],
+        "chrf": results["int8"]["chrf"] - results["float32"]["chrf"],
+        "speedup": results["int8"]["tokens_per_second"] / max(results["float32"]["tokens_per_second"], 1e-9),
+        "memory_ratio": results["int8"]["peak_rss_mb"] / max(results["float32"]["peak_rss_mb"], 1e-9),
+    }
+    delta = results["delta"]
+    print(f"\nINT8 - float32 : BLEU {delta['bleu']:+.1f}  chrF {delta['chrf']:+.1f}  "
+          f"vitesse x{delta['speedup']:.2f}  mémoire x{delta['memory_ratio']:.2f}")
+    print("(le premier chargement INT8 inclut la quantification, les suivants utilisent le cache)")
+    return results
+
+
+def benchmark_backends(args):
+    """Moteur Transformers contre moteur ONNX Runtime : débit et parité des traductions"""
+    sources, references = load_testset(args.testset)
+    print(f"=== Moteurs de traduction : NLLB {args.model}, {len(sources)} répliques ({args.testset}) ===\n")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for backend in ("transformers", "onnx"):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            measure = pool.submit(_measure_translation, args.model, sources, backend).result()
+        measure["bleu"] = corpus_bleu(measure["hypotheses"], references)
+        measure["chrf"] = corpus_chrf(measure["hypotheses"], references)
+        results[backend] = measure
+        print(f"{backend:12} : chargement {measure['load_seconds']:6.1f}s  "
+              f"{measure['tokens_per_second']:6.1f} tokens/s  "
+              f"pic RSS {measure['peak_rss_mb']:7.0f} Mo  "
+              f"BLEU {measure['bleu']:5.1f}  chrF {measure['chrf']:5.1f}")
+
+    # Parité : les traductions ONNX comparées à celles de Transformers
+    expected = results["transformers"]["hypotheses"]
+    actual = results["onnx"]["hypotheses"]
+    identical = sum(a == b for a, b in zip(actual, expected))
+    results["parity"] = {
+        "identical": identical / len(expected) if expected else 1.0,
+        "chrf": corpus_chrf(actual, expected),
+        "differences": [
+            {"source": source, "transformers": b, "onnx": a}
+            for source, a, b in zip(sources, actual, expected) if a != b
+        ],
+        "speedup": results["onnx"]["tokens_per_second"] / max(results["transformers"]["tokens_per_second"], 1e-9),
+    }
+    parity = results["parity"]
+    print(f"\nParité : {parity['identical']:.0%} de traductions identiques, chrF {parity['chrf']:.1f}  "
+          f"vitesse ONNX x{parity['speedup']:.2f}")
+    for difference in parity["differences"][:5]:
+        print(f"  {difference['source']}\n    transformers : {difference['transformers']}\n"
+              f"    onnx         : {difference['onnx']}")
+    print("(le premier chargement ONNX inclut l'export du modèle, les suivants utilisent le cache)")
+
+    results["regression"] = parity["identical"] < args.min_parity
+    if results["regression"]:
+        print(f"\n✗ Régression : moins de {args.min_parity:.0%} de traductions identiques")
+    return results
+
+
+def benchmark_profiles(args):
+    """Profils de décodage : facteur temps réel de la transcription et de la traduction"""
+    translator = EmanetTranslator(use_server=False)
+    translator.translation_cache = None
+    translator.load_whisper_model(args.model)
+    translator.load_translation_model(args.translation_model)
+    audio = decode_audio(args.audio, AUDIO["sample_rate"])
+    duration = len(audio) / AUDIO["sample_rate"]
+    sources, references = load_testset(args.testset)
+    test_segments = [{"start": i, "end": i + 1, "text": text} for i, text in enumerate(sources)]
+
+    print(f"=== Profils de décodage : {args.audio} ({duration:.0f}s, Whisper {args.model}, "
+          f"NLLB {args.translation_model}) ===\n")
+
+    results = {}
+    selected = DECODING["profile"]
+    try:
+        for profile in args.profiles:
+            DECODING["profile"] = profile
+            transcription_seconds, segments = timed(translator.transcribe_audio, audio, num_workers=1)
+            translation_seconds, _ = timed(translator.translate_segments, segments)
+            translated = translator.translate_segments(test_segments)
+            hypotheses = [segment["text"] for segment in translated]
+            results[profile] = {
+                "transcription_seconds": transcription_seconds,
+                "translation_seconds": translation_seconds,
+                "transcription_rtf": transcription_seconds / duration,
+                "translation_rtf": translation_seconds / duration,
+                "real_time_factor": (transcription_seconds + translation_seconds) / duration,
+                "segments": len(segments),
+                "bleu": corpus_bleu(hypotheses, references),
+                "chrf": corpus_chrf(hypotheses, references),
+            }
+            measure = results[profile]
+            print(f"{profile:9} : RTF {measure['real_time_factor']:.3f} "
+                  f"(transcription {measure['transcription_rtf']:.3f}, traduction {measure['translation_rtf']:.3f})  "
+                  f"{len(segments)} segments  BLEU {measure['bleu']:5.1f}  chrF {measure['chrf']:5.1f}")
+    finally:
+        DECODING["profile"] = selected
+    return results
+
+
+def synthetic_dialogue(duration, sample_rate, seed=0):
+    """Audio de test reproductible : répliques voisées (harmoniques modulées au rythme
+    des syllabes) séparées de pauses, sur un bruit de fond faible"""
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 0.003, int(duration * sample_rate)).astype(np.float32)
+    position = 0.5
+    while position < duration - 1:
+        length = min(rng.uniform(1.0, 4.0), duration - position)
+        t = np.arange(int(length * sample_rate)) / sample_rate
+        pitch = rng.uniform(110, 230) * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        # Harmoniques 2 à 12 : l'essentiel de l'énergie dans la bande de la voix (300-3400 Hz)
+        voice = sum(np.sin(k * phase) / np.sqrt(k) for k in range(2, 13))
+        syllables = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 5) * t)) ** 2
+        start = int(position * sample_rate)
+        audio[start:start + len(t)] += (0.03 * voice * syllables).astype(np.float32)
+        position += length + rng.uniform(0.3, 1.5)
+    return audio
+
+
+def realistic_segments(sources, count, spacing=4.5):
+    """count segments distincts (deux répliques du jeu de test chacun), espacés de spacing secondes"""
+    n = len(sources)
+    if count > n * (n - 1):
+        raise Exception(f"Au plus {n * (n - 1)} segments distincts avec ce jeu de test")
+    segments = []
+    for i in range(count):
+        # Paires (i mod n, i // n + i + 1 mod n) toutes différentes
+        first, second = sources[i % n], sources[(i // n + i + 1) % n]
+        segments.append({
+            "start": i * spacing,
+            "end": i * spacing + spacing - 0.5,
+            "text": f"{first} {second}",
+        })
+    return segments
+
+
+def _stage_result(seconds, media_seconds, segments, peak_mb, tokens=None):
+    result = {
+        "seconds": seconds,
+        "real_time_factor": seconds / media_seconds if media_seconds else None,
+        "segments_per_second": segments / seconds if seconds > 0 else None,
+        "peak_rss_mb": peak_mb,
+    }
+    if tokens is not None:
+        result["tokens_per_second"] = tokens / seconds if seconds > 0 else None
+    return result
+
+
+def benchmark_stages(args):
+    """transcribe_audio, translate_segments et create_srt_file sur des données fixes"""
+    if args.device == "cpu":
+        # PyTorch n'est pas encore importé (import tardif) : le GPU reste invisible
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    from config import ADVANCED
+
+    sample_rate = AUDIO["sample_rate"]
+    if args.audio:
+        audio = decode_audio(args.audio, sample_rate)
+        audio_name = args.audio
+    else:
+        audio = synthetic_dialogue(args.duration, sample_rate)
+        audio_name = f"synthétique {args.duration:.0f}s"
+    audio_seconds = len(audio) / sample_rate
+    sources, _ = load_testset(args.testset)
+    segments = realistic_segments(sources, args.segments)
+    segments_seconds = segments[-1]["end"]
+
+    translator = EmanetTranslator(use_server=False)
+    translator.translation_cache = None
+    translator.output_dir = Path(args.workdir)
+    translator.output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"=== Étapes : audio {audio_name}, {len(segments)} segments ({segments_seconds / 60:.0f} min), "
+          f"Whisper {args.model}, NLLB {args.translation_model}, {args.device} ===\n")
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "device": args.device,
+            "whisper_model": args.model,
+            "translation_model": args.translation_model,
+            "translation_backend": MODELS["nllb"]["backend"],
+            "decoding_profile": DECODING["profile"],
+            "vad": AUDIO["vad"]["enabled"],
+            "batch_size": ADVANCED["batch_size"],
+            "audio": audio_name,
+            "audio_seconds": audio_seconds,
+            "segments": len(segments),
+        },
+        "stages": {},
+    }
+    stages = results["stages"]
+
+    with PeakMemory() as memory:
+        load_seconds, _ = timed(translator.load_whisper_model, args.model)
+        translation_load_seconds, _ = timed(translator.load_translation_model, args.translation_model)
+    stages["load_models"] = {
+        "seconds": load_seconds + translation_load_seconds,
+        "whisper_seconds": load_seconds,
+        "translation_seconds": translation_load_seconds,
+        "peak_rss_mb": memory.peak_mb,
+    }
+
+    with PeakMemory() as memory:
+        seconds, transcribed = timed(translator.transcribe_audio, audio, num_workers=1, repeat=args.repeat)
+    stages["transcribe_audio"] = _stage_result(seconds, audio_seconds, len(transcribed), memory.peak_mb)
+    stages["transcribe_audio"]["output_segments"] = len(transcribed)
+
+    with PeakMemory() as memory:
+        seconds, translated = timed(translator.translate_segments, segments, repeat=args.repeat)
+    tokenizer = translator.translation_backend.tokenizer
+    tokens = sum(len(ids) for ids in tokenizer([s["text"] for s in translated])["input_ids"])
+    stages["translate_segments"] = _stage_result(seconds, segments_seconds, len(segments), memory.peak_mb, tokens)
+
+    with PeakMemory() as memory:
+        seconds, _ = timed(translator.create_srt_file, translated, "benchmark_FR.srt", repeat=args.repeat)
+    stages["create_srt_file"] = _stage_result(seconds, segments_seconds, len(segments), memory.peak_mb)
+
+    for name, stage in stages.items():
+        line = f"{name:20} : {stage['seconds']:8.2f}s"
+        if stage.get("real_time_factor") is not None:
+            line += f"  RTF {stage['real_time_factor']:.4f}"
+        if stage.get("segments_per_second") is not None:
+            line += f"  {stage['segments_per_second']:8.1f} segments/s"
+        if stage.get("tokens_per_second") is not None:
+            line += f"  {stage['tokens_per_second']:7.1f} tokens/s"
+        print(f"{line}  pic RSS {stage['peak_rss_mb']:7.0f} Mo")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        results["comparison"] = compare_results(baseline.get("results", baseline), results, args.tolerance)
+        results["regression"] = bool(results["comparison"]["regressions"])
+    return results
+
+
+# Sens de chaque mesure : True si une valeur plus basse est meilleure
+STAGE_METRICS = {
+    "seconds": True,
+    "real_time_factor": True,
+    "peak_rss_mb": True,
+    "segments_per_second": False,
+    "tokens_per_second": False,
+}
+
+# En dessous (secondes), les mesures de temps d'une étape sont trop bruitées pour être comparées
+MIN_COMPARABLE_SECONDS = 0.1
+
+
+def compare_results(baseline, current, tolerance):
+    """Compare deux résultats de benchmark.py stages et affiche les écarts
+
+    Une mesure qui se dégrade de plus de tolerance (fraction) est une régression.
+    Seul le pic de mémoire compte pour les étapes de moins de MIN_COMPARABLE_SECONDS.
+    """
+    print(f"\n=== Comparaison avec la référence (tolérance {tolerance:.0%}) ===\n")
+    different = {
+        key: (value, current["environment"].get(key))
+        for key, value in baseline.get("environment", {}).items()
+        if key in current.get("environment", {}) and current["environment"][key] != value
+    }
+    for key, (before, after) in different.items():
+        print(f"⚠ Environnement différent : {key} {before} -> {after}")
+
+    regressions = []
+    changes = []
+    for name, stage in current["stages"].items():
+        reference = baseline.get("stages", {}).get(name)
+        if not reference:
+            continue
+        for metric, lower_is_better in STAGE_METRICS.items():
+            before, after = reference.get(metric), stage.get(metric)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            worse = change > tolerance if lower_is_better else change < -tolerance
+            if metric != "peak_rss_mb" and reference.get("seconds", 0) < MIN_COMPARABLE_SECONDS:
+                worse = False
+            changes.append({"stage": name, "metric": metric, "baseline": before, "current": after, "change": change})
+            marker = "✗" if worse else " "
+            print(f"{marker} {name:20} {metric:20} {before:10.3f} -> {after:10.3f}  ({change:+.1%})")
+            if worse:
+                regressions.append(changes[-1])
+
+    if regressions:
+        print(f"\n✗ {len(regressions)} régression(s) au-delà de {tolerance:.0%}")
+    else:
+        print("\n✓ Aucune régression")
+    return {
+        "tolerance": tolerance,
+        "environment_differences": {key: list(values) for key, values in different.items()},
+        "changes": changes,
+        "regressions": regressions,
+    }
+
+
+def benchmark_compare(args):
+    """Compare deux fichiers JSON de benchmark.py stages"""
+    documents = []
+    for path in (args.baseline, args.current):
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+        documents.append(document.get("results", document))
+    comparison = compare_results(documents[0], documents[1], args.tolerance)
+    return dict(comparison, regression=bool(comparison["regressions"]))
+
+
+def drop_page_cache(path):
+    """Retire les fichiers d'un dossier du cache du système : le chargement suivant lit le disque"""
+    for file in Path(path).iterdir():
+        if file.is_file():
+            fd = os.open(file, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def benchmark_loading(args):
+    """Chargement de Whisper et NLLB depuis le magasin de modèles (model_store.py), à froid et à chaud"""
+    if args.device == "cpu":
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    from config import MODEL_STORE
+
+    import model_store
+
+    translator = EmanetTranslator(use_server=False)
+    print(f"=== Chargement des modèles : Whisper {args.model}, NLLB {args.translation_model}, "
+          f"magasin {MODEL_STORE['dir'] if MODEL_STORE['enabled'] else 'désactivé'} ===\n")
+
+    models = {
+        f"whisper-{args.model}": (
+            lambda: translator.load_whisper_model(args.model),
+            translator.unload_whisper_model,
+            lambda: model_store.whisper_path(args.model),
+        ),
+        f"nllb-{args.translation_model}": (
+            lambda: translator.load_translation_model(args.translation_model),
+            translator.unload_translation_model,
+            lambda: translator.translation_backend.source,
+        ),
+    }
+    results = {}
+    for name, (load, unload, store) in models.items():
+        # Premier chargement : conversion vers le magasin si le modèle n'y est pas encore
+        prepare_seconds, loaded = timed(load)
+        if not loaded:
+            raise Exception(f"Impossible de charger {name}")
+        path = store() if MODEL_STORE["enabled"] else None
+        unload()
+
+        if path is not None:
+            drop_page_cache(path)
+        with PeakMemory() as memory:
+            cold_seconds, _ = timed(load)
+        unload()
+        warm_seconds, _ = timed(load, repeat=args.repeat)
+        unload()
+
+        results[name] = {
+            "first_seconds": prepare_seconds,
+            "cold_seconds": cold_seconds,
+            "warm_seconds": warm_seconds,
+            "peak_rss_mb": memory.peak_mb,
+            "store": str(path) if path else None,
+        }
+        print(f"{name:22} : première fois {prepare_seconds:7.2f}s  à froid {cold_seconds:7.2f}s  "
+              f"à chaud {warm_seconds:7.2f}s  pic RSS {memory.peak_mb:7.0f} Mo")
+
+    slow = [name for name, result in results.items()
+            if args.max_warm is not None and result["warm_seconds"] > args.max_warm]
+    if slow:
+        print(f"\n✗ Chargement à chaud au-delà de {args.max_warm:.1f}s : {', '.join(slow)}")
+    return {"models": results, "regression": bool(slow)}
+
+
+def benchmark_memory(args):
+    """Mode économie de mémoire (process_low_memory) : pic de mémoire de chaque étape
+    comparé au budget ; un dépassement est une régression"""
+    if args.device == "cpu":
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    sample_rate = AUDIO["sample_rate"]
+    if args.audio:
+        audio_name = args.audio
+        load_audio = lambda: (decode_audio(args.audio, sample_rate), "benchmark_memoire")
+    else:
+        audio_name = f"synthétique {args.duration:.0f}s"
+        load_audio = lambda: (synthetic_dialogue(args.duration, sample_rate), "benchmark_memoire")
+
+    LOW_MEMORY_MODE["enabled"] = True
+    translator = EmanetTranslator(use_server=False)
+    translator.translation_cache = None
+    # Mesures gardées en mémoire : le journal emanet_metrics.jsonl n'est pas modifié
+    translator.metrics = MetricsRecorder()
+    translator.output_dir = Path(args.workdir)
+    translator.output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"=== Mode économie de mémoire : audio {audio_name}, Whisper {args.model}, "
+          f"NLLB {args.translation_model}, budget {args.budget_mb} Mo ===\n")
+
+    metrics = translator.metrics.job(audio_name)
+    segments, _, srt_path = translator.process_low_memory(
+        args.model, args.translation_model, load_audio=load_audio, metrics=metrics
+    )
+
+    stages = {}
+    over_budget = []
+    for record in metrics.stages:
+        stages[record["stage"]] = {"seconds": record["seconds"], "peak_rss_mb": record["peak_rss_mb"]}
+        over = record["peak_rss_mb"] > args.budget_mb
+        if over:
+            over_budget.append(record["stage"])
+        print(f"{'✗' if over else ' '} {record['stage']:20} : {record['seconds']:8.2f}s  "
+              f"pic RSS {record['peak_rss_mb']:7.0f} Mo")
+
+    if over_budget:
+        print(f"\n✗ Budget de {args.budget_mb} Mo dépassé : {', '.join(over_budget)}")
+    else:
+        print(f"\n✓ Toutes les étapes sous le budget de {args.budget_mb} Mo")
+    print(f"{len(segments)} segments, sous-titres : {srt_path}")
+    return {
+        "audio": audio_name,
+        "whisper_model": args.model,
+        "translation_model": args.translation_model,
+        "budget_mb": args.budget_mb,
+        "stages": stages,
+        "over_budget": over_budget,
+        "regression": bool(over_budget),
+    }
+
+
+def benchmark_languages(args):
+    """Sous-titres en plusieurs langues : un traitement par langue contre un seul
+    traitement (une transcription, un passage de l'encodeur par lot)"""
+    if args.device == "cpu":
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    sample_rate = AUDIO["sample_rate"]
+    if args.audio:
+        audio = decode_audio(args.audio, sample_rate)
+        audio_name = args.audio
+    else:
+        audio = synthetic_dialogue(args.duration, sample_rate)
+        audio_name = f"synthétique {args.duration:.0f}s"
+    sources, _ = load_testset(args.testset)
+    segments = realistic_segments(sources, args.segments)
+
+    translator = EmanetTranslator(use_server=False)
+    translator.translation_cache = None
+    translator.load_whisper_model(args.model)
+    translator.load_translation_model(args.translation_model)
+
+    print(f"=== Langues : {', '.join(args.languages)} ; audio {audio_name}, {len(segments)} segments, "
+          f"Whisper {args.model}, NLLB {args.translation_model}, {args.device} ===\n")
+
+    # La transcription est la même pour toutes les langues : mesurée une fois
+    transcription_seconds, _ = timed(translator.transcribe_audio, audio, num_workers=1, repeat=args.repeat)
+    separate = {}
+    for language in args.languages:
+        seconds, translated = timed(
+            translator.translate_segments, segments, target_languages=[language], repeat=args.repeat
+        )
+        separate[language] = {"seconds": seconds, "texts": [segment["text"] for segment in translated]}
+        print(f"{language:10} seul     : traduction {seconds:8.2f}s")
+    fanout_seconds, translated = timed(
+        translator.translate_segments, segments, target_languages=args.languages, repeat=args.repeat
+    )
+    print(f"{'toutes':10} ensemble : traduction {fanout_seconds:8.2f}s")
+
+    # Un seul traitement doit produire exactement les mêmes sous-titres
+    matches = [
+        (segment["translations"][language] if "translations" in segment else segment["text"]) == expected
+        for language in args.languages
+        for segment, expected in zip(translated, separate[language]["texts"])
+    ]
+    identical = sum(matches) / len(matches) if matches else 1.0
+
+    separate_total = sum(
+        transcription_seconds + result["seconds"] for result in separate.values()
+    )
+    fanout_total = transcription_seconds + fanout_seconds
+    translation_separate = sum(result["seconds"] for result in separate.values())
+    print(f"\nTranscription : {transcription_seconds:.2f}s (une fois au lieu de {len(args.languages)})")
+    print(f"Traduction    : {translation_separate:.2f}s -> {fanout_seconds:.2f}s "
+          f"(x{translation_separate / max(fanout_seconds, 1e-9):.2f})")
+    print(f"Total         : {separate_total:.2f}s -> {fanout_total:.2f}s "
+          f"(x{separate_total / max(fanout_total, 1e-9):.2f}, téléchargement non compté)")
+    print(f"Parité        : {identical:.0%} de sous-titres identiques à ceux d'un traitement par langue")
+
+    regression = identical < args.min_parity
+    if regression:
+        print(f"\n✗ Régression : moins de {args.min_parity:.0%} de sous-titres identiques")
+    return {
+        "languages": args.languages,
+        "audio": audio_name,
+        "segments": len(segments),
+        "whisper_model": args.model,
+        "translation_model": args.translation_model,
+        "transcription_seconds": transcription_seconds,
+        "separate": {language: result["seconds"] for language, result in separate.items()},
+        "separate_total_seconds": separate_total,
+        "fanout_translation_seconds": fanout_seconds,
+        "fanout_total_seconds": fanout_total,
+        "translation_speedup": translation_separate / max(fanout_seconds, 1e-9),
+        "total_speedup": separate_total / max(fanout_total, 1e-9),
+        "identical": identical,
+        "regression": regression,
+    }
+
+
+def parse_importtime(stderr):
+    """Lignes de python -X importtime -> liste de (module, secondes cumulées, profondeur)"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(fields[1]) / 1e6
+        except (IndexError, ValueError):
+            # Ligne d'en-tête
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), cumulative, depth))
+    return modules
+
+
+def benchmark_startup(args):
+    """Temps d'import de emanet_translator et lancement de batch_process.py sans épisode"""
+    directory = Path(__file__).resolve().parent
+    probe = (
+        "import sys, emanet_translator; "
+        "print(','.join(m for m in emanet_translator.HEAVY_MODULES if m in sys.modules))"
+    )
+
+    print("=== Démarrage ===\n")
+
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", probe],
+            cwd=directory, capture_output=True, text=True, check=True
+        )
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, completed)
+
+    elapsed, completed = best
+    modules = parse_importtime(completed.stderr)
+    import_seconds = next((seconds for name, seconds, _ in modules if name == "emanet_translator"), None)
+    heavy = [name for name in completed.stdout.strip().split(",") if name]
+    slowest = sorted((m for m in modules if m[2] <= 1), key=lambda m: m[1], reverse=True)[:10]
+
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "batch_process.py"],
+        cwd=directory, capture_output=True, check=True
+    )
+    batch_seconds = time.perf_counter() - start
+
+    print(f"Import de emanet_translator : {import_seconds:.2f}s (interpréteur compris : {elapsed:.2f}s)")
+    print(f"batch_process.py sans épisode : {batch_seconds:.2f}s")
+    print(f"Bibliothèques lourdes importées au démarrage : {', '.join(heavy) or 'aucune'}")
+    print("\nImports les plus lents :")
+    for name, seconds, _ in slowest:
+        print(f"  {seconds:6.3f}s  {name}")
+
+    regression = bool(heavy) or (import_seconds or 0) > args.max_import
+    if regression:
+        print(f"\n✗ Régression : import > {args.max_import}s ou bibliothèque lourde importée au démarrage")
+
+    return {
+        "import_seconds": import_seconds,
+        "interpreter_seconds": elapsed,
+        "batch_process_seconds": batch_seconds,
+        "heavy_modules_imported": heavy,
+        "slowest_imports": [{"module": name, "seconds": seconds} for name, seconds, _ in slowest],
+        "max_import_seconds": args.max_import,
+        "regression": regression,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesures de performance d'Emanet Subtitle Translator")
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    transcription = subparsers.add_parser("transcription", help="Un processus contre plusieurs processus")
+    transcription.add_argument("--audio", required=True, help="Fichier audio local")
+    transcription.add_argument("--model", default="tiny", help="Taille du modèle Whisper")
+    transcription.add_argument("--workers", type=int, default=4, help="Nombre de processus")
+    transcription.add_argument("--repeat", type=int, default=1, help="Nombre de répétitions (meilleur temps)")
+    transcription.set_defaults(handler=benchmark_transcription)
+
+    streaming = subparsers.add_parser("streaming", help="Transcription pendant la réception du média")
+    streaming.add_argument("--media", required=True, help="Fichier média local (WebM/Opus, Ogg, MP3...)")
+    streaming.add_argument("--rate", type=int, default=200000, help="Débit simulé en octets par seconde")
+    streaming.add_argument("--model", default="tiny", help="Taille du modèle Whisper")
+    streaming.add_argument("--translation-model", default="small", help="Taille du modèle NLLB")
+    streaming.set_defaults(handler=benchmark_streaming)
+
+    startup = subparsers.add_parser("startup", help="Temps de démarrage (python -X importtime)")
+    startup.add_argument("--repeat", type=int, default=3, help="Nombre de répétitions (meilleur temps)")
+    startup.add_argument("--max-import", type=float, default=1.0,
+                         help="Temps d'import maximal de emanet_translator avant de signaler une régression")
+    startup.set_defaults(handler=benchmark_startup)
+
+    quantization = subparsers.add_parser("quantization", help="NLLB float32 contre INT8")
+    quantization.add_argument("--model", default="medium", choices=["small", "medium", "large"],
+                              help="Taille du modèle NLLB")
+    quantization.add_argument("--testset", default=str(Path(__file__).resolve().parent / "benchmark_data" / "tr_fr_dialogues.tsv"),
+                              help="Fichier TSV réplique turque / référence française")
+    quantization.set_defaults(handler=benchmark_quantization)
+
+    backends = subparsers.add_parser("backends", help="Moteur Transformers contre moteur ONNX Runtime")
+    backends.add_argument("--model", default="small", help="Taille du modèle NLLB (ex. small, medium-int8)")
+    backends.add_argument("--testset", default=str(Path(__file__).resolve().parent / "benchmark_data" / "tr_fr_dialogues.tsv"),
+                          help="Fichier TSV réplique turque / référence française")
+    backends.add_argument("--min-parity", type=float, default=0.9,
+                          help="Part minimale de traductions identiques entre les deux moteurs")
+    backends.set_defaults(handler=benchmark_backends)
+
+    profiles = subparsers.add_parser("profiles", help="Vitesse et qualité des profils de décodage")
+    profiles.add_argument("--audio", required=True, help="Fichier audio local")
+    profiles.add_argument("--model", default="base", help="Taille du modèle Whisper")
+    profiles.add_argument("--translation-model", default="small", help="Taille du modèle NLLB")
+    profiles.add_argument("--profiles", nargs="+", default=list(DECODING["profiles"]),
+                          choices=list(DECODING["profiles"]), help="Profils à comparer")
+    profiles.add_argument("--testset", default=str(Path(__file__).resolve().parent / "benchmark_data" / "tr_fr_dialogues.tsv"),
+                          help="Fichier TSV réplique turque / référence française")
+    profiles.set_defaults(handler=benchmark_profiles)
+
+    stages = subparsers.add_parser("stages", help="Temps de chaque étape sur des données fixes")
+    stages.add_argument("--audio", help="Fichier audio local (par défaut : audio synthétique)")
+    stages.add_argument("--duration", type=float, default=60, help="Durée de l'audio synthétique (secondes)")
+    stages.add_argument("--segments", type=int, default=200, help="Nombre de segments à traduire")
+    stages.add_argument("--model", default="tiny", help="Taille du modèle Whisper")
+    stages.add_argument("--translation-model", default="small-int8", help="Taille du modèle NLLB")
+    stages.add_argument("--device", default="cpu", choices=["cpu", "auto"], help="cpu : GPU ignoré")
+    stages.add_argument("--repeat", type=int, default=1, help="Nombre de répétitions (meilleur temps)")
+    stages.add_argument("--testset", default=str(Path(__file__).resolve().parent / "benchmark_data" / "tr_fr_dialogues.tsv"),
+                        help="Fichier TSV dont les répliques forment les segments")
+    stages.add_argument("--workdir", default="temp/benchmark", help="Dossier du fichier SRT produit")
+    stages.add_argument("--baseline", help="Résultats JSON de référence à comparer")
+    stages.add_argument("--tolerance", type=float, default=0.15, help="Dégradation tolérée (fraction)")
+    stages.set_defaults(handler=benchmark_stages)
+
+    compare = subparsers.add_parser("compare", help="Compare deux résultats JSON de l'étape stages")
+    compare.add_argument("baseline", help="Résultats de référence")
+    compare.add_argument("current", help="Nouveaux résultats")
+    compare.add_argument("--tolerance", type=float, default=0.15, help="Dégradation tolérée (fraction)")
+    compare.set_defaults(handler=benchmark_compare)
+
+    loading = subparsers.add_parser("loading", help="Chargement des modèles depuis le magasin, à froid et à chaud")
+    loading.add_argument("--model", default="base", help="Taille du modèle Whisper")
+    loading.add_argument("--translation-model", default="small", help="Taille du modèle NLLB")
+    loading.add_argument("--device", default="cpu", choices=["cpu", "auto"], help="cpu : GPU ignoré")
+    loading.add_argument("--repeat", type=int, default=3, help="Nombre de chargements à chaud (meilleur temps)")
+    loading.add_argument("--max-warm", type=float,
+                         help="Temps de chargement à chaud maximal avant de signaler une régression")
+    loading.set_defaults(handler=benchmark_loading)
+
+    memory = subparsers.add_parser("memory", help="Pic de mémoire du mode économie de mémoire contre un budget")
+    memory.add_argument("--audio", help="Fichier audio local (par défaut : audio synthétique)")
+    memory.add_argument("--duration", type=float, default=60, help="Durée de l'audio synthétique (secondes)")
+    memory.add_argument("--model", default="tiny", help="Taille du modèle Whisper")
+    memory.add_argument("--translation-model", default="small-int8", help="Taille du modèle NLLB")
+    memory.add_argument("--budget-mb", type=float, default=LOW_MEMORY_MODE["memory_budget_mb"],
+                        help="Pic de mémoire maximal de chaque étape (Mo)")
+    memory.add_argument("--device", default="cpu", choices=["cpu", "auto"], help="cpu : GPU ignoré")
+    memory.add_argument("--workdir", default="temp/benchmark", help="Dossier du fichier SRT produit")
+    memory.set_defaults(handler=benchmark_memory)
+
+    languages = subparsers.add_parser("languages", help="Une langue par traitement contre toutes en un seul")
+    languages.add_argument("--languages", nargs="+", default=list(dict.fromkeys(LANGUAGES["targets"] + ["eng_Latn", "deu_Latn"])),
+                           help="Codes NLLB des langues de sous-titres")
+    languages.add_argument("--audio", help="Fichier audio local (par défaut : audio synthétique)")
+    languages.add_argument("--duration", type=float, default=60, help="Durée de l'audio synthétique (secondes)")
+    languages.add_argument("--segments", type=int, default=200, help="Nombre de segments à traduire")
+    languages.add_argument("--model", default="tiny", help="Taille du modèle Whisper")
+    languages.add_argument("--translation-model", default="small-int8", help="Taille du modèle NLLB")
+    languages.add_argument("--device", default="cpu", choices=["cpu", "auto"], help="cpu : GPU ignoré")
+    languages.add_argument("--repeat", type=int, default=1, help="Nombre de répétitions (meilleur temps)")
+    languages.add_argument("--testset", default=str(Path(__file__).resolve().parent / "benchmark_data" / "tr_fr_dialogues.tsv"),
+                           help="Fichier TSV dont les répliques forment les segments")
+    languages.add_argument("--min-parity", type=float, default=1.0,
+                           help="Part minimale de sous-titres identiques à ceux d'un traitement par langue")
+    languages.set_defaults(handler=benchmark_languages)
+
+    args = parser.parse_args()
+    results = args.handler(args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"command": args.command, "results": results}, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans : {args.output}")
+
+    if isinstance(results, dict) and results.get("regression"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Caches persistants pour Emanet Subtitle Translator
+Évitent de refaire les transcriptions et traductions déjà calculées lors des exécutions précédentes
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+
+class TranslationCache:
+    """Mémoire de traduction sur disque (SQLite) avec éviction LRU
+
+    La clé combine le texte turc normalisé, le modèle NLLB, les langues source
+    et cible et les paramètres de décodage : changer l'un d'eux ne réutilise
+    jamais une ancienne traduction.
+    """
+
+    # Limite de paramètres par requête SQLite
+    _CHUNK = 500
+
+    def __init__(self, path, max_entries=200000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " key TEXT PRIMARY KEY,"
+                " translation TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)"
+            )
+
+    @staticmethod
+    def normalize(text):
+        """Normalise le texte source (Unicode NFC, espaces multiples réduits)"""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    @classmethod
+    def make_key(cls, text, model_name, src_lang, tgt_lang, settings):
+        """Calcule la clé d'un texte pour un modèle et des paramètres donnés"""
+        payload = json.dumps(
+            [cls.normalize(text), model_name, src_lang, tgt_lang, settings],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """Retourne un dictionnaire clé -> traduction pour les clés connues"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), self._CHUNK):
+                chunk = keys[start:start + self._CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE translations SET last_used = ? WHERE key = ?",
+                        [(now, key) for key in found]
+                    )
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Enregistre un dictionnaire clé -> traduction puis applique la limite de taille"""
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, translation, last_used) VALUES (?, ?, ?)",
+                [(key, translation, now) for key, translation in items.items()]
+            )
+            self._evict()
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_entries"""
+        count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN ("
+                " SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        """Vide la mémoire de traduction"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM translations")
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TranscriptionCache:
+    """Cache disque des transcriptions Whisper
+
+    Une entrée est identifiée par la source (identifiant de vidéo YouTube ou
+    empreinte du fichier audio), la taille du modèle Whisper, la langue et
+    les réglages de transcription (profil de décodage, VAD...). Changer de
+    modèle NLLB ou de langue cible réutilise donc la transcription sans
+    retélécharger la vidéo. La taille totale est plafonnée (LRU).
+    """
+
+    def __init__(self, directory, max_bytes=500 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(*parts):
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, source_id, model_size, language, settings=None):
+        # Préfixe commun à toutes les entrées d'une source pour l'invalidation
+        key = self._digest(model_size, language, json.dumps(settings, sort_keys=True))
+        return self.directory / f"{self._digest(source_id)}_{key}.json"
+
+    def get(self, source_id, model_size, language, settings=None):
+        """Retourne l'entrée en cache (dict avec 'title' et 'segments') ou None"""
+        path = self._path(source_id, model_size, language, settings)
+        with self._lock:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            # Marquer l'entrée comme récemment utilisée
+            path.touch()
+        return entry
+
+    def put(self, source_id, model_size, language, title, segments, settings=None):
+        """Enregistre une transcription puis applique la limite de taille"""
+        path = self._path(source_id, model_size, language, settings)
+        entry = {
+            "source": source_id,
+            "model": model_size,
+            "language": language,
+            "settings": settings,
+            "title": title,
+            "created": time.time(),
+            "segments": segments,
+        }
+        tmp_path = path.with_suffix(".tmp")
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            tmp_path.replace(path)
+            self._evict()
+
+    def invalidate(self, source_id):
+        """Supprime toutes les transcriptions d'une source (tous modèles confondus)"""
+        removed = 0
+        with self._lock:
+            for path in self.directory.glob(f"{self._digest(source_id)}_*.json"):
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def clear(self):
+        """Vide entièrement le cache des transcriptions"""
+        with self._lock:
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
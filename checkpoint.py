@@ -0,0 +1,140 @@
+"""
+Points de reprise des traitements pour Emanet Subtitle Translator
+Un épisode interrompu (arrêt brutal, mise en veille, manque de mémoire) reprend
+au dernier morceau terminé au lieu de recommencer au téléchargement
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+
+def write_atomic(path, data):
+    """Écrit data (octets) dans path : après un arrêt brutal, le fichier est complet ou absent"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JobCheckpoint:
+    """État d'un épisode sur disque : audio décodé, transcription et traduction par morceaux
+
+    Chaque morceau est un fichier JSON numéroté écrit de façon atomique ; les
+    morceaux de traduction couvrent toujours un début de la transcription.
+    settings décrit les réglages de transcription et de traduction : si l'un
+    change, la partie concernée (et ce qui en dépend) est recommencée.
+    """
+
+    def __init__(self, directory, settings):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Aller-retour JSON : les tuples deviennent des listes comme dans state.json
+        settings = json.loads(json.dumps(settings, sort_keys=True))
+
+        state = self._read("state.json") or {}
+        if state.get("transcription") != settings["transcription"]:
+            self._remove("transcription-")
+            self._remove("translation-")
+        elif state.get("translation") != settings["translation"]:
+            self._remove("translation-")
+        self.state = dict(state, **settings)
+        self._write("state.json", self.state)
+
+    @classmethod
+    def for_source(cls, root, source, settings):
+        """Point de reprise d'une source (URL ou identifiant) dans le dossier root"""
+        name = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        return cls(Path(root) / name, dict(settings, source=source))
+
+    # Audio
+
+    @property
+    def audio_path(self):
+        return self.directory / "audio.f32"
+
+    def save_audio(self, audio, title):
+        """Enregistre l'audio décodé ; retourne une projection en mémoire du fichier"""
+        tmp_path = self.audio_path.with_name(self.audio_path.name + ".tmp")
+        np.ascontiguousarray(audio, dtype=np.float32).tofile(tmp_path)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.audio_path)
+        self.state["title"] = title
+        self._write("state.json", self.state)
+        return np.memmap(self.audio_path, dtype=np.float32, mode="c")
+
+    def load_audio(self):
+        """(audio, titre) d'un téléchargement précédent, ou None"""
+        if "title" not in self.state or not self.audio_path.exists():
+            return None
+        # Copie à l'écriture : le tableau est modifiable sans toucher au fichier
+        return np.memmap(self.audio_path, dtype=np.float32, mode="c"), self.state["title"]
+
+    # Transcription
+
+    def add_transcription(self, segments, position=None, prompt="", complete=False):
+        """Ajoute un morceau de transcription
+
+        position (échantillons de l'audio envoyé à Whisper) et prompt permettent
+        de reprendre la transcription par fenêtres juste après ce morceau.
+        """
+        self._add_chunk("transcription-", {
+            "segments": segments, "position": position, "prompt": prompt, "complete": complete
+        })
+
+    def transcription(self):
+        """Transcription déjà faite : {"segments", "position", "prompt", "complete"}"""
+        result = {"segments": [], "position": 0, "prompt": "", "complete": False}
+        for chunk in self._chunks("transcription-"):
+            result["segments"].extend(chunk["segments"])
+            if chunk["position"] is not None:
+                result["position"] = chunk["position"]
+            result["prompt"] = chunk["prompt"] or result["prompt"]
+            result["complete"] = chunk["complete"]
+        return result
+
+    # Traduction
+
+    def add_translation(self, segments):
+        """Ajoute les traductions des segments qui suivent ceux déjà traduits"""
+        self._add_chunk("translation-", {"segments": segments})
+
+    def translation(self):
+        """Segments déjà traduits (dans l'ordre de la transcription)"""
+        return [segment for chunk in self._chunks("translation-") for segment in chunk["segments"]]
+
+    def clear(self):
+        """Supprime le point de reprise (épisode terminé)"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _add_chunk(self, prefix, payload):
+        number = len(list(self.directory.glob(f"{prefix}*.json")))
+        self._write(f"{prefix}{number:05d}.json", payload)
+
+    def _chunks(self, prefix):
+        for path in sorted(self.directory.glob(f"{prefix}*.json")):
+            chunk = self._read(path.name)
+            if chunk is not None:
+                yield chunk
+
+    def _remove(self, prefix):
+        for path in self.directory.glob(f"{prefix}*"):
+            path.unlink(missing_ok=True)
+
+    def _read(self, name):
+        try:
+            with open(self.directory / name, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name, payload):
+        write_atomic(self.directory / name, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
@@ -16,23 +16,77 @@ MODELS = {
             "medium": "facebook/nllb-200-distilled-1.3B",
             "large": "facebook/nllb-200-3.3B"
         },
-        "beam_size": 5,  # Nombre de beams pour la génération (qualité vs vitesse)
-        "temperature": 0.9,  # Créativité de la traduction (0.5-1.0)
-        "max_length": 512,  # Longueur maximale des segments
+        # Moteur d'exécution : "transformers" (PyTorch, CPU ou GPU) ou "onnx"
+        # (ONNX Runtime sur le CPU, nécessite : pip install onnxruntime optimum-onnx)
+        "backend": "transformers",
+        "onnx_threads": 0,  # Threads ONNX Runtime par lot (0 : un par cœur physique)
+        "max_length": 512,  # Longueur maximale des segments (tokens, source et traduction)
     }
 }
 
+# Profils de décodage : vitesse contre qualité, pour NLLB et Whisper
+# Les sous-titres sont courts : la traduction est limitée à max_length_ratio fois
+# la longueur de la source (plus max_length_margin tokens) au lieu de max_length
+# (None : pas de limite). "balanced", le profil par défaut, garde le décodage NLLB
+# d'origine (5 beams, sans pénalité de longueur) ; les réglages plus rapides sont
+# dans "fast".
+DECODING = {
+    "profile": "balanced",  # "fast", "balanced" ou "quality"
+    "profiles": {
+        "fast": {
+            "num_beams": 1,  # Décodage glouton
+            "length_penalty": 1.0,
+            "early_stopping": False,
+            "max_length_ratio": 1.5,
+            "max_length_margin": 8,
+            "whisper_beam_size": None,  # None : décodage glouton
+            "whisper_best_of": 1,  # Candidats échantillonnés quand Whisper réessaie à température > 0
+        },
+        "balanced": {
+            "num_beams": 5,
+            "length_penalty": 1.0,  # < 1 : préfère les traductions courtes
+            "early_stopping": False,
+            "max_length_ratio": None,  # Seul max_length limite la traduction
+            "max_length_margin": 0,
+            "whisper_beam_size": None,
+            "whisper_best_of": 5,
+        },
+        "quality": {
+            "num_beams": 5,
+            "length_penalty": 1.0,
+            "early_stopping": True,  # Arrête le beam search dès num_beams hypothèses complètes
+            "max_length_ratio": 2.5,
+            "max_length_margin": 16,
+            "whisper_beam_size": 5,
+            "whisper_best_of": 5,
+        },
+    },
+}
+
 # Configuration des langues
 LANGUAGES = {
     "source": "tur_Latn",  # Turc
-    "target": "fra_Latn",  # Français
+    # Langues des sous-titres (codes NLLB), un SRT par langue. Chaque réplique
+    # n'est encodée qu'une fois pour toutes ; la première langue est celle
+    # ouverte dans VLC. Ex. ["fra_Latn", "eng_Latn", "deu_Latn"]
+    "targets": ["fra_Latn"],  # Français
+    # Suffixe des fichiers SRT (par défaut : code de langue en majuscules)
+    "suffixes": {"fra_Latn": "FR", "eng_Latn": "EN", "deu_Latn": "DE", "nld_Latn": "NL", "arb_Arab": "AR"},
 }
 
 # Configuration de l'audio
 AUDIO = {
-    "format": "wav",
-    "quality": "192",
-    "sample_rate": 16000,
+    "sample_rate": 16000,  # Fréquence du décodage audio (Whisper attend 16000 Hz)
+    "memmap_after": 1800,  # Au-delà (secondes), l'audio décodé est projeté depuis le disque
+    "streaming_ingest": True,  # Transcrire le flux YouTube pendant sa réception
+    # Détection de parole avant Whisper : musique, silences et génériques sont ignorés
+    "vad": {
+        "enabled": True,
+        "energy_margin_db": 8.0,  # Énergie minimale au-dessus du bruit de fond (dB)
+        "min_speech": 0.3,  # Durée minimale d'une zone de parole (secondes)
+        "min_silence": 0.8,  # Pauses plus courtes fusionnées dans la parole (secondes)
+        "padding": 0.2,  # Marge ajoutée autour de chaque zone (secondes)
+    },
 }
 
 # Configuration des sous-titres
@@ -41,17 +95,71 @@ SUBTITLES = {
     "max_lines": 2,  # Nombre max de lignes par sous-titre
     "min_duration": 0.5,  # Durée minimale d'un sous-titre (secondes)
     "max_duration": 7.0,  # Durée maximale d'un sous-titre (secondes)
+    # Les fragments d'une même phrase (coupée par Whisper) sont traduits ensemble puis
+    # la traduction est répartie sur leurs timings, si l'ensemble tient dans un sous-titre
+    "merge_fragments": True,
+    "merge_max_gap": 1.0,  # Silence maximal entre deux fragments d'une même phrase (secondes)
+    "publish_interval": 10.0,  # Mise à jour du fichier SRT pendant la traduction (secondes)
+    "preview_minutes": 5,  # Minutes traduites avant d'activer "Ouvrir dans VLC"
 }
 
 # Configuration avancée
 ADVANCED = {
     "batch_size": 16,  # Taille des lots pour la traduction
-    "num_workers": 4,  # Nombre de threads pour le traitement
+    "num_workers": 4,  # Nombre de processus pour la transcription par morceaux
+    "sharded_transcription": False,  # Découper l'audio aux silences et transcrire sur plusieurs cœurs
+    "streaming_pipeline": True,  # Traduire pendant la transcription au lieu d'attendre la fin
+    "transcription_window": 30,  # Durée des fenêtres envoyées à Whisper (secondes)
+    "pipeline_queue_size": 8,  # Nombre max de fenêtres transcrites en attente de traduction
     "cache_dir": ".cache",  # Dossier de cache pour les modèles
     "keep_temp_files": False,  # Garder les fichiers temporaires après traitement
+    "preload_models": True,  # Charger les modèles en arrière-plan dès l'ouverture de l'interface
+    "translation_memory": True,  # Réutiliser les traductions déjà faites (SQLite dans cache_dir)
+    "translation_memory_max_entries": 200000,  # Au-delà, les entrées les moins utilisées sont supprimées
+    "transcription_cache": True,  # Réutiliser les transcriptions Whisper (même vidéo, même modèle)
+    "transcription_cache_max_mb": 500,  # Taille maximale du cache des transcriptions
+    "resume_jobs": True,  # Reprendre un épisode interrompu au dernier morceau terminé (cache_dir/jobs)
+    "checkpoint_segments": 64,  # Segments traduits entre deux points de reprise
+    "ui_refresh_ms": 100,  # Intervalle de rafraîchissement de l'interface (au plus 10 par seconde)
+    "log_max_lines": 1000,  # Lignes gardées dans le journal de l'interface
     "log_level": "INFO",  # Niveau de log : DEBUG, INFO, WARNING, ERROR
 }
 
+# Traitement par lot (batch_process.py)
+BATCH = {
+    "download_workers": 1,  # Téléchargements simultanés
+    "transcription_workers": 1,  # Transcriptions simultanées (1 : un seul modèle Whisper partagé)
+    "translation_workers": 1,  # Traductions simultanées (1 : un seul modèle NLLB partagé)
+    "prefetch": 1,  # Épisodes prêts d'avance par étape (limite l'espace disque utilisé)
+    # Épisodes déjà traités (identifiant, modèles et réglages, fichiers SRT) : non retraités
+    "index": "emanet_subtitles/episodes.json",
+}
+
+# Serveur de modèles (model_server.py) : modèles gardés en mémoire entre les lancements
+SERVER = {
+    "enabled": True,  # Utiliser le serveur s'il est lancé (sinon chargement dans le processus)
+    "socket": ".cache/model_server.sock",  # Socket Unix du serveur
+    "batch_wait": 0.05,  # Attente max pour regrouper les traductions de plusieurs clients (secondes)
+    "queue_size": 16,  # Requêtes en attente au-delà desquelles les clients patientent
+}
+
+# Magasin de modèles préconvertis (model_store.py) : poids safetensors dans le
+# type utilisé à l'exécution, projetés en mémoire au chargement
+MODEL_STORE = {
+    "enabled": True,  # Charger Whisper et NLLB depuis le magasin (conversion à la première utilisation)
+    "dir": ".cache/models",  # Dossier du magasin
+    "offline": False,  # Ne jamais télécharger : erreur si un modèle n'est ni dans le magasin ni en cache
+}
+
+# Mesures de performance par étape (metrics.py)
+METRICS = {
+    "enabled": True,  # Écrire les mesures de chaque traitement
+    "jsonl": "emanet_metrics.jsonl",  # Une ligne JSON par étape et par traitement (à côté du journal)
+    "prometheus": None,  # Fichier textfile pour node_exporter, ex. "/var/lib/node_exporter/textfile_collector/emanet.prom"
+    "history": 20,  # Traitements précédents utilisés pour estimer la durée des étapes à venir
+    "refresh_interval": 2.0,  # Rafraîchissement du temps restant affiché (secondes)
+}
+
 # Configuration GPU (si disponible)
 GPU = {
     "use_fp16": True,  # Utiliser la précision demi (économise la mémoire)
@@ -60,8 +168,12 @@ GPU = {
 }
 
 # Optimisations pour machines avec peu de RAM
+# Un seul modèle en mémoire à la fois : Whisper transcrit puis est libéré avant
+# le chargement de NLLB (pas de transcription et traduction en parallèle)
 LOW_MEMORY_MODE = {
     "enabled": False,  # Activer le mode économie de mémoire
     "batch_size": 4,  # Réduire la taille des lots
-    "offload_to_disk": True,  # Décharger sur le disque si nécessaire
+    "offload_to_disk": True,  # Audio décodé projeté depuis le disque au lieu d'être gardé en RAM
+    "translation_chunk": 64,  # Segments traduits puis écrits dans le SRT avant de passer aux suivants
+    "memory_budget_mb": 6000,  # Pic de mémoire par étape au-delà duquel un avertissement est journalisé
 }
@@ -5,30 +5,87 @@ Traduit automatiquement les dialogues turcs de la série Emanet en sous-titres f
 """
 
 import os
+import re
 import sys
+import gc
 import json
+import math
+import importlib
+import importlib.util
+import shutil
+import uuid
 import subprocess
+import urllib.request
 import logging
+import time
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
 import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Bibliothèques externes
 try:
-    import yt_dlp
-    import whisper
     import srt
-    from datetime import timedelta
-    import torch
-    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+    import numpy as np
 except ImportError as e:
     print(f"Erreur d'importation : {e}")
     print("Installez les dépendances avec : pip install -r requirements.txt")
     sys.exit(1)
 
+# Bibliothèques lourdes : plusieurs secondes d'import, faites au premier usage
+# pour que l'interface s'affiche immédiatement (voir EmanetGUI.warm_up)
+HEAVY_MODULES = ("yt_dlp", "whisper", "torch", "transformers")
+
+_missing = [name for name in HEAVY_MODULES if importlib.util.find_spec(name) is None]
+if _missing:
+    print(f"Erreur d'importation : modules introuvables : {', '.join(_missing)}")
+    print("Installez les dépendances avec : pip install -r requirements.txt")
+    sys.exit(1)
+
+
+class _LazyModule:
+    """Module importé au premier accès à l'un de ses attributs"""
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attribute):
+        if self._module is None:
+            start = time.time()
+            self._module = importlib.import_module(self._name)
+            logging.debug(f"Import de {self._name} en {time.time() - start:.1f}s")
+        return getattr(self._module, attribute)
+
+
+yt_dlp = _LazyModule("yt_dlp")
+whisper = _LazyModule("whisper")
+torch = _LazyModule("torch")
+transformers = _LazyModule("transformers")
+
+
+# Tailles de modèle NLLB proposées (interface, batch_process.py) ; "-int8" : quantifié pour le CPU
+TRANSLATION_MODEL_SIZES = ["small", "small-int8", "medium", "medium-int8", "large", "large-int8"]
+
+
+def import_heavy_modules():
+    """Importe toutes les bibliothèques lourdes (préchargement en arrière-plan)"""
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+from config import ADVANCED, AUDIO, DECODING, LANGUAGES, LOW_MEMORY_MODE, METRICS, MODELS, SERVER, SUBTITLES
+from cache import TranslationCache, TranscriptionCache
+from model_server import ModelClient
+from metrics import MetricsRecorder, format_duration
+from checkpoint import JobCheckpoint
+from audio_utils import (
+    decode_audio, audio_sha256, split_at_silences, stream_audio, SpeechCompressor
+)
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -39,22 +96,371 @@ logging.basicConfig(
     ]
 )
 
+# Identifiant de vidéo YouTube (watch?v=, youtu.be/, shorts/, embed/, live/)
+YOUTUBE_ID_PATTERN = re.compile(
+    r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/)|youtu\.be/)([A-Za-z0-9_-]{11})"
+)
+
+
+def extract_video_id(youtube_url):
+    """Extrait l'identifiant d'une URL YouTube (None si l'URL n'est pas reconnue)"""
+    match = YOUTUBE_ID_PATTERN.search(youtube_url)
+    return match.group(1) if match else None
+
+
+def decoding_profile(name=None):
+    """Paramètres du profil de décodage name (par défaut DECODING["profile"])"""
+    name = name or DECODING["profile"]
+    if name not in DECODING["profiles"]:
+        raise Exception(f"Profil de décodage inconnu : {name} (choix : {', '.join(DECODING['profiles'])})")
+    return DECODING["profiles"][name]
+
+
+def whisper_decode_options(name=None):
+    """Options de décodage de Whisper.transcribe pour un profil"""
+    profile = decoding_profile(name)
+    return {
+        'beam_size': profile['whisper_beam_size'],
+        'best_of': profile['whisper_best_of'],
+    }
+
+
+def release_memory():
+    """Rend au système la mémoire des objets libérés (modèles, audio)"""
+    gc.collect()
+    if "torch" in sys.modules and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    try:
+        import ctypes
+        # glibc garde sinon les petites allocations libérées dans le tas du processus
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class SrtWriter:
+    """Écrit un fichier SRT au fur et à mesure, sans composer tout le fichier en mémoire
+    
+    Les segments doivent arriver dans l'ordre chronologique. Comme srt.compose,
+    les sous-titres vides ou de durée nulle sont ignorés et la numérotation
+    suit les sous-titres écrits. Les sous-titres sont ajoutés à un fichier
+    ".part" ; au plus toutes les publish_interval secondes (et à la fermeture),
+    il est copié puis renommé sur path : un lecteur (VLC) ne voit jamais de
+    sous-titre à moitié écrit. on_publish(path, secondes couvertes) est appelé
+    après chaque publication. Avec language, le texte est lu dans
+    segment['translations'][language] (segments traduits vers plusieurs langues).
+    """
+    
+    def __init__(self, path, publish_interval=None, on_publish=None, language=None):
+        self.path = Path(path)
+        self.language = language
+        self.count = 0
+        # Fin du dernier sous-titre écrit (secondes de vidéo couvertes)
+        self.covered_until = 0.0
+        self.publish_interval = publish_interval
+        self.on_publish = on_publish
+        self._part_path = self.path.with_name(self.path.name + ".part")
+        self._file = open(self._part_path, 'w', encoding='utf-8')
+        self._published_at = time.time()
+        self._published_count = 0
+    
+    def write(self, segments):
+        for segment in segments:
+            if not segment['text'].strip() or segment['start'] < 0 or segment['start'] >= segment['end']:
+                continue
+            self.count += 1
+            subtitle = srt.Subtitle(
+                index=self.count,
+                start=timedelta(seconds=segment['start']),
+                end=timedelta(seconds=segment['end']),
+                content=segment['translations'][self.language] if self.language else segment['text']
+            )
+            self._file.write(subtitle.to_srt())
+            self.covered_until = max(self.covered_until, segment['end'])
+        self._file.flush()
+        if self.publish_interval is not None and time.time() - self._published_at >= self.publish_interval:
+            self.publish()
+    
+    def publish(self):
+        """Rend visibles les sous-titres écrits jusqu'ici (copie puis renommage atomique)"""
+        if self.count == self._published_count:
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        shutil.copyfile(self._part_path, tmp_path)
+        os.replace(tmp_path, self.path)
+        self._published_at = time.time()
+        self._published_count = self.count
+        if self.on_publish:
+            self.on_publish(self.path, self.covered_until)
+    
+    def close(self):
+        """Publie le fichier complet (simple renommage du fichier .part)"""
+        if self._file.closed:
+            return
+        self._file.close()
+        os.replace(self._part_path, self.path)
+        if self.on_publish and self.count != self._published_count:
+            self.on_publish(self.path, self.covered_until)
+        self._published_count = self.count
+    
+    def abort(self):
+        """Abandonne le fichier .part ; la dernière publication reste en place"""
+        if self._file.closed:
+            return
+        self._file.close()
+        self._part_path.unlink(missing_ok=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class SrtWriterGroup:
+    """Un SrtWriter par langue de sous-titres, alimentés par les mêmes segments traduits
+    
+    path et count sont ceux du premier fichier (première langue, ouverte dans VLC).
+    """
+    
+    def __init__(self, writers):
+        self.writers = writers
+    
+    @property
+    def path(self):
+        return self.writers[0].path
+    
+    @property
+    def paths(self):
+        return [writer.path for writer in self.writers]
+    
+    @property
+    def count(self):
+        return self.writers[0].count
+    
+    def write(self, segments):
+        for writer in self.writers:
+            writer.write(segments)
+    
+    def publish(self):
+        for writer in self.writers:
+            writer.publish()
+    
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+    
+    def abort(self):
+        for writer in self.writers:
+            writer.abort()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def merge_shard_segments(shards):
+    """Fusionne les segments de morceaux consécutifs (timestamps déjà globaux)
+    
+    Aux frontières, un segment répété par le morceau suivant est supprimé et
+    un segment qui chevauche le précédent est raccourci.
+    """
+    merged = []
+    for segments in shards:
+        for segment in segments:
+            if merged and segment['start'] < merged[-1]['end']:
+                previous = merged[-1]
+                if " ".join(segment['text'].lower().split()) == " ".join(previous['text'].lower().split()):
+                    continue
+                segment = dict(segment, start=previous['end'])
+                if segment['start'] >= segment['end']:
+                    continue
+            merged.append(segment)
+    return merged
+
+
+# Fin de phrase : ponctuation finale, éventuellement suivie de guillemets ou parenthèses fermants
+_SENTENCE_END = re.compile(r"[.!?…][\"'»”)\]]*$")
+
+
+def group_sentence_fragments(segments, max_gap=None, boundaries=()):
+    """Regroupe les segments consécutifs d'une même phrase en unités de traduction
+    
+    Un segment rejoint le précédent si celui-ci ne termine pas une phrase, s'il
+    commence après lui à moins de max_gap secondes (SUBTITLES["merge_max_gap"])
+    et si l'unité tient encore dans un sous-titre (SUBTITLES["max_duration"],
+    max_line_length x max_lines caractères). boundaries contient les indices
+    qui commencent une nouvelle suite de segments (autre épisode) : ils ne
+    rejoignent jamais le précédent. Retourne des listes d'indices.
+    """
+    max_gap = SUBTITLES["merge_max_gap"] if max_gap is None else max_gap
+    max_chars = SUBTITLES["max_line_length"] * SUBTITLES["max_lines"]
+    boundaries = set(boundaries)
+    groups = []
+    length = 0
+    for index, segment in enumerate(segments):
+        text = segment['text'].strip()
+        if groups and index not in boundaries:
+            first, previous = segments[groups[-1][0]], segments[groups[-1][-1]]
+            if (not _SENTENCE_END.search(previous['text'].strip())
+                    and 0 <= segment['start'] - previous['end'] <= max_gap
+                    and segment['end'] - first['start'] <= SUBTITLES["max_duration"]
+                    and length + 1 + len(text) <= max_chars):
+                groups[-1].append(index)
+                length += 1 + len(text)
+                continue
+        groups.append([index])
+        length = len(text)
+    return groups
+
+
+def split_translation(text, weights):
+    """Répartit une traduction entre plusieurs segments au prorata de weights
+    
+    Les coupures tombent entre deux mots, au plus près de la position
+    proportionnelle ; chaque segment reçoit au moins un mot s'il y en a assez.
+    """
+    words = text.split()
+    count = len(weights)
+    total = sum(weights) or count
+    # Position de la fin de chaque mot dans la traduction (espaces simples)
+    ends = []
+    for word in words:
+        ends.append((ends[-1] + 1 if ends else 0) + len(word))
+    length = ends[-1] if ends else 0
+    
+    cuts = [0]
+    cumulative = 0
+    for position, weight in enumerate(weights[:-1]):
+        cumulative += weight
+        target = length * cumulative / total
+        low = min(cuts[-1] + 1, len(words))
+        high = max(low, len(words) - (count - position - 1))
+        cuts.append(min(range(low, high + 1), key=lambda k: abs(ends[k - 1] - target) if k else target))
+    cuts.append(len(words))
+    return [" ".join(words[start:end]) for start, end in zip(cuts, cuts[1:])]
+
+
+# Modèle Whisper propre à chaque processus du pool de transcription
+_shard_worker_model = None
+
+
+def _init_shard_worker(model_size, num_threads):
+    """Initialisation d'un processus du pool : le modèle n'est chargé qu'une fois"""
+    global _shard_worker_model
+    torch.set_num_threads(num_threads)
+    from model_store import load_whisper
+    
+    # Poids projetés en mémoire : les processus partagent les pages du magasin
+    _shard_worker_model = load_whisper(model_size, device="cpu")
+
+
+def _transcribe_shard(audio, offset_seconds, decode_options):
+    """Transcrit un morceau d'audio et décale ses timestamps sur la chronologie globale"""
+    result = _shard_worker_model.transcribe(
+        audio, language="tr", task="transcribe", verbose=None, **decode_options
+    )
+    duration = len(audio) / AUDIO["sample_rate"]
+    
+    segments = []
+    for segment in result['segments']:
+        text = segment['text'].strip()
+        # Ignorer ce que Whisper place au-delà de la fin du morceau
+        if not text or segment['start'] >= duration:
+            continue
+        segments.append({
+            'start': offset_seconds + segment['start'],
+            'end': offset_seconds + min(segment['end'], duration),
+            'text': text
+        })
+    return segments
+
+
 class EmanetTranslator:
-    def __init__(self):
+    def __init__(self, use_server=True):
         self.whisper_model = None
-        self.translation_model = None
-        self.tokenizer = None
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.whisper_model_size = None
+        self.translation_backend = None
+        self.translation_model_name = None
+        self.translation_model_size = None
+        self._device = None
         self.output_dir = Path("emanet_subtitles")
         self.output_dir.mkdir(exist_ok=True)
         self.temp_dir = Path("temp")
         self.temp_dir.mkdir(exist_ok=True)
         
+        # Un seul appel à la fois par modèle (scheduler et serveur de modèles multi-threads)
+        # (le moteur de traduction a son propre verrou)
+        self._whisper_lock = threading.Lock()
+        
+        # Serveur de modèles (model_server.py) : s'il est lancé, les modèles
+        # ne sont pas chargés dans ce processus
+        self.server = None
+        if use_server and SERVER["enabled"]:
+            self.server = ModelClient.connect()
+            if self.server is not None:
+                logging.info(f"Serveur de modèles connecté : {self.server.address}")
+        
+        # Pool de processus pour la transcription par morceaux (créé à la demande)
+        self._shard_pool = None
+        self._shard_pool_key = None
+        
+        # Mesures de chaque étape (JSON lines, Prometheus) et temps restant
+        self.metrics = MetricsRecorder(
+            METRICS["jsonl"] if METRICS["enabled"] else None,
+            METRICS["prometheus"] if METRICS["enabled"] else None
+        )
+        
+        # Mémoire de traduction partagée entre les épisodes
+        self.translation_cache = None
+        if ADVANCED["translation_memory"]:
+            self.translation_cache = TranslationCache(
+                Path(ADVANCED["cache_dir"]) / "translation_memory.sqlite3",
+                max_entries=ADVANCED["translation_memory_max_entries"]
+            )
+        
+        # Transcriptions déjà faites : évite téléchargement et Whisper
+        self.transcription_cache = None
+        if ADVANCED["transcription_cache"]:
+            self.transcription_cache = TranscriptionCache(
+                Path(ADVANCED["cache_dir"]) / "transcriptions",
+                max_bytes=ADVANCED["transcription_cache_max_mb"] * 1024 * 1024
+            )
+        
+    @property
+    def device(self):
+        """GPU si disponible (le premier accès importe PyTorch)"""
+        if self._device is None:
+            self._device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        return self._device
+    
     def load_whisper_model(self, model_size="base"):
         """Charge le modèle Whisper pour la reconnaissance vocale"""
         logging.info(f"Chargement du modèle Whisper '{model_size}'...")
+        if self.server is not None:
+            try:
+                self.server.load(whisper=model_size)
+                self.whisper_model_size = model_size
+                logging.info("Modèle Whisper prêt sur le serveur de modèles")
+                return True
+            except ConnectionError as e:
+                self._server_lost(e)
         try:
-            self.whisper_model = whisper.load_model(model_size)
+            # Import tardif : le magasin de modèles importe PyTorch
+            from model_store import load_whisper
+            
+            start = time.time()
+            self.whisper_model = load_whisper(model_size)
+            logging.info(f"Modèle Whisper chargé en {time.time() - start:.1f}s")
+            self.whisper_model_size = model_size
             logging.info("Modèle Whisper chargé avec succès")
             return True
         except Exception as e:
@@ -62,7 +468,14 @@ class EmanetTranslator:
             return False
     
     def load_translation_model(self, model_size="small"):
-        """Charge le modèle NLLB pour la traduction"""
+        """Charge le modèle NLLB pour la traduction
+        
+        Le suffixe "-int8" (ex. "medium-int8") charge une version dont les
+        couches linéaires sont quantifiées en INT8, pour le CPU : environ quatre
+        fois moins de mémoire et une traduction plus rapide, pour une légère
+        perte de qualité (voir benchmark.py quantization). Le moteur d'exécution
+        (Transformers ou ONNX Runtime) est choisi par MODELS["nllb"]["backend"].
+        """
         logging.info(f"Chargement du modèle de traduction NLLB '{model_size}'...")
         
         # Mapping des tailles de modèles NLLB
@@ -72,84 +485,193 @@ class EmanetTranslator:
             "large": "facebook/nllb-200-3.3B"  # 3.3B params - Meilleure qualité
         }
         
-        model_name = model_names.get(model_size, model_names["small"])
+        base_size, _, variant = model_size.partition("-")
+        quantized = variant == "int8"
+        model_name = model_names.get(base_size, model_names["small"])
+        backend = MODELS["nllb"]["backend"]
+        
+        if self.server is not None:
+            try:
+                self.server.load(nllb=model_size)
+                self.translation_model_name = self._translation_key(model_name, backend, quantized)
+                self.translation_model_size = model_size
+                logging.info("Modèle NLLB prêt sur le serveur de modèles")
+                return True
+            except ConnectionError as e:
+                self._server_lost(e)
         
         try:
-            # Charger le tokenizer et le modèle
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.translation_model = AutoModelForSeq2SeqLM.from_pretrained(
-                model_name,
-                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
-            ).to(self.device)
-            
-            logging.info(f"Modèle NLLB chargé avec succès sur {self.device}")
+            # Import tardif : le module des moteurs importe PyTorch et Transformers
+            from translation_backends import create_backend
+            
+            self.translation_backend = create_backend(backend, model_name, self.device, quantized)
+            self.translation_model_name = self._translation_key(
+                model_name, backend, self.translation_backend.quantized
+            )
+            self.translation_model_size = model_size
+            
+            logging.info(f"Modèle NLLB chargé avec succès ({backend}, {self.translation_backend.device})")
             return True
             
         except Exception as e:
             logging.error(f"Erreur lors du chargement du modèle NLLB : {e}")
             return False
     
-    def download_video(self, youtube_url, progress_callback=None):
-        """Télécharge la vidéo YouTube et extrait l'audio"""
+    @staticmethod
+    def _translation_key(model_name, backend, quantized):
+        """Nom du modèle dans la mémoire de traduction
+        
+        Les traductions des variantes (moteur ONNX, INT8) ne sont pas mélangées
+        à celles du modèle float32 de Transformers.
+        """
+        if backend != "transformers":
+            model_name = f"{model_name}:{backend}"
+        return f"{model_name}:int8" if quantized else model_name
+    
+    def unload_whisper_model(self):
+        """Libère le modèle Whisper (mode économie de mémoire)"""
+        if self.whisper_model is None:
+            return
+        logging.info("Libération du modèle Whisper")
+        self.whisper_model = None
+        release_memory()
+    
+    def unload_translation_model(self):
+        """Libère le modèle NLLB (mode économie de mémoire)"""
+        if self.translation_backend is None:
+            return
+        logging.info("Libération du modèle NLLB")
+        self.translation_backend = None
+        release_memory()
+    
+    def _server_lost(self, error):
+        """Le serveur de modèles ne répond plus : retour au chargement dans le processus"""
+        logging.warning(f"{error} ; les modèles sont chargés dans ce processus")
+        self.server = None
+        if self.whisper_model_size and not self.whisper_model:
+            self.load_whisper_model(self.whisper_model_size)
+        if self.translation_model_size and not self.translation_backend:
+            self.load_translation_model(self.translation_model_size)
+    
+    def download_video(self, youtube_url, progress_callback=None, output_dir=None):
+        """Télécharge l'audio de la vidéo YouTube et le décode en mémoire
+        
+        Le flux audio d'origine est décodé une seule fois, directement en mono
+        float32 à AUDIO["sample_rate"] Hz, sans fichier WAV intermédiaire. Au-delà
+        de AUDIO["memmap_after"] secondes, les échantillons sont projetés en
+        mémoire depuis un fichier brut du dossier de travail. Retourne
+        (audio, titre). output_dir permet de donner à chaque épisode son propre
+        dossier de travail (traitement par lot de plusieurs épisodes en parallèle).
+        """
         logging.info(f"Téléchargement de : {youtube_url}")
         
+        output_dir = Path(output_dir) if output_dir else self.temp_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
         ydl_opts = {
             'format': 'bestaudio/best',
-            'outtmpl': str(self.temp_dir / '%(title)s.%(ext)s'),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'wav',
-                'preferredquality': '192',
-            }],
+            'outtmpl': str(output_dir / '%(id)s.%(ext)s'),
             'quiet': True,
             'no_warnings': True,
-            'progress_hooks': [self._download_progress_hook] if progress_callback else []
+            'progress_hooks': [
+                lambda d: self._download_progress_hook(d, progress_callback)
+            ] if progress_callback else []
         }
         
-        self.progress_callback = progress_callback
-        
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(youtube_url, download=True)
                 video_title = info['title']
-                audio_file = self.temp_dir / f"{video_title}.wav"
-                
-                if not audio_file.exists():
-                    # Chercher le fichier audio généré
-                    for file in self.temp_dir.glob("*.wav"):
-                        audio_file = file
-                        break
-                
-                logging.info(f"Audio extrait : {audio_file}")
-                return audio_file, video_title
+                downloads = info.get('requested_downloads') or [{}]
+                media_file = Path(downloads[0].get('filepath') or ydl.prepare_filename(info))
+            
+            raw_path = None
+            offload = LOW_MEMORY_MODE["enabled"] and LOW_MEMORY_MODE["offload_to_disk"]
+            if offload or (info.get('duration') or 0) > AUDIO["memmap_after"]:
+                raw_path = output_dir / f"{media_file.stem}.f32"
+            
+            start = time.time()
+            audio = decode_audio(media_file, AUDIO["sample_rate"], raw_path=raw_path)
+            logging.info(
+                f"Audio décodé : {len(audio) / AUDIO['sample_rate']:.0f}s à {AUDIO['sample_rate']} Hz "
+                f"en {time.time() - start:.1f}s" + (" (projeté en mémoire)" if raw_path else "")
+            )
+            
+            if not ADVANCED["keep_temp_files"]:
+                media_file.unlink(missing_ok=True)
+            
+            return audio, video_title
                 
         except Exception as e:
             logging.error(f"Erreur lors du téléchargement : {e}")
             raise
     
-    def _download_progress_hook(self, d):
-        if d['status'] == 'downloading' and self.progress_callback:
+    def open_audio_stream(self, youtube_url):
+        """Ouvre le flux audio d'une vidéo sans l'écrire sur disque
+        
+        Retourne (flux lisible, titre, durée en secondes ou None). Le format
+        WebM/Opus est préféré car ffmpeg peut le décoder au fil de la réception.
+        """
+        logging.info(f"Ouverture du flux audio : {youtube_url}")
+        
+        ydl_opts = {
+            'format': 'bestaudio[ext=webm]/bestaudio',
+            'quiet': True,
+            'no_warnings': True,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(youtube_url, download=False)
+        
+        request = urllib.request.Request(info['url'], headers=info.get('http_headers') or {})
+        reader = urllib.request.urlopen(request, timeout=60)
+        return reader, info.get('title', 'video'), info.get('duration')
+    
+    def _download_progress_hook(self, d, progress_callback):
+        if d['status'] == 'downloading':
             percent = d.get('_percent_str', '0%').strip('%')
             try:
-                self.progress_callback(float(percent))
+                progress_callback(float(percent))
             except:
                 pass
     
-    def transcribe_audio(self, audio_file, progress_callback=None):
-        """Transcrit l'audio turc en texte avec timestamps"""
-        logging.info(f"Transcription de : {audio_file}")
+    def transcribe_audio(self, audio, progress_callback=None, num_workers=None):
+        """Transcrit l'audio turc en texte avec timestamps
+        
+        audio est un tableau mono float32 (voir download_video) ou un chemin de
+        fichier média.
+        
+        Avec num_workers > 1 (par défaut ADVANCED["num_workers"] si
+        ADVANCED["sharded_transcription"] est activé), l'audio est découpé aux
+        silences et les morceaux sont transcrits dans un pool de processus.
+        """
+        logging.info(f"Transcription de : {self._describe_audio(audio)}")
+        
+        if self.server is not None:
+            try:
+                return self.server.transcribe(np.asarray(audio) if isinstance(audio, np.ndarray) else audio)
+            except ConnectionError as e:
+                self._server_lost(e)
         
         if not self.whisper_model:
             raise Exception("Le modèle Whisper n'est pas chargé")
         
+        if num_workers is None and ADVANCED["sharded_transcription"]:
+            num_workers = ADVANCED["num_workers"]
+        if num_workers and num_workers > 1:
+            return self._transcribe_sharded(audio, num_workers, progress_callback)
+        
         try:
+            audio, timeline, _ = self._load_speech_audio(audio)
+            
             # Transcription avec Whisper
-            result = self.whisper_model.transcribe(
-                str(audio_file),
-                language="tr",  # Turc
-                task="transcribe",
-                verbose=False
-            )
+            with self._whisper_lock:
+                result = self.whisper_model.transcribe(
+                    audio,
+                    language="tr",  # Turc
+                    task="transcribe",
+                    verbose=False,
+                    **whisper_decode_options()
+                )
             
             # Extraire les segments avec timestamps
             segments = []
@@ -159,7 +681,38 @@ class EmanetTranslator:
                     'end': segment['end'],
                     'text': segment['text'].strip()
                 })
+            segments = self._restore_timeline(segments, timeline)
+            
+            logging.info(f"Transcription terminée : {len(segments)} segments")
+            return segments
+            
+        except Exception as e:
+            logging.error(f"Erreur lors de la transcription : {e}")
+            raise
+    
+    def _transcribe_sharded(self, audio, num_workers, progress_callback=None):
+        """Transcription parallèle : un morceau par processus, découpé aux silences"""
+        try:
+            sample_rate = AUDIO["sample_rate"]
+            audio, timeline, _ = self._load_speech_audio(audio)
+            shards = split_at_silences(audio, sample_rate, num_workers)
+            logging.info(f"Transcription en {len(shards)} morceaux sur {num_workers} processus")
+            
+            pool = self._get_shard_pool(num_workers)
+            # Le profil est lu ici : les processus du pool ont leur propre configuration
+            decode_options = whisper_decode_options()
+            futures = {
+                pool.submit(_transcribe_shard, shard, offset / sample_rate, decode_options): i
+                for i, (offset, shard) in enumerate(shards)
+            }
+            
+            results = [None] * len(shards)
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress_callback:
+                    progress_callback(done / len(shards) * 100)
             
+            segments = self._restore_timeline(merge_shard_segments(results), timeline)
             logging.info(f"Transcription terminée : {len(segments)} segments")
             return segments
             
@@ -167,137 +720,918 @@ class EmanetTranslator:
             logging.error(f"Erreur lors de la transcription : {e}")
             raise
     
-    def translate_segments(self, segments, progress_callback=None):
-        """Traduit les segments du turc vers le français avec NLLB"""
-        logging.info(f"Traduction de {len(segments)} segments...")
+    def _load_speech_audio(self, audio):
+        """Prépare l'audio pour Whisper et, si AUDIO["vad"]["enabled"], ne garde que la parole
         
-        if not self.translation_model or not self.tokenizer:
-            raise Exception("Le modèle de traduction n'est pas chargé")
+        Un chemin de fichier est décodé à AUDIO["sample_rate"] Hz ; un tableau
+        est utilisé tel quel. Musique, silences et génériques ne sont pas
+        envoyés à Whisper : c'est plus rapide et évite des répliques inventées.
+        Retourne (audio, timeline, durée d'origine) ; timeline vaut None sans VAD.
+        """
+        sample_rate = AUDIO["sample_rate"]
+        if sample_rate != whisper.audio.SAMPLE_RATE:
+            raise ValueError(f"Whisper attend de l'audio à {whisper.audio.SAMPLE_RATE} Hz (AUDIO['sample_rate'])")
+        if not isinstance(audio, np.ndarray):
+            audio = decode_audio(audio, sample_rate)
+        duration = len(audio) / sample_rate
         
-        translated_segments = []
+        compressor = self._vad_compressor()
+        if compressor is None or len(audio) == 0:
+            return audio, None, duration
         
-        # Codes de langue pour NLLB
-        src_lang = "tur_Latn"  # Turc
-        tgt_lang = "fra_Latn"  # Français
+        speech = np.concatenate([compressor.push(audio), compressor.finish()])
+        if not compressor.regions:
+            logging.warning("VAD : aucune parole détectée, l'audio complet est transcrit")
+            return audio, None, duration
         
-        for i, segment in enumerate(segments):
+        self._log_vad(compressor)
+        return speech, compressor.timeline, duration
+    
+    @staticmethod
+    def _vad_compressor():
+        """SpeechCompressor réglé par AUDIO["vad"] (None si la VAD est désactivée)"""
+        vad = AUDIO["vad"]
+        if not vad["enabled"]:
+            return None
+        return SpeechCompressor(
+            AUDIO["sample_rate"],
+            energy_margin_db=vad["energy_margin_db"],
+            min_speech_seconds=vad["min_speech"],
+            min_silence_seconds=vad["min_silence"],
+            padding_seconds=vad["padding"]
+        )
+    
+    @staticmethod
+    def _log_vad(compressor):
+        kept = compressor.kept_fraction
+        logging.info(
+            f"VAD : {1 - kept:.0%} de l'audio ignoré (musique, silences, génériques), "
+            f"{compressor.regions} zones de parole, accélération attendue x{1 / max(kept, 0.01):.1f}"
+        )
+    
+    @staticmethod
+    def _describe_audio(audio):
+        """Description courte de l'audio pour le journal"""
+        if isinstance(audio, np.ndarray):
+            return f"{len(audio) / AUDIO['sample_rate']:.0f}s d'audio"
+        return str(audio)
+    
+    @staticmethod
+    def _restore_timeline(segments, timeline):
+        """Replace les timestamps de l'audio réduit sur la chronologie de la vidéo"""
+        if timeline is None:
+            return segments
+        restored = []
+        for segment in segments:
+            start, end = timeline.to_original_range(segment['start'], segment['end'])
+            restored.append(dict(segment, start=start, end=end))
+        return restored
+    
+    def _get_shard_pool(self, num_workers):
+        """Pool de processus réutilisé d'un épisode à l'autre (modèle chargé une seule fois)"""
+        key = (self.whisper_model_size, num_workers)
+        if self._shard_pool is None or self._shard_pool_key != key:
+            if self._shard_pool is not None:
+                self._shard_pool.shutdown()
+            # Répartir les cœurs entre les processus pour éviter la sursouscription
+            num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+            self._shard_pool = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_shard_worker,
+                initargs=(self.whisper_model_size, num_threads)
+            )
+            self._shard_pool_key = key
+        return self._shard_pool
+    
+    def iter_transcribe_audio(self, audio, checkpoint=None):
+        """Transcrit l'audio fenêtre par fenêtre (ADVANCED["transcription_window"] secondes)
+        
+        Générateur qui produit (segments, secondes traitées, durée totale) dès
+        qu'une fenêtre est décodée, pour que la traduction puisse commencer
+        sans attendre la fin de la transcription. Avec checkpoint (JobCheckpoint),
+        chaque fenêtre y est enregistrée et la transcription reprend après la
+        dernière fenêtre enregistrée (seules les nouvelles sont produites).
+        """
+        logging.info(f"Transcription par fenêtres de : {self._describe_audio(audio)}")
+        
+        if not self.whisper_model:
+            raise Exception("Le modèle Whisper n'est pas chargé")
+        
+        speech, timeline, total_seconds = self._load_speech_audio(audio)
+        yield from self._iter_transcribe_windows([speech], timeline, total_seconds, checkpoint)
+    
+    def iter_transcribe_stream(self, reader, total_seconds=None, checkpoint=None):
+        """Transcrit un flux média (réponse HTTP, fichier...) pendant sa réception
+        
+        Le flux est décodé par blocs (stream_audio), chaque bloc passe par la VAD
+        et les fenêtres partent vers Whisper dès qu'elles sont complètes. Même
+        sortie et même reprise (checkpoint) que iter_transcribe_audio ;
+        total_seconds vaut None si la durée est inconnue.
+        """
+        logging.info("Transcription du flux audio pendant sa réception")
+        
+        if not self.whisper_model:
+            raise Exception("Le modèle Whisper n'est pas chargé")
+        
+        blocks = stream_audio(reader, AUDIO["sample_rate"], ADVANCED["transcription_window"])
+        compressor = self._vad_compressor()
+        if compressor is None:
+            yield from self._iter_transcribe_windows(blocks, None, total_seconds, checkpoint)
+            return
+        
+        def speech_blocks():
+            for block in blocks:
+                yield compressor.push(block)
+            yield compressor.finish()
+        
+        yield from self._iter_transcribe_windows(speech_blocks(), compressor.timeline, total_seconds, checkpoint)
+        self._log_vad(compressor)
+    
+    def _iter_transcribe_windows(self, blocks, timeline, total_seconds, checkpoint=None):
+        """Envoie à Whisper des fenêtres de ADVANCED["transcription_window"] secondes
+        
+        blocks est un itérable de tableaux consécutifs (un seul pour un fichier,
+        plusieurs pour un flux) ; timeline replace les timestamps si la VAD a
+        retiré des passages. Avec checkpoint, l'audio déjà transcrit est sauté
+        (la VAD est déterministe : les positions restent valables).
+        """
+        sample_rate = AUDIO["sample_rate"]
+        window = int(ADVANCED["transcription_window"] * sample_rate)
+        blocks = iter(blocks)
+        buffer = np.zeros(0, dtype=np.float32)
+        # Position du début du tampon dans l'audio envoyé à Whisper (échantillons)
+        buffer_start = 0
+        exhausted = False
+        previous_text = ""
+        count = 0
+        
+        if checkpoint is not None:
+            resumed = checkpoint.transcription()
+            buffer_start = resumed["position"]
+            previous_text = resumed["prompt"]
+            if buffer_start:
+                logging.info(
+                    f"Reprise de la transcription après {len(resumed['segments'])} segments "
+                    f"({buffer_start / sample_rate:.0f}s d'audio déjà transcrites)"
+                )
+        # Échantillons déjà transcrits à sauter au début des blocs
+        skip = buffer_start
+        
+        while True:
+            # Compléter le tampon jusqu'à une fenêtre entière (ou la fin de l'audio)
+            while not exhausted and len(buffer) < window:
+                block = next(blocks, None)
+                if block is not None and skip:
+                    dropped = min(skip, len(block))
+                    block = block[dropped:]
+                    skip -= dropped
+                if block is None:
+                    exhausted = True
+                elif len(buffer) == 0:
+                    buffer = block
+                elif len(block):
+                    buffer = np.concatenate((buffer, block))
+            if len(buffer) == 0:
+                break
+            
+            chunk = buffer[:window]
+            with self._whisper_lock:
+                result = self.whisper_model.transcribe(
+                    chunk,
+                    language="tr",  # Turc
+                    task="transcribe",
+                    verbose=None,
+                    # Contexte de la fenêtre précédente pour la continuité des phrases
+                    initial_prompt=previous_text[-200:] or None,
+                    **whisper_decode_options()
+                )
+            
+            chunk_segments = result['segments']
+            consumed = len(chunk)
+            
+            # Un segment qui touche la fin de la fenêtre est probablement coupé :
+            # il est redécodé au début de la fenêtre suivante
+            more_audio = not exhausted or len(buffer) > window
+            if more_audio and len(chunk_segments) > 1:
+                last = chunk_segments[-1]
+                if last['end'] > len(chunk) / sample_rate - 1.0 and last['start'] >= 1.0:
+                    chunk_segments = chunk_segments[:-1]
+                    consumed = int(last['start'] * sample_rate)
+            
+            offset = buffer_start / sample_rate
+            segments = []
+            for segment in chunk_segments:
+                text = segment['text'].strip()
+                if text:
+                    segments.append({
+                        'start': offset + segment['start'],
+                        'end': offset + segment['end'],
+                        'text': text
+                    })
+            
+            if segments:
+                previous_text = " ".join(segment['text'] for segment in segments)
+            count += len(segments)
+            buffer = buffer[consumed:]
+            buffer_start += consumed
+            
+            done_seconds = buffer_start / sample_rate
+            if timeline is not None:
+                done_seconds = timeline.to_original(done_seconds)
+            if total_seconds:
+                done_seconds = total_seconds if exhausted and len(buffer) == 0 else min(done_seconds, total_seconds)
+            segments = self._restore_timeline(segments, timeline)
+            if checkpoint is not None:
+                checkpoint.add_transcription(segments, position=buffer_start, prompt=previous_text)
+            yield segments, done_seconds, total_seconds
+        
+        if checkpoint is not None:
+            checkpoint.add_transcription([], position=buffer_start, prompt=previous_text, complete=True)
+        logging.info(f"Transcription terminée : {count} segments")
+    
+    def translate_segments(self, segments, progress_callback=None, target_languages=None, boundaries=()):
+        """Traduit les segments du turc vers les langues target_languages avec NLLB
+
+        Les segments sont triés par longueur (en tokens) et traduits par lots de
+        ADVANCED["batch_size"] pour limiter le padding ; l'ordre d'origine est
+        restauré à la fin. Avec SUBTITLES["merge_fragments"], les fragments d'une
+        même phrase sont traduits en un seul texte, puis la traduction est
+        répartie sur leurs timings (voir group_sentence_fragments).
+        target_languages : codes NLLB (par défaut LANGUAGES["targets"]). Chaque
+        lot n'est encodé qu'une fois, puis décodé vers chaque langue. 'text'
+        contient la traduction dans la première langue ; avec plusieurs langues,
+        'translations' contient {langue: traduction} pour toutes. boundaries :
+        indices où commencent les segments d'une autre requête (serveur de
+        modèles), jamais regroupés avec ceux qui précèdent.
+        """
+        target_languages = list(target_languages or LANGUAGES["targets"])
+        logging.info(f"Traduction de {len(segments)} segments ({', '.join(target_languages)})...")
+        
+        if self.server is not None:
             try:
-                # Préparer le texte pour la traduction
-                text = segment['text']
-                
-                # Tokenizer avec le code de langue source
-                self.tokenizer.src_lang = src_lang
-                inputs = self.tokenizer(
-                    text,
-                    return_tensors="pt",
-                    padding=True,
-                    truncation=True,
-                    max_length=512
-                ).to(self.device)
-                
-                # Générer la traduction
-                with torch.no_grad():
-                    translated_tokens = self.translation_model.generate(
-                        **inputs,
-                        forced_bos_token_id=self.tokenizer.lang_code_to_id[tgt_lang],
-                        max_new_tokens=512,
-                        num_beams=5,
-                        temperature=0.9,
-                        do_sample=False
+                return self.server.translate(segments, target_languages)
+            except ConnectionError as e:
+                self._server_lost(e)
+        
+        if not self.translation_backend:
+            raise Exception("Le modèle de traduction n'est pas chargé")
+        
+        # Codes de langue pour NLLB
+        src_lang = LANGUAGES["source"]
+        
+        batch_size = max(1, LOW_MEMORY_MODE["batch_size"] if LOW_MEMORY_MODE["enabled"] else ADVANCED["batch_size"])
+        if SUBTITLES["merge_fragments"]:
+            groups = group_sentence_fragments(segments, boundaries=boundaries)
+        else:
+            groups = [[index] for index in range(len(segments))]
+        if len(groups) < len(segments):
+            logging.info(
+                f"Fragments de phrase regroupés : {len(segments)} segments -> {len(groups)} textes à traduire, "
+                f"appels à generate {math.ceil(len(segments) / batch_size)} -> {math.ceil(len(groups) / batch_size)} "
+                f"(lots de {batch_size}, avant mémoire de traduction)"
+            )
+        
+        texts = [
+            segments[group[0]]['text'] if len(group) == 1
+            else " ".join(segments[index]['text'].strip() for index in group)
+            for group in groups
+        ]
+        # Traductions de chaque texte : {langue: traduction}
+        translations = [{} for _ in texts]
+        done = 0
+        
+        # Regrouper les textes identiques : chaque réplique n'est traduite qu'une fois
+        settings = self._generation_kwargs()
+        keys = [
+            {
+                tgt_lang: TranslationCache.make_key(text, self.translation_model_name, src_lang, tgt_lang, settings)
+                for tgt_lang in target_languages
+            }
+            for text in texts
+        ]
+        indices_by_text = {}
+        for index, text_keys in enumerate(keys):
+            indices_by_text.setdefault(text_keys[target_languages[0]], []).append(index)
+        
+        new_entries = {}
+        
+        def on_translated(index, results):
+            nonlocal done
+            for duplicate in indices_by_text[keys[index][target_languages[0]]]:
+                translations[duplicate].update(results)
+                done += 1
+            for tgt_lang, translation in results.items():
+                if translation is not None:
+                    new_entries[keys[index][tgt_lang]] = translation
+            if progress_callback:
+                progress_callback(done / len(texts) * 100)
+        
+        # Consulter la mémoire de traduction avant generate
+        cached = {}
+        if self.translation_cache is not None:
+            cached = self.translation_cache.get_many(
+                key for text_keys in keys for key in text_keys.values()
+            )
+        
+        # Textes à traduire, regroupés par langues manquantes
+        pending = {}
+        for indices in indices_by_text.values():
+            text_keys = keys[indices[0]]
+            missing = tuple(tgt_lang for tgt_lang in target_languages if text_keys[tgt_lang] not in cached)
+            found = {tgt_lang: cached[key] for tgt_lang, key in text_keys.items() if key in cached}
+            for index in indices:
+                translations[index].update(found)
+            if missing:
+                pending.setdefault(missing, []).append(indices[0])
+            else:
+                done += len(indices)
+        if cached and progress_callback:
+            progress_callback(done / len(texts) * 100)
+        
+        # Trier par longueur pour regrouper des phrases de taille proche
+        lengths = {}
+        pending_indices = [index for indices in pending.values() for index in indices]
+        if pending_indices:
+            lengths = dict(zip(
+                pending_indices,
+                self.translation_backend.token_lengths([texts[i] for i in pending_indices], src_lang)
+            ))
+        
+        for tgt_langs, indices in pending.items():
+            indices.sort(key=lambda i: lengths[i])
+            for start in range(0, len(indices), batch_size):
+                self._translate_batch_with_retry(
+                    indices[start:start + batch_size], texts, src_lang, tgt_langs, on_translated
+                )
+        
+        if self.translation_cache is not None:
+            self.translation_cache.put_many(new_entries)
+            logging.info(
+                f"Mémoire de traduction : {len(indices_by_text) - len(pending_indices)}/{len(indices_by_text)} "
+                f"textes distincts trouvés ({len(texts) - len(pending_indices)} textes sans generate) - "
+                f"taux de réussite cumulé {self.translation_cache.hit_rate:.0%}"
+            )
+        
+        translated_segments = []
+        for group, results in zip(groups, translations):
+            pieces = {}
+            for tgt_lang in target_languages:
+                translation = results.get(tgt_lang)
+                if translation is None:
+                    # En cas d'erreur, garder le texte original
+                    pieces[tgt_lang] = [f"[TR] {segments[index]['text']}" for index in group]
+                elif len(group) == 1:
+                    pieces[tgt_lang] = [translation]
+                else:
+                    pieces[tgt_lang] = split_translation(
+                        translation, [len(segments[index]['text'].strip()) for index in group]
                     )
-                
-                # Décoder la traduction
-                translation = self.tokenizer.decode(
-                    translated_tokens[0],
-                    skip_special_tokens=True
+            for position, index in enumerate(group):
+                segment = {
+                    'start': segments[index]['start'],
+                    'end': segments[index]['end'],
+                    'text': pieces[target_languages[0]][position]
+                }
+                if len(target_languages) > 1:
+                    segment['translations'] = {tgt_lang: pieces[tgt_lang][position] for tgt_lang in target_languages}
+                translated_segments.append(segment)
+        
+        logging.info("Traduction terminée")
+        return translated_segments
+    
+    def _translate_batch_with_retry(self, indices, texts, src_lang, tgt_langs, on_translated):
+        """Traduit un lot ; en cas d'échec (mémoire insuffisante, etc.) le lot est coupé en deux"""
+        try:
+            translations = self._translate_batch([texts[i] for i in indices], src_lang, tgt_langs)
+        except Exception as e:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            
+            if len(indices) == 1:
+                logging.warning(f"Erreur de traduction pour le segment {indices[0]}: {e}")
+                on_translated(indices[0], {tgt_lang: None for tgt_lang in tgt_langs})
+                return
+            
+            logging.warning(f"Échec d'un lot de {len(indices)} segments ({e}), nouvel essai en deux moitiés")
+            middle = len(indices) // 2
+            self._translate_batch_with_retry(indices[:middle], texts, src_lang, tgt_langs, on_translated)
+            self._translate_batch_with_retry(indices[middle:], texts, src_lang, tgt_langs, on_translated)
+            return
+        
+        for position, index in enumerate(indices):
+            on_translated(index, {tgt_lang: translations[tgt_lang][position] for tgt_lang in tgt_langs})
+    
+    def _translate_batch(self, texts, src_lang, tgt_langs):
+        """Traduit une liste de textes vers chaque langue tgt_langs : {langue: traductions}"""
+        return self.translation_backend.translate_many(texts, src_lang, tgt_langs, self._generation_kwargs())
+    
+    def _generation_kwargs(self):
+        """Paramètres de décodage NLLB du profil DECODING["profile"]
+        
+        Ils font aussi partie de la clé de la mémoire de traduction. La longueur
+        maximale de chaque lot est calculée par le moteur à partir de
+        max_length_ratio et max_length_margin (voir TranslationBackend.translate).
+        """
+        profile = decoding_profile()
+        kwargs = {
+            'max_new_tokens': MODELS["nllb"]["max_length"],
+            'max_length_ratio': profile['max_length_ratio'],
+            'max_length_margin': profile['max_length_margin'],
+            'num_beams': profile['num_beams'],
+            'do_sample': False
+        }
+        # Sans beam search, generate ignore (et signale) ces deux paramètres ;
+        # à leur valeur par défaut, ils ne sont pas transmis
+        if profile['num_beams'] > 1:
+            if profile['length_penalty'] != 1.0:
+                kwargs['length_penalty'] = profile['length_penalty']
+            if profile['early_stopping']:
+                kwargs['early_stopping'] = True
+        return kwargs
+    
+    def transcribe_and_translate(self, source, progress_callback=None, stage_callback=None, total_seconds=None,
+                                 checkpoint=None, on_translated=None):
+        """Transcription et traduction en parallèle (producteur / consommateur)
+        
+        Un thread transcrit l'audio par fenêtres et pousse les segments dans une
+        file bornée ; la traduction par lots les consomme au fil de l'eau. La
+        durée totale tend vers max(transcription, traduction) au lieu de leur
+        somme. source est un tableau audio, un chemin, ou un flux (objet avec
+        read()) transcrit pendant sa réception ; total_seconds donne alors sa
+        durée si elle est connue. Avec checkpoint (JobCheckpoint), fenêtres
+        transcrites et lots traduits y sont enregistrés et le traitement reprend
+        là où il s'était arrêté. on_translated reçoit chaque lot traduit, dans
+        l'ordre. Retourne (segments transcrits, segments traduits).
+        """
+        segments = []
+        translated_segments = []
+        resumed = None
+        if checkpoint is not None:
+            resumed = checkpoint.transcription()
+            segments = resumed["segments"]
+            translated_segments = checkpoint.translation()
+            if segments:
+                logging.info(
+                    f"Reprise : {len(segments)} segments déjà transcrits, {len(translated_segments)} déjà traduits"
                 )
+            if translated_segments and on_translated:
+                on_translated(translated_segments)
+        
+        if resumed and resumed["complete"]:
+            windows = iter(())
+        elif hasattr(source, 'read'):
+            windows = self.iter_transcribe_stream(source, total_seconds, checkpoint)
+        else:
+            windows = self.iter_transcribe_audio(source, checkpoint)
+        started = time.time()
+        
+        segment_queue = queue.Queue(maxsize=ADVANCED["pipeline_queue_size"])
+        stop = threading.Event()
+        
+        def put(item):
+            # Ne jamais bloquer indéfiniment si le consommateur s'est arrêté
+            while not stop.is_set():
+                try:
+                    segment_queue.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+        
+        def producer():
+            try:
+                for window_segments, done_seconds, total_seconds in windows:
+                    if stop.is_set():
+                        return
+                    put((window_segments, done_seconds, total_seconds))
+                put(None)
+            except Exception as e:
+                put(e)
+        
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+        
+        # Segments transcrits avant l'interruption mais pas encore traduits
+        pending = segments[len(translated_segments):]
+        total_seconds = total_seconds or 0
+        transcription_percent = 0
+        translation_percent = 0
+        finished = False
+        batch_size = max(1, ADVANCED["batch_size"])
+        
+        try:
+            while not finished:
+                # Attendre une fenêtre, puis prendre toutes celles déjà disponibles
+                items = [segment_queue.get()]
+                while True:
+                    try:
+                        items.append(segment_queue.get_nowait())
+                    except queue.Empty:
+                        break
                 
-                translated_segments.append({
-                    'start': segment['start'],
-                    'end': segment['end'],
-                    'text': translation
-                })
-                
-                if progress_callback:
-                    progress_callback((i + 1) / len(segments) * 100)
+                for item in items:
+                    if item is None:
+                        finished = True
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        window_segments, done_seconds, total_seconds = item
+                        segments.extend(window_segments)
+                        pending.extend(window_segments)
+                        transcription_percent = done_seconds / total_seconds * 100 if total_seconds else 0
+                        if stage_callback:
+                            stage_callback("transcription", transcription_percent)
                 
-            except Exception as e:
-                logging.warning(f"Erreur de traduction pour le segment {i}: {e}")
-                # En cas d'erreur, garder le texte original
-                translated_segments.append({
-                    'start': segment['start'],
-                    'end': segment['end'],
-                    'text': f"[TR] {segment['text']}"
-                })
+                if pending and (finished or len(pending) >= batch_size):
+                    if not translated_segments:
+                        logging.info(f"Premiers sous-titres traduits après {time.time() - started:.1f}s")
+                    translated = self.translate_segments(pending)
+                    if checkpoint is not None:
+                        checkpoint.add_translation(translated)
+                    if on_translated:
+                        on_translated(translated)
+                    translated_segments.extend(translated)
+                    if total_seconds:
+                        translation_percent = min(100, pending[-1]['end'] / total_seconds * 100)
+                    pending = []
+                    if stage_callback:
+                        stage_callback("traduction", translation_percent)
+                    if progress_callback:
+                        progress_callback(
+                            f"Transcription {transcription_percent:.0f}% · Traduction {translation_percent:.0f}%",
+                            10 + 0.8 * (transcription_percent + translation_percent) / 2
+                        )
+        finally:
+            stop.set()
         
-        logging.info("Traduction terminée")
+        if stage_callback:
+            stage_callback("traduction", 100)
+        
+        return segments, translated_segments
+    
+    def open_checkpoint(self, source, model_size):
+        """Point de reprise d'un épisode (ADVANCED["resume_jobs"]), ou None
+        
+        source identifie l'épisode (identifiant YouTube ou URL). Le modèle NLLB
+        doit être chargé : ses réglages font partie de ceux du point de reprise.
+        """
+        if not ADVANCED["resume_jobs"] or self.server is not None:
+            return None
+        return JobCheckpoint.for_source(
+            Path(ADVANCED["cache_dir"]) / "jobs", source, self.job_settings(model_size)
+        )
+    
+    def job_settings(self, model_size=None):
+        """Réglages dont dépendent la transcription et la traduction d'un épisode
+        
+        Partagés par les points de reprise et l'index des épisodes traités
+        (ingest.py). Le modèle NLLB doit être chargé.
+        """
+        return {
+            "transcription": self.transcription_settings(model_size),
+            "translation": {
+                "model": self.translation_model_name,
+                "generation": self._generation_kwargs(),
+                "merge": [SUBTITLES["merge_fragments"], SUBTITLES["merge_max_gap"]],
+                "languages": [LANGUAGES["source"], LANGUAGES["targets"]],
+            },
+        }
+    
+    def transcribe_checkpointed(self, audio, checkpoint, progress_callback=None):
+        """Transcription enregistrée fenêtre par fenêtre dans checkpoint (reprise après interruption)
+        
+        La transcription par morceaux (ADVANCED["sharded_transcription"]) n'est
+        enregistrée qu'une fois terminée.
+        """
+        resumed = checkpoint.transcription()
+        if resumed["complete"]:
+            logging.info(f"Reprise : transcription déjà terminée ({len(resumed['segments'])} segments)")
+            return resumed["segments"]
+        
+        if ADVANCED["sharded_transcription"]:
+            segments = self.transcribe_audio(audio, progress_callback)
+            checkpoint.add_transcription(segments, complete=True)
+            return segments
+        
+        segments = resumed["segments"]
+        for window_segments, done_seconds, total_seconds in self.iter_transcribe_audio(audio, checkpoint):
+            segments.extend(window_segments)
+            if progress_callback and total_seconds:
+                progress_callback(done_seconds / total_seconds * 100)
+        return segments
+    
+    def translate_in_chunks(self, segments, checkpoint=None, on_translated=None, progress_callback=None):
+        """Traduction par paquets de ADVANCED["checkpoint_segments"] segments
+        
+        Chaque paquet est enregistré dans checkpoint (reprise après interruption)
+        et passé à on_translated (ex. SrtWriter.write) dès qu'il est traduit ;
+        les paquets déjà traduits avant une interruption le sont en premier.
+        """
+        translated_segments = checkpoint.translation() if checkpoint is not None else []
+        if translated_segments:
+            logging.info(f"Reprise : {len(translated_segments)}/{len(segments)} segments déjà traduits")
+            if on_translated:
+                on_translated(translated_segments)
+        
+        chunk = max(1, ADVANCED["checkpoint_segments"])
+        for start in range(len(translated_segments), len(segments), chunk):
+            translated = self.translate_segments(segments[start:start + chunk])
+            if checkpoint is not None:
+                checkpoint.add_translation(translated)
+            if on_translated:
+                on_translated(translated)
+            translated_segments.extend(translated)
+            if progress_callback:
+                progress_callback(len(translated_segments) / len(segments) * 100)
         return translated_segments
     
+    def transcription_settings(self, model_size=None):
+        """Réglages dont dépend la transcription : modèle Whisper, profil de décodage, VAD et fenêtres"""
+        return {
+            "whisper": model_size or self.whisper_model_size,
+            "decode": whisper_decode_options(),
+            "vad": AUDIO["vad"],
+            "window": ADVANCED["transcription_window"],
+        }
+    
+    def get_cached_transcription(self, source_id, model_size, refresh=False):
+        """Retourne la transcription en cache d'une source, ou None
+        
+        source_id vaut "youtube:<id>" ou "sha256:<empreinte de l'audio>".
+        Seule une transcription faite avec les mêmes réglages (profil de
+        décodage, VAD...) est réutilisée. refresh supprime d'abord les entrées
+        existantes de cette source.
+        """
+        if self.transcription_cache is None or not source_id:
+            return None
+        if refresh:
+            self.transcription_cache.invalidate(source_id)
+            return None
+        return self.transcription_cache.get(source_id, model_size, "tr", self.transcription_settings(model_size))
+    
+    def save_transcription(self, source_id, model_size, video_title, segments):
+        """Enregistre une transcription dans le cache (si activé)"""
+        if self.transcription_cache is not None and source_id:
+            self.transcription_cache.put(
+                source_id, model_size, "tr", video_title, segments, self.transcription_settings(model_size)
+            )
+    
+    def subtitle_filename(self, video_title, language=None):
+        """Nom du fichier SRT pour un titre de vidéo et une langue (par défaut la première de LANGUAGES["targets"])"""
+        language = language or LANGUAGES["targets"][0]
+        suffix = LANGUAGES["suffixes"].get(language) or language.split("_")[0].upper()
+        safe_title = "".join(c for c in video_title if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        return f"{safe_title}_{suffix}.srt"
+    
     def create_srt_file(self, segments, output_filename):
         """Crée un fichier SRT à partir des segments traduits"""
         logging.info(f"Création du fichier SRT : {output_filename}")
         
-        srt_segments = []
-        for i, segment in enumerate(segments, 1):
-            srt_segment = srt.Subtitle(
-                index=i,
-                start=timedelta(seconds=segment['start']),
-                end=timedelta(seconds=segment['end']),
-                content=segment['text']
-            )
-            srt_segments.append(srt_segment)
-        
-        # Écrire le fichier SRT
-        srt_content = srt.compose(srt_segments)
         output_path = self.output_dir / output_filename
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(srt_content)
+        with SrtWriter(output_path) as writer:
+            writer.write(segments)
         
         logging.info(f"Fichier SRT créé : {output_path}")
         return output_path
     
-    def process_video(self, youtube_url, model_size="base", translation_model_size="small", progress_callback=None):
-        """Processus complet : téléchargement -> transcription -> traduction -> SRT"""
+    def open_srt_writers(self, video_title, on_publish=None):
+        """SRT d'une vidéo dans chaque langue de LANGUAGES["targets"], publiés toutes
+        les SUBTITLES["publish_interval"] secondes (on_publish : première langue)"""
+        languages = LANGUAGES["targets"]
+        return SrtWriterGroup([
+            SrtWriter(
+                self.output_dir / self.subtitle_filename(video_title, language),
+                publish_interval=SUBTITLES["publish_interval"],
+                on_publish=on_publish if position == 0 else None,
+                # La première langue est aussi dans 'text'
+                language=language if position > 0 else None
+            )
+            for position, language in enumerate(languages)
+        ])
+    
+    def process_video(self, youtube_url, model_size="base", translation_model_size="small",
+                      progress_callback=None, refresh_transcription=False, stage_callback=None,
+                      subtitle_callback=None, downloaded=None, metrics=None):
+        """Processus complet : téléchargement -> transcription -> traduction -> SRT
+        
+        Si la transcription de la vidéo est déjà en cache (même modèle Whisper),
+        le téléchargement et la transcription sont ignorés. refresh_transcription
+        force à refaire les deux. stage_callback(étape, pourcentage) reçoit
+        l'avancement de la transcription et de la traduction séparément.
+        Avec AUDIO["streaming_ingest"], une vidéo YouTube est transcrite pendant
+        la réception de son flux audio, sans attendre la fin du téléchargement.
+        Avec LOW_MEMORY_MODE["enabled"], voir process_low_memory. Avec
+        ADVANCED["resume_jobs"], un épisode interrompu reprend au dernier
+        morceau enregistré (voir open_checkpoint).
+        Le SRT est publié au fil de la traduction (voir SrtWriter) :
+        subtitle_callback(chemin, secondes couvertes) est appelé à chaque
+        publication, par exemple pour lancer VLC avant la fin du traitement.
+        Un SRT est écrit pour chaque langue de LANGUAGES["targets"] ; le chemin
+        retourné est celui de la première.
+        downloaded : (audio, titre) déjà téléchargés (ex. téléchargement anticipé
+        de la file d'attente, voir scheduler.JobQueue). metrics : JobMetrics à
+        remplir au lieu d'en créer une.
+        Si un serveur de modèles est connecté, tout le traitement y est fait.
+        """
+        if self.server is not None:
+            try:
+                return self.server.process_video(
+                    youtube_url, model_size, translation_model_size,
+                    progress_callback=progress_callback,
+                    refresh_transcription=refresh_transcription,
+                    stage_callback=stage_callback,
+                    subtitle_callback=subtitle_callback
+                )
+            except ConnectionError as e:
+                self._server_lost(e)
+        
+        workdir = None
+        writer = None
+        # Mesures par étape (metrics.py) : le temps restant est ajouté aux messages
+        metrics = metrics or self.metrics.job(youtube_url, progress_callback)
+        metrics.start_ticker()
         try:
-            # 1. Charger le modèle Whisper si nécessaire
-            if not self.whisper_model:
+            audio = None
+            translated_segments = None
+            # La transcription par morceaux produit tout d'un coup : pas de recouvrement
+            pipelined = ADVANCED["streaming_pipeline"] and not ADVANCED["sharded_transcription"]
+            whisper_size = model_size
+            video_id = extract_video_id(youtube_url)
+            source_id = f"youtube:{video_id}" if video_id else None
+            cached = self.get_cached_transcription(source_id, whisper_size, refresh_transcription)
+            
+            if LOW_MEMORY_MODE["enabled"]:
+                # Whisper puis NLLB, jamais les deux en mémoire ; SRT écrit pendant la traduction
+                workdir = self.temp_dir / f"job_{video_id or uuid.uuid4().hex[:8]}"
+                
+                def load_audio():
+                    nonlocal source_id
+                    audio, title = downloaded or self.download_video(youtube_url, output_dir=workdir)
+                    if self.transcription_cache is not None and not source_id:
+                        source_id = f"sha256:{audio_sha256(audio)}"
+                    return audio, title
+                
+                segments, video_title, srt_path = self.process_low_memory(
+                    model_size, translation_model_size,
+                    load_audio=load_audio,
+                    segments=cached['segments'] if cached else None,
+                    title=cached['title'] if cached else None,
+                    metrics=metrics,
+                    subtitle_callback=subtitle_callback
+                )
+                if not cached:
+                    self.save_transcription(source_id, whisper_size, video_title, segments)
+                metrics.finish("ok", srt=str(srt_path))
                 if progress_callback:
-                    progress_callback("Chargement du modèle Whisper...", 0)
-                self.load_whisper_model(model_size)
+                    progress_callback("Terminé !", 100)
+                return srt_path
+            
+            # 1. Charger le modèle Whisper si nécessaire (inutile si la transcription est en cache)
+            if not cached and (not self.whisper_model or self.whisper_model_size != model_size):
+                metrics.report("Chargement du modèle Whisper...", 0)
+                with metrics.stage("load_whisper", model=f"whisper-{model_size}"):
+                    self.load_whisper_model(model_size)
             
             # 2. Charger le modèle de traduction si nécessaire
-            if not self.translation_model:
-                if progress_callback:
-                    progress_callback("Chargement du modèle de traduction NLLB...", 5)
-                self.load_translation_model(translation_model_size)
+            if not self.translation_backend or self.translation_model_size != translation_model_size:
+                metrics.report("Chargement du modèle de traduction NLLB...", 5)
+                with metrics.stage("load_translation", model=f"nllb-{translation_model_size}"):
+                    self.load_translation_model(translation_model_size)
             
-            # 3. Télécharger la vidéo
-            if progress_callback:
-                progress_callback("Téléchargement de la vidéo...", 10)
-            audio_file, video_title = self.download_video(youtube_url)
+            # Audio, transcription et traduction enregistrés par morceaux pour la reprise
+            checkpoint = self.open_checkpoint(source_id or youtube_url, whisper_size)
             
-            # 4. Transcrire l'audio
-            if progress_callback:
-                progress_callback("Transcription audio...", 30)
-            segments = self.transcribe_audio(audio_file)
+            # Avancement de la transcription et de la traduction en parallèle
+            percents = {}
             
-            # 5. Traduire les segments
-            if progress_callback:
-                progress_callback("Traduction en français...", 60)
-            translated_segments = self.translate_segments(segments)
+            def pipeline_stage(stage, value):
+                percents[stage] = value
+                metrics.update("pipeline", (percents.get("transcription", 0) + percents.get("traduction", 0)) / 2, 100)
+                if stage_callback:
+                    stage_callback(stage, value)
             
-            # 6. Créer le fichier SRT
-            if progress_callback:
-                progress_callback("Création des sous-titres...", 90)
-            safe_title = "".join(c for c in video_title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            srt_filename = f"{safe_title}_FR.srt"
-            srt_path = self.create_srt_file(translated_segments, srt_filename)
+            def pipeline_progress(message, value=None):
+                metrics.report(message, value)
             
-            # 7. Nettoyer les fichiers temporaires
-            if audio_file.exists():
-                audio_file.unlink()
+            if cached:
+                logging.info(
+                    f"Transcription trouvée dans le cache ({len(cached['segments'])} segments) : "
+                    "téléchargement et transcription ignorés"
+                )
+                segments = cached['segments']
+                video_title = cached['title']
+                metrics.plan = ["translation", "srt"]
+                metrics.audio_seconds = segments[-1]['end'] if segments else None
+            elif pipelined and AUDIO["streaming_ingest"] and video_id and downloaded is None:
+                # 3-5. Transcrire et traduire pendant la réception du flux audio
+                metrics.report("Réception du flux audio...", 10)
+                reader, video_title, duration = self.open_audio_stream(youtube_url)
+                metrics.plan = ["pipeline", "srt"]
+                metrics.audio_seconds = duration
+                writer = self.open_srt_writers(video_title, subtitle_callback)
+                try:
+                    with metrics.stage("pipeline", audio_seconds=duration) as record:
+                        tokens = self._generated_tokens()
+                        segments, translated_segments = self.transcribe_and_translate(
+                            reader,
+                            progress_callback=pipeline_progress,
+                            stage_callback=pipeline_stage,
+                            total_seconds=duration,
+                            checkpoint=checkpoint,
+                            on_translated=writer.write
+                        )
+                        self._count_translation(record, segments, tokens)
+                finally:
+                    reader.close()
+                self.save_transcription(source_id, whisper_size, video_title, segments)
+            else:
+                # 3. Télécharger la vidéo
+                if pipelined:
+                    metrics.plan = ["download", "pipeline", "srt"]
+                else:
+                    metrics.plan = ["download", "transcription", "translation", "srt"]
+                metrics.report("Téléchargement de la vidéo...", 10)
+                workdir = self.temp_dir / f"job_{video_id or uuid.uuid4().hex[:8]}"
+                with metrics.stage("download") as record:
+                    resumed = checkpoint.load_audio() if checkpoint is not None else None
+                    if resumed:
+                        logging.info("Reprise : audio déjà téléchargé et décodé")
+                        audio, video_title = resumed
+                    else:
+                        audio, video_title = downloaded or self.download_video(youtube_url, output_dir=workdir)
+                        if checkpoint is not None:
+                            audio = checkpoint.save_audio(audio, video_title)
+                    record["audio_seconds"] = len(audio) / AUDIO["sample_rate"]
+                metrics.audio_seconds = record["audio_seconds"]
+                
+                # Sans identifiant YouTube, la clé est l'empreinte de l'audio
+                if self.transcription_cache is not None and not source_id:
+                    source_id = f"sha256:{audio_sha256(audio)}"
+                    cached = self.get_cached_transcription(source_id, whisper_size, refresh_transcription)
+                
+                if cached:
+                    logging.info("Transcription trouvée dans le cache pour cet audio")
+                    segments = cached['segments']
+                    metrics.plan = ["download", "translation", "srt"]
+            
+            if writer is None:
+                # Sous-titres publiés au fil de la traduction
+                writer = self.open_srt_writers(video_title, subtitle_callback)
             
+            if cached:
+                # 4. Traduire les segments déjà transcrits
+                metrics.report("Traduction en français...", 60)
+                with metrics.stage("translation", audio_seconds=metrics.audio_seconds) as record:
+                    tokens = self._generated_tokens()
+                    translated_segments = self.translate_in_chunks(segments, checkpoint, on_translated=writer.write)
+                    self._count_translation(record, segments, tokens)
+            elif translated_segments is None:
+                if pipelined:
+                    # 4-5. Transcrire et traduire en parallèle
+                    metrics.report("Transcription et traduction...", 10)
+                    with metrics.stage("pipeline", audio_seconds=metrics.audio_seconds) as record:
+                        tokens = self._generated_tokens()
+                        segments, translated_segments = self.transcribe_and_translate(
+                            audio,
+                            progress_callback=pipeline_progress,
+                            stage_callback=pipeline_stage,
+                            checkpoint=checkpoint,
+                            on_translated=writer.write
+                        )
+                        self._count_translation(record, segments, tokens)
+                else:
+                    # 4. Transcrire l'audio
+                    metrics.report("Transcription audio...", 30)
+                    with metrics.stage("transcription", audio_seconds=metrics.audio_seconds) as record:
+                        if checkpoint is not None:
+                            segments = self.transcribe_checkpointed(audio, checkpoint)
+                        else:
+                            segments = self.transcribe_audio(audio)
+                        record["segments"] = len(segments)
+                    
+                    # 5. Traduire les segments
+                    metrics.report("Traduction en français...", 60)
+                    with metrics.stage("translation", audio_seconds=metrics.audio_seconds) as record:
+                        tokens = self._generated_tokens()
+                        translated_segments = self.translate_in_chunks(
+                            segments, checkpoint, on_translated=writer.write
+                        )
+                        self._count_translation(record, segments, tokens)
+                
+                self.save_transcription(source_id, whisper_size, video_title, segments)
+            
+            # 6. Publier le fichier SRT complet
+            metrics.report("Création des sous-titres...", 90)
+            with metrics.stage("srt", segments=len(translated_segments)):
+                writer.close()
+            srt_path = writer.path
+            logging.info(
+                f"Fichier SRT créé : {', '.join(str(path) for path in writer.paths)} ({writer.count} sous-titres)"
+            )
+            if checkpoint is not None:
+                checkpoint.clear()
+            
+            metrics.finish("ok", srt=str(srt_path))
             if progress_callback:
                 progress_callback("Terminé !", 100)
             
@@ -305,7 +1639,106 @@ class EmanetTranslator:
             
         except Exception as e:
             logging.error(f"Erreur dans le processus : {e}")
+            metrics.finish("error", error=e)
             raise
+        
+        finally:
+            # 7. Nettoyer les fichiers temporaires
+            audio = None
+            if writer is not None:
+                writer.abort()
+            if workdir and not ADVANCED["keep_temp_files"]:
+                shutil.rmtree(workdir, ignore_errors=True)
+    
+    def process_low_memory(self, model_size, translation_model_size, load_audio=None,
+                           segments=None, title=None, metrics=None, progress_callback=None,
+                           subtitle_callback=None):
+        """Mode économie de mémoire (LOW_MEMORY_MODE) : un seul modèle chargé à la fois
+        
+        1. Whisper seul : NLLB est libéré, load_audio() -> (audio, titre) fournit
+           l'audio, transcrit sur un seul processus ; Whisper et l'audio sont
+           ensuite libérés.
+        2. NLLB seul : traduction par paquets de LOW_MEMORY_MODE["translation_chunk"]
+           segments (lots de LOW_MEMORY_MODE["batch_size"]), chaque paquet est
+           écrit dans le SRT dès qu'il est traduit.
+        Avec segments (transcription en cache), l'étape 1 est sautée. Le pic de
+        mémoire de chaque étape est comparé à LOW_MEMORY_MODE["memory_budget_mb"].
+        subtitle_callback : voir process_video.
+        Retourne (segments transcrits, titre, chemin du SRT).
+        """
+        metrics = metrics or self.metrics.job(title or "", progress_callback)
+        budget = LOW_MEMORY_MODE["memory_budget_mb"]
+        
+        def check_budget(record):
+            if budget and record["peak_rss_mb"] > budget:
+                logging.warning(
+                    f"Étape {record['stage']} : pic de mémoire {record['peak_rss_mb']:.0f} Mo "
+                    f"au-delà du budget de {budget} Mo"
+                )
+        
+        if segments is None:
+            metrics.plan = ["download", "transcription", "translation"]
+            self.unload_translation_model()
+            if not self.whisper_model or self.whisper_model_size != model_size:
+                metrics.report("Chargement du modèle Whisper...", 0)
+                with metrics.stage("load_whisper", model=f"whisper-{model_size}") as record:
+                    self.load_whisper_model(model_size)
+                check_budget(record)
+            
+            metrics.report("Téléchargement de la vidéo...", 10)
+            with metrics.stage("download") as record:
+                audio, title = load_audio()
+                record["audio_seconds"] = metrics.audio_seconds = len(audio) / AUDIO["sample_rate"]
+            check_budget(record)
+            
+            metrics.report("Transcription audio...", 30)
+            with metrics.stage("transcription", audio_seconds=metrics.audio_seconds) as record:
+                segments = self.transcribe_audio(audio, num_workers=1)
+                record["segments"] = len(segments)
+                audio = None
+            check_budget(record)
+            self.unload_whisper_model()
+        else:
+            metrics.plan = ["translation"]
+            metrics.audio_seconds = segments[-1]['end'] if segments else None
+            self.unload_whisper_model()
+        
+        if not self.translation_backend or self.translation_model_size != translation_model_size:
+            metrics.report("Chargement du modèle de traduction NLLB...", 55)
+            with metrics.stage("load_translation", model=f"nllb-{translation_model_size}") as record:
+                self.load_translation_model(translation_model_size)
+            check_budget(record)
+        
+        writer = self.open_srt_writers(title, subtitle_callback)
+        output_path = writer.path
+        chunk = max(1, LOW_MEMORY_MODE["translation_chunk"])
+        logging.info(f"Création du fichier SRT au fil de la traduction : {output_path}")
+        with metrics.stage("translation", audio_seconds=metrics.audio_seconds) as record, writer:
+            tokens = self._generated_tokens()
+            for start in range(0, len(segments), chunk):
+                writer.write(self.translate_segments(segments[start:start + chunk]))
+                done = min(len(segments), start + chunk)
+                metrics.update("translation", done, len(segments))
+                metrics.report(f"Traduction en français... {done}/{len(segments)}", 60 + 35 * done / len(segments))
+            self._count_translation(record, segments, tokens)
+        check_budget(record)
+        logging.info(
+            f"Fichier SRT créé : {', '.join(str(path) for path in writer.paths)} ({writer.count} sous-titres)"
+        )
+        return segments, title, output_path
+    
+    def _generated_tokens(self):
+        """Tokens générés par le moteur de traduction local (None avec le serveur de modèles)"""
+        if self.translation_backend is None:
+            return None
+        return self.translation_backend.generated_tokens
+    
+    def _count_translation(self, record, segments, tokens_before):
+        """Complète la mesure d'une étape de traduction (segments, tokens générés)"""
+        record["segments"] = len(segments)
+        tokens = self._generated_tokens()
+        if tokens is not None and tokens_before is not None:
+            record["tokens"] = tokens - tokens_before
     
     def open_in_vlc(self, video_url, srt_path):
         """Ouvre la vidéo YouTube dans VLC avec les sous-titres"""
@@ -326,18 +1759,86 @@ class EmanetTranslator:
             raise
 
 
+class UiEventQueue:
+    """Événements des threads de travail vers l'interface Tk
+    
+    Seul le thread Tk touche aux widgets : les autres threads déposent leurs
+    événements avec put et EmanetGUI.check_queue les récupère avec drain toutes
+    les ADVANCED["ui_refresh_ms"] millisecondes. Les événements sont rendus
+    dans leur ordre d'arrivée. L'avancement ("progress", "stage",
+    "subtitles") est regroupé : seule la dernière valeur de chacun est gardée,
+    mais jamais par-dessus un autre événement ("log", "job"...), transmis
+    tels quels. Ainsi la remise à zéro d'un épisode qui démarre ("job") ne
+    passe pas après son premier avancement.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Avancement regroupé depuis le dernier événement transmis tel quel
+        self._latest = {}
+        self._events = []
+    
+    def put(self, event):
+        kind = event[0]
+        with self._lock:
+            if kind == "progress":
+                # ("progress", message, valeur) : message vide ou valeur None ne remplacent rien
+                message, value = event[1:]
+                if message:
+                    self._latest["status"] = ("status", message)
+                if value is not None:
+                    self._latest["progress"] = ("progress", value)
+            elif kind == "stage":
+                self._latest[("stage", event[1])] = event
+            elif kind == "subtitles":
+                self._latest["subtitles"] = event
+            else:
+                self._seal()
+                self._events.append(event)
+    
+    def _seal(self):
+        """Clôt la série d'avancement en cours (appelé avec le verrou)"""
+        if self._latest:
+            self._events.extend(self._latest.values())
+            self._latest = {}
+    
+    def drain(self):
+        """Événements en attente depuis le dernier appel, dans l'ordre d'arrivée"""
+        with self._lock:
+            self._seal()
+            events = self._events
+            self._events = []
+        return events
+
+
 class EmanetGUI:
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Emanet Subtitle Translator")
-        self.root.geometry("800x600")
+        self.root.geometry("800x760")
         
         self.translator = EmanetTranslator()
-        self.processing = False
-        self.queue = queue.Queue()
+        self.queue = UiEventQueue()
+        
+        # File d'attente des épisodes : ses threads passent par self.queue
+        from scheduler import JobQueue
+        self.job_queue = JobQueue(
+            self.translator,
+            on_event=lambda job, message: self.queue.put(("job", job, message)),
+            progress_callback=self._on_job_progress,
+            stage_callback=lambda job, stage, value: self.queue.put(("stage", stage, value)),
+            subtitle_callback=lambda job, path, covered: self.queue.put(("subtitles", job.url, str(path), covered))
+        )
         
         self.setup_ui()
         
+        # Imports et modèles préparés pendant que l'utilisateur colle l'URL
+        self.warmup_thread = threading.Thread(
+            target=self.warm_up,
+            args=(self.model_var.get(), self.translation_var.get()),
+            daemon=True
+        )
+        
     def setup_ui(self):
         """Configure l'interface utilisateur"""
         # Style
@@ -411,15 +1912,15 @@ class EmanetGUI:
         translation_combo = ttk.Combobox(
             options_frame,
             textvariable=self.translation_var,
-            values=["small", "medium", "large"],
+            values=TRANSLATION_MODEL_SIZES,
             state="readonly",
-            width=10
+            width=12
         )
         translation_combo.grid(row=1, column=1, sticky=tk.W, pady=(10, 0))
         
         translation_info = ttk.Label(
             options_frame,
-            text="(small=600M, medium=1.3GB, large=3.3GB)",
+            text="(small=600M, medium=1.3GB, large=3.3GB ; -int8 : CPU, ~4x moins de RAM)",
             font=('Arial', 9, 'italic')
         )
         translation_info.grid(row=1, column=2, padx=(10, 0), pady=(10, 0))
@@ -453,10 +1954,52 @@ class EmanetGUI:
         )
         self.progress_bar.pack(fill=tk.X, pady=(0, 10))
         
+        # Avancement de chaque étape du pipeline
+        stages_frame = ttk.Frame(main_frame)
+        stages_frame.pack(fill=tk.X, pady=(0, 10))
+        stages_frame.columnconfigure(1, weight=1)
+        
+        self.stage_vars = {}
+        for row, (stage, label) in enumerate([("transcription", "Transcription :"), ("traduction", "Traduction :")]):
+            ttk.Label(stages_frame, text=label, font=('Arial', 9)).grid(row=row, column=0, sticky=tk.W, padx=(0, 10))
+            self.stage_vars[stage] = tk.DoubleVar()
+            ttk.Progressbar(
+                stages_frame,
+                variable=self.stage_vars[stage],
+                maximum=100
+            ).grid(row=row, column=1, sticky=tk.EW, pady=2)
+        
         # Status label
         self.status_label = ttk.Label(main_frame, text="Prêt", font=('Arial', 10))
         self.status_label.pack()
         
+        # File d'attente : épisodes ajoutés, en cours et terminés
+        jobs_frame = ttk.LabelFrame(main_frame, text="File d'attente", padding="10")
+        jobs_frame.pack(fill=tk.X, pady=(10, 10))
+        
+        self.job_tree = ttk.Treeview(
+            jobs_frame,
+            columns=("status", "elapsed", "speed"),
+            height=4,
+            selectmode="browse"
+        )
+        self.job_tree.heading("#0", text="Épisode")
+        self.job_tree.heading("status", text="État")
+        self.job_tree.heading("elapsed", text="Durée")
+        self.job_tree.heading("speed", text="Débit")
+        self.job_tree.column("#0", width=300)
+        self.job_tree.column("status", width=180)
+        self.job_tree.column("elapsed", width=70)
+        self.job_tree.column("speed", width=120)
+        self.job_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.job_tree.bind("<<TreeviewSelect>>", self.on_job_selected)
+        
+        jobs_buttons = ttk.Frame(jobs_frame)
+        jobs_buttons.pack(side=tk.RIGHT, padx=(10, 0))
+        ttk.Button(jobs_buttons, text="Monter", command=lambda: self.move_job(-1)).pack(fill=tk.X)
+        ttk.Button(jobs_buttons, text="Descendre", command=lambda: self.move_job(1)).pack(fill=tk.X, pady=5)
+        ttk.Button(jobs_buttons, text="Annuler", command=self.cancel_job).pack(fill=tk.X)
+        
         # Log text
         log_frame = ttk.LabelFrame(main_frame, text="Journal", padding="10")
         log_frame.pack(fill=tk.BOTH, expand=True)
@@ -471,6 +2014,8 @@ class EmanetGUI:
         # Variables
         self.current_srt_path = None
         self.current_video_url = None
+        # Vidéo dont les premières minutes ont déjà été annoncées
+        self.previewed_url = None
         
     def paste_url(self):
         """Colle l'URL du presse-papiers"""
@@ -481,24 +2026,35 @@ class EmanetGUI:
         except:
             pass
     
+    def warm_up(self, model_size, translation_model_size):
+        """Importe les bibliothèques lourdes puis charge les modèles choisis, en arrière-plan"""
+        start = time.time()
+        try:
+            # Avec le serveur de modèles, rien de lourd n'est nécessaire dans ce processus
+            if self.translator.server is None:
+                import_heavy_modules()
+                self.queue.put(("log", f"Bibliothèques importées en {time.time() - start:.1f}s"))
+            if ADVANCED["preload_models"]:
+                self.translator.load_whisper_model(model_size)
+                # En mode économie de mémoire, NLLB n'est chargé qu'après la transcription
+                if not LOW_MEMORY_MODE["enabled"]:
+                    self.translator.load_translation_model(translation_model_size)
+                self.queue.put(("log", f"Modèles prêts en {time.time() - start:.1f}s"))
+        except Exception as e:
+            self.queue.put(("log", f"Préchargement interrompu : {e}"))
+    
     def log(self, message):
-        """Ajoute un message au journal"""
+        """Ajoute un message au journal (thread Tk uniquement, sinon self.queue)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+        # Journal borné : les lignes les plus anciennes sont supprimées
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - ADVANCED["log_max_lines"]
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
         self.log_text.see(tk.END)
-        self.root.update()
-    
-    def update_progress(self, message, value):
-        """Met à jour la barre de progression"""
-        self.status_label.config(text=message)
-        self.progress_var.set(value)
-        self.root.update()
     
     def start_processing(self):
-        """Lance le processus de traduction dans un thread séparé"""
-        if self.processing:
-            return
-        
+        """Ajoute l'URL à la file d'attente (traitée dès que les épisodes précédents sont finis)"""
         url = self.url_entry.get().strip()
         if not url:
             messagebox.showerror("Erreur", "Veuillez entrer une URL YouTube")
@@ -508,45 +2064,70 @@ class EmanetGUI:
             messagebox.showerror("Erreur", "L'URL doit être une vidéo YouTube")
             return
         
-        self.processing = True
-        self.process_button.config(state=tk.DISABLED)
-        self.vlc_button.config(state=tk.DISABLED)
-        self.current_video_url = url
-        
-        # Lancer dans un thread
-        thread = threading.Thread(target=self.process_video_thread, args=(url,))
-        thread.daemon = True
-        thread.start()
+        job = self.job_queue.submit(url, self.model_var.get(), self.translation_var.get())
+        self.refresh_job(job)
+        self.url_entry.delete(0, tk.END)
+        if self.warmup_thread.is_alive():
+            self.status_label.config(text="Chargement des modèles...")
     
-    def process_video_thread(self, url):
-        """Thread de traitement de la vidéo"""
-        try:
-            self.log(f"Début du traitement de : {url}")
-            
-            def progress_callback(message, value=None):
-                if isinstance(message, (int, float)):
-                    # C'est une valeur de progression
-                    self.queue.put(("progress", "", message))
-                else:
-                    # C'est un message avec valeur
-                    self.queue.put(("progress", message, value))
-            
-            # Lancer le traitement
-            srt_path = self.translator.process_video(
-                url,
-                model_size=self.model_var.get(),
-                translation_model_size=self.translation_var.get(),
-                progress_callback=progress_callback
-            )
-            
-            self.current_srt_path = srt_path
-            self.queue.put(("complete", str(srt_path)))
-            
-        except Exception as e:
-            self.queue.put(("error", str(e)))
-        
-        finally:
-            self.processing = False
+    def _start_job_queue(self):
+        """Démarre la file d'attente une fois les modèles préchargés"""
+        self.warmup_thread.join()
+        self.job_queue.start()
+    
+    def _on_job_progress(self, job, message, value=None):
+        if isinstance(message, (int, float)):
+            # C'est une valeur de progression
+            self.queue.put(("progress", None, message))
+        else:
+            # C'est un message avec valeur
+            self.queue.put(("progress", message, value))
+    
+    def selected_job(self):
+        """Épisode sélectionné dans la file d'attente, ou None"""
+        selection = self.job_tree.selection()
+        if not selection:
+            return None
+        return self.job_queue.jobs[int(selection[0]) - 1]
+    
+    def on_job_selected(self, event=None):
+        """Un épisode terminé sélectionné devient celui ouvert dans VLC"""
+        job = self.selected_job()
+        if job is not None and job.srt_path:
+            self.current_srt_path = job.srt_path
+            self.current_video_url = job.url
+            self.vlc_button.config(state=tk.NORMAL)
+    
+    def move_job(self, offset):
+        """Déplace l'épisode sélectionné dans la file d'attente"""
+        job = self.selected_job()
+        if job is None or not self.job_queue.move(job, offset):
+            return
+        pending = self.job_queue.pending
+        ordered = [other for other in self.job_queue.jobs if other not in pending] + pending
+        for position, other in enumerate(ordered):
+            self.job_tree.move(str(other.index), "", position)
+    
+    def cancel_job(self):
+        """Annule l'épisode sélectionné s'il est encore en attente"""
+        job = self.selected_job()
+        if job is None:
+            return
+        if not self.job_queue.cancel(job) and not job.done:
+            self.log(f"Episode {job.index} en cours : il ne peut plus être annulé")
+    
+    def refresh_job(self, job):
+        """Met à jour la ligne d'un épisode dans la file d'attente"""
+        iid = str(job.index)
+        values = (
+            job.status,
+            format_duration(job.elapsed) if job.elapsed is not None else "",
+            f"x{job.speed:.1f} temps réel" if job.speed else ""
+        )
+        if self.job_tree.exists(iid):
+            self.job_tree.item(iid, text=job.title or job.url, values=values)
+        else:
+            self.job_tree.insert("", tk.END, iid=iid, text=job.title or job.url, values=values)
     
     def open_in_vlc(self):
         """Ouvre la vidéo dans VLC avec les sous-titres"""
@@ -560,47 +2141,89 @@ class EmanetGUI:
             messagebox.showerror("Erreur", f"Impossible de lancer VLC : {e}")
     
     def check_queue(self):
-        """Vérifie la file des messages du thread"""
-        try:
-            while True:
-                msg_type, *args = self.queue.get_nowait()
-                
-                if msg_type == "progress":
-                    if len(args) == 2:
-                        self.update_progress(args[0], args[1])
-                    else:
-                        self.progress_var.set(args[0])
-                
-                elif msg_type == "complete":
-                    srt_path = args[0]
-                    self.log(f"Sous-titres créés : {srt_path}")
-                    self.status_label.config(text="Traduction terminée !")
-                    self.progress_var.set(100)
-                    self.process_button.config(state=tk.NORMAL)
+        """Applique les événements des threads (au plus un rafraîchissement par ADVANCED["ui_refresh_ms"])"""
+        for msg_type, *args in self.queue.drain():
+            if msg_type == "status":
+                self.status_label.config(text=args[0])
+            
+            elif msg_type == "progress":
+                self.progress_var.set(args[0])
+            
+            elif msg_type == "log":
+                self.log(args[0])
+            
+            elif msg_type == "stage":
+                stage, value = args
+                self.stage_vars[stage].set(value)
+            
+            elif msg_type == "subtitles":
+                # Premières minutes traduites : la vidéo peut être lancée avant la fin
+                url, srt_path, covered = args
+                if covered >= SUBTITLES["preview_minutes"] * 60 and self.previewed_url != url:
+                    self.previewed_url = url
+                    self.current_srt_path = srt_path
+                    self.current_video_url = url
                     self.vlc_button.config(state=tk.NORMAL)
-                    messagebox.showinfo(
-                        "Succès", 
-                        f"Les sous-titres ont été créés !\n\n{srt_path}\n\n" +
-                        "Cliquez sur 'Ouvrir dans VLC' pour regarder la vidéo."
+                    self.log(
+                        f"{covered / 60:.0f} premières minutes traduites : la vidéo peut être "
+                        "ouverte dans VLC (rouvrir VLC pour les sous-titres suivants)"
                     )
-                
-                elif msg_type == "error":
-                    error_msg = args[0]
-                    self.log(f"Erreur : {error_msg}")
-                    self.status_label.config(text="Erreur lors du traitement")
-                    self.process_button.config(state=tk.NORMAL)
-                    messagebox.showerror("Erreur", f"Une erreur s'est produite :\n\n{error_msg}")
-                
-        except queue.Empty:
-            pass
+            
+            elif msg_type == "job":
+                job, message = args
+                self.refresh_job(job)
+                self.on_job_event(job, message)
+        
+        # Durée de l'épisode en cours
+        current = self.job_queue.current
+        if current is not None:
+            self.refresh_job(current)
         
         # Replanifier la vérification
-        self.root.after(100, self.check_queue)
+        self.root.after(ADVANCED["ui_refresh_ms"], self.check_queue)
+    
+    def on_job_event(self, job, message):
+        """Journal, barres de progression et bouton VLC selon l'état d'un épisode"""
+        # Message de fin seulement quand toute la file est traitée
+        queue_empty = self.job_queue.current in (None, job) and not self.job_queue.pending
+        
+        if message == "traitement":
+            self.log(f"Début du traitement de : {job.url}")
+            self.progress_var.set(0)
+            for stage_var in self.stage_vars.values():
+                stage_var.set(0)
+        
+        elif message == "terminé":
+            self.log(f"Sous-titres créés : {job.srt_path}")
+            self.status_label.config(text="Traduction terminée !")
+            self.progress_var.set(100)
+            self.current_srt_path = job.srt_path
+            self.current_video_url = job.url
+            self.vlc_button.config(state=tk.NORMAL)
+            if queue_empty:
+                messagebox.showinfo(
+                    "Succès", 
+                    f"Les sous-titres ont été créés !\n\n{job.srt_path}\n\n" +
+                    "Cliquez sur 'Ouvrir dans VLC' pour regarder la vidéo."
+                )
+        
+        elif job.error is not None:
+            self.log(f"Erreur : {job.error}")
+            self.status_label.config(text="Erreur lors du traitement")
+            if queue_empty:
+                messagebox.showerror("Erreur", f"Une erreur s'est produite :\n\n{job.error}")
+        
+        elif message == "annulé":
+            self.log(f"Episode {job.index} annulé : {job.url}")
     
     def run(self):
         """Lance l'application"""
         self.log("Application démarrée")
         self.log(f"Dossier de sortie : {self.translator.output_dir}")
+        if self.translator.server is not None:
+            self.log("Serveur de modèles connecté : les modèles restent chargés entre les lancements")
+        self.warmup_thread.start()
+        threading.Thread(target=self._start_job_queue, daemon=True).start()
         self.check_queue()
         self.root.mainloop()
 
@@ -0,0 +1,184 @@
+"""
+Ingestion par lot pour Emanet Subtitle Translator
+Énumère les épisodes d'une playlist, d'une chaîne YouTube ou d'un fichier
+texte d'URLs, et tient l'index des épisodes déjà traités : une nouvelle
+exécution ne traite que les nouveaux épisodes et ceux dont les sous-titres
+ont été produits avec d'autres modèles ou réglages.
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+from config import SUBTITLES
+from checkpoint import write_atomic
+from emanet_translator import extract_video_id, yt_dlp
+
+# Playlists imbriquées suivies au plus (chaîne -> onglet "Vidéos" -> vidéos)
+MAX_DEPTH = 3
+
+
+def youtube_extractor(url):
+    """Informations yt-dlp d'une URL sans rien télécharger
+
+    Les playlists et chaînes sont listées à plat : une seule requête par page
+    de résultats, sans ouvrir chaque vidéo.
+    """
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'skip_download': True,
+        'quiet': True,
+        'no_warnings': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return ydl.extract_info(url, download=False)
+
+
+def _episode(info, url):
+    """Épisode d'une entrée yt-dlp : {"id", "url", "title"}"""
+    youtube_id = extract_video_id(url)
+    if youtube_id or info.get("ie_key") == "Youtube":
+        video_id = youtube_id or info["id"]
+        return {
+            "id": f"youtube:{video_id}",
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+            "title": info.get("title"),
+        }
+    site = (info.get("ie_key") or info.get("extractor_key") or "url").lower()
+    return {"id": f"{site}:{info.get('id') or url}", "url": url, "title": info.get("title")}
+
+
+def _walk(info, extractor, depth):
+    """Épisodes d'une réponse yt-dlp, en suivant les playlists imbriquées"""
+    entries = info.get("entries")
+    if entries is not None:
+        for entry in entries:
+            if entry:
+                yield from _walk(entry, extractor, depth)
+        return
+
+    url = info.get("webpage_url") or info.get("url") or ""
+    kind = info.get("_type", "video")
+    if kind == "video" or extract_video_id(url) or info.get("ie_key") == "Youtube":
+        yield _episode(info, url)
+    elif depth >= MAX_DEPTH:
+        logging.warning(f"Playlist ignorée (trop imbriquée) : {url}")
+    elif url:
+        yield from _walk(extractor(url), extractor, depth + 1)
+
+
+def read_url_file(path):
+    """URLs d'un fichier texte : une par ligne, suivie ou non d'un commentaire
+
+    Les lignes vides et celles qui commencent par # sont ignorées.
+    """
+    urls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                urls.append(line.split()[0])
+    return urls
+
+
+def enumerate_episodes(sources, extractor=None):
+    """Liste des épisodes de sources, dans l'ordre et sans doublons
+
+    Chaque source est l'URL d'une vidéo, d'une playlist ou d'une chaîne, ou
+    un fichier texte d'URLs. Une URL de vidéo est prise telle quelle, sans
+    requête réseau ; les playlists et chaînes sont énumérées par extractor(url)
+    (par défaut youtube_extractor), qui retourne un dictionnaire au format de
+    yt-dlp : il peut être remplacé pour énumérer hors ligne.
+    """
+    extractor = extractor or youtube_extractor
+    episodes = {}
+
+    def add(source):
+        if extract_video_id(source):
+            found = [_episode({}, source)]
+        else:
+            logging.info(f"Énumération de : {source}")
+            found = list(_walk(extractor(source), extractor, 0))
+            logging.info(f"{len(found)} épisodes trouvés dans {source}")
+        for episode in found:
+            episodes.setdefault(episode["id"], episode)
+
+    for source in sources:
+        if Path(source).is_file():
+            for url in read_url_file(source):
+                add(url)
+        else:
+            add(source)
+    return list(episodes.values())
+
+
+def output_settings(translator, whisper_model_size=None):
+    """Modèles et réglages qui déterminent les fichiers SRT d'un épisode
+
+    La partie "transcription" est aussi la clé du cache des transcriptions :
+    un épisode à refaire parce qu'elle a changé est retranscrit, pas relu
+    depuis le cache.
+    """
+    settings = translator.job_settings(whisper_model_size)
+    settings["subtitles"] = {
+        key: SUBTITLES[key] for key in ("max_line_length", "max_lines", "min_duration", "max_duration")
+    }
+    return settings
+
+
+class EpisodeIndex:
+    """Index des épisodes traités (fichier JSON)
+
+    Pour chaque épisode : titre, fichiers SRT, réglages qui les ont produits
+    et leur empreinte. Un épisode est à refaire si son empreinte a changé ou
+    si l'un de ses fichiers SRT a disparu.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+        except ValueError as e:
+            logging.warning(f"Index des épisodes illisible, recommencé : {self.path} ({e})")
+            self.entries = {}
+
+    @staticmethod
+    def fingerprint(settings):
+        payload = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def is_done(self, episode_id, fingerprint):
+        """True si l'épisode a déjà été traité avec ces réglages et ses SRT existent"""
+        entry = self.entries.get(episode_id)
+        return (
+            entry is not None
+            and entry["fingerprint"] == fingerprint
+            and all(Path(path).exists() for path in entry["srt"])
+        )
+
+    def pending(self, episodes, settings):
+        """Épisodes de la liste à (re)traiter avec ces réglages"""
+        fingerprint = self.fingerprint(settings)
+        return [episode for episode in episodes if not self.is_done(episode["id"], fingerprint)]
+
+    def record(self, episode, title, srt_paths, settings):
+        """Enregistre un épisode terminé (appelé depuis les threads de l'ordonnanceur)"""
+        with self._lock:
+            self.entries[episode["id"]] = {
+                "url": episode["url"],
+                "title": title,
+                "srt": [str(path) for path in srt_paths],
+                "fingerprint": self.fingerprint(settings),
+                "settings": settings,
+                "processed_at": time.time(),
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            payload = json.dumps(self.entries, indent=2, ensure_ascii=False)
+            write_atomic(self.path, payload.encode("utf-8"))
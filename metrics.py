@@ -0,0 +1,349 @@
+"""
+Mesures de performance pour Emanet Subtitle Translator
+Chaque étape d'un traitement (chargement des modèles, téléchargement,
+transcription, traduction, SRT) est chronométrée et écrite en JSON lines à
+côté de emanet_translator.log, et optionnellement au format textfile de
+Prometheus. Les débits observés donnent le temps restant affiché par
+l'interface et par batch_process.py.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import statistics
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import METRICS
+
+
+class PeakMemory:
+    """Pic de mémoire résidente (Mo) pendant un bloc with, échantillonné dans /proc/self/statm
+
+    Sans /proc, le pic du processus depuis son lancement (ru_maxrss) est utilisé.
+    """
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current_mb():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+        except (OSError, ValueError):
+            import resource
+            # ru_maxrss est en kilo-octets sous Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, self.current_mb())
+
+    def __enter__(self):
+        self.peak_mb = self.current_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self.current_mb())
+
+
+def format_duration(seconds):
+    """Durée lisible pour un temps restant : "45s", "12 min", "1h05" """
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{round(seconds / 60)} min"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}"
+
+
+class MetricsRecorder:
+    """Destination des mesures d'un processus (fichier JSON lines, textfile Prometheus)
+
+    Garde aussi, par étape, le facteur temps réel des derniers traitements
+    (relu dans le fichier au démarrage) pour estimer la durée d'une étape
+    pas encore commencée.
+    """
+
+    def __init__(self, path=None, prometheus_path=None, history=None):
+        # Sans chemin, rien n'est écrit : seul le temps restant est calculé
+        self.path = Path(path) if path else None
+        self.prometheus_path = prometheus_path
+        self.history_size = history or METRICS["history"]
+        self._lock = threading.Lock()
+        self._history = {}
+        self._last_stages = {}
+        self._model_loads = {}
+        self._jobs = {}
+        self._load_history()
+
+    def _load_history(self):
+        """Facteurs temps réel des traitements précédents"""
+        if self.path is None:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()[-50 * self.history_size:]
+        except OSError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("event") == "stage":
+                self._remember(record)
+
+    def _remember(self, record):
+        rtf = record.get("real_time_factor")
+        if rtf is not None:
+            values = self._history.setdefault(record["stage"], [])
+            values.append(rtf)
+            del values[:-self.history_size]
+
+    def expected_rtf(self, stage):
+        """Facteur temps réel habituel d'une étape (médiane), ou None sans historique"""
+        with self._lock:
+            values = self._history.get(stage)
+            return statistics.median(values) if values else None
+
+    def job(self, source, progress_callback=None):
+        """Mesures d'un nouveau traitement"""
+        return JobMetrics(self, source, progress_callback)
+
+    def write(self, record):
+        """Ajoute une ligne au fichier JSON lines"""
+        if record.get("event") == "stage":
+            with self._lock:
+                self._remember(record)
+                self._last_stages[record["stage"]] = record
+                if record.get("model"):
+                    self._model_loads[record["model"]] = record["seconds"]
+        elif record.get("event") == "job":
+            with self._lock:
+                self._jobs[record["status"]] = self._jobs.get(record["status"], 0) + 1
+        if self.path is not None:
+            try:
+                line = json.dumps(record, ensure_ascii=False)
+                with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logging.warning(f"Impossible d'écrire les mesures dans {self.path} : {e}")
+        if record.get("event") == "job" and self.prometheus_path:
+            self.write_prometheus()
+
+    def write_prometheus(self):
+        """Réécrit le fichier textfile de Prometheus (node_exporter, collecteur textfile)"""
+        lines = []
+
+        def metric(name, help_text, kind, samples):
+            if not samples:
+                return
+            lines.append(f"# HELP emanet_{name} {help_text}")
+            lines.append(f"# TYPE emanet_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{str(val).replace(chr(34), "")}"' for key, val in labels.items())
+                lines.append(f"emanet_{name}{{{label_text}}} {value}")
+
+        with self._lock:
+            stages = dict(self._last_stages)
+            loads = dict(self._model_loads)
+            jobs = dict(self._jobs)
+        metric("stage_seconds", "Durée de la dernière exécution de l'étape", "gauge",
+               [({"stage": name}, record["seconds"]) for name, record in stages.items()])
+        metric("stage_real_time_factor", "Secondes de calcul par seconde d'audio", "gauge",
+               [({"stage": name}, record["real_time_factor"]) for name, record in stages.items()
+                if record.get("real_time_factor") is not None])
+        metric("stage_segments_per_second", "Segments traités par seconde", "gauge",
+               [({"stage": name}, record["segments_per_second"]) for name, record in stages.items()
+                if record.get("segments_per_second") is not None])
+        metric("stage_tokens_per_second", "Tokens générés par seconde", "gauge",
+               [({"stage": name}, record["tokens_per_second"]) for name, record in stages.items()
+                if record.get("tokens_per_second") is not None])
+        metric("stage_peak_rss_bytes", "Pic de mémoire résidente du processus pendant l'étape", "gauge",
+               [({"stage": name}, int(record["peak_rss_mb"] * 1e6)) for name, record in stages.items()])
+        metric("model_load_seconds", "Durée du dernier chargement du modèle", "gauge",
+               [({"model": name}, seconds) for name, seconds in loads.items()])
+        metric("jobs_total", "Traitements terminés depuis le lancement du processus", "counter",
+               [({"status": status}, count) for status, count in jobs.items()])
+
+        path = Path(self.prometheus_path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Écriture atomique : le collecteur ne lit jamais un fichier à moitié écrit
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            tmp_path.replace(path)
+        except OSError as e:
+            logging.warning(f"Impossible d'écrire les mesures Prometheus dans {path} : {e}")
+
+
+class JobMetrics:
+    """Mesures et temps restant d'un traitement (une vidéo)
+
+    Chaque étape est un bloc with stage(nom) ; le dictionnaire retourné peut
+    être complété (audio_seconds, segments, tokens) avant la fin du bloc.
+    update(étape, fait, total) signale l'avancement d'une étape en cours.
+    plan liste les étapes attendues : leur durée est estimée avec le débit
+    observé (étape en cours) ou le facteur temps réel habituel (étapes à venir).
+    """
+
+    def __init__(self, recorder, source, progress_callback=None):
+        self.recorder = recorder
+        self.job_id = uuid.uuid4().hex[:12]
+        self.source = source
+        self.progress_callback = progress_callback
+        self.started_at = time.time()
+        self.audio_seconds = None
+        self.plan = []
+        self.stages = []
+        self._active = {}
+        self._progress = {}
+        self._message = ""
+        self._fallback_percent = 0
+        self._lock = threading.Lock()
+        self._ticker = None
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Chronomètre une étape et écrit sa mesure à la fin du bloc"""
+        record = {"event": "stage", "job": self.job_id, "stage": name, "start": time.time()}
+        record.update(fields)
+        with self._lock:
+            self._active[name] = record["start"]
+        status = "ok"
+        try:
+            with PeakMemory() as memory:
+                yield record
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            with self._lock:
+                self._active.pop(name, None)
+                self._progress.pop(name, None)
+            record["end"] = time.time()
+            record["seconds"] = record["end"] - record["start"]
+            record["peak_rss_mb"] = round(memory.peak_mb, 1)
+            record["status"] = status
+            self._add_rates(record)
+            logging.info(
+                f"Étape {name} : {record['seconds']:.1f}s, pic de mémoire {record['peak_rss_mb']:.0f} Mo"
+            )
+            self.stages.append(record)
+            self.recorder.write(record)
+
+    def _add_rates(self, record):
+        seconds = record["seconds"]
+        if seconds <= 0:
+            return
+        if record.get("audio_seconds"):
+            record["real_time_factor"] = seconds / record["audio_seconds"]
+            record["audio_seconds_per_second"] = record["audio_seconds"] / seconds
+        if record.get("segments") is not None:
+            record["segments_per_second"] = record["segments"] / seconds
+        if record.get("tokens") is not None:
+            record["tokens_per_second"] = record["tokens"] / seconds
+
+    def update(self, stage, done, total):
+        """Avancement d'une étape en cours (unités libres : secondes d'audio, pourcentage...)"""
+        with self._lock:
+            self._progress[stage] = (done, total)
+
+    def eta(self):
+        """Secondes restantes estimées, ou None si aucune étape restante ne peut être estimée
+
+        Une étape à venir sans historique compte pour zéro : l'estimation
+        s'affine au fil des traitements.
+        """
+        now = time.time()
+        finished = {record["stage"] for record in self.stages}
+        remaining = 0.0
+        known = False
+        with self._lock:
+            active = dict(self._active)
+            progress = dict(self._progress)
+        for stage in self.plan:
+            if stage in finished:
+                continue
+            done, total = progress.get(stage, (0, 0))
+            if stage in active and done > 0 and total:
+                # Débit observé depuis le début de l'étape
+                elapsed = now - active[stage]
+                remaining += elapsed * max(0.0, total - done) / done
+                known = True
+                continue
+            rtf = self.recorder.expected_rtf(stage)
+            if rtf is None or not self.audio_seconds:
+                continue
+            expected = rtf * self.audio_seconds
+            if stage in active:
+                expected -= now - active[stage]
+            remaining += max(0.0, expected)
+            known = True
+        return remaining if known else None
+
+    def report(self, message=None, fallback_percent=None):
+        """Transmet message et avancement global (d'après le temps restant) à progress_callback"""
+        if message is not None:
+            self._message = message
+        if fallback_percent is not None:
+            self._fallback_percent = fallback_percent
+        if not self.progress_callback or not self._message:
+            return
+        eta = self.eta()
+        if eta is None:
+            self.progress_callback(self._message, self._fallback_percent)
+            return
+        elapsed = time.time() - self.started_at
+        percent = 100 * elapsed / (elapsed + eta) if elapsed + eta > 0 else 0
+        # Ne jamais reculer sous l'avancement déjà annoncé
+        self._fallback_percent = max(self._fallback_percent, min(99.0, percent))
+        self.progress_callback(f"{self._message} · reste ~{format_duration(eta)}", self._fallback_percent)
+
+    def start_ticker(self, interval=None):
+        """Rafraîchit l'avancement régulièrement, même pendant une étape sans progression"""
+        interval = interval or METRICS["refresh_interval"]
+        stop = threading.Event()
+
+        def tick():
+            while not stop.wait(interval):
+                self.report()
+
+        self._ticker = stop
+        threading.Thread(target=tick, daemon=True).start()
+
+    def finish(self, status="ok", error=None, **fields):
+        """Écrit la ligne de synthèse du traitement"""
+        if self._ticker is not None:
+            self._ticker.set()
+        record = {
+            "event": "job",
+            "job": self.job_id,
+            "source": self.source,
+            "status": status,
+            "start": self.started_at,
+            "end": time.time(),
+            "seconds": time.time() - self.started_at,
+            "audio_seconds": self.audio_seconds,
+            "stages": {stage["stage"]: round(stage["seconds"], 3) for stage in self.stages},
+            "peak_rss_mb": max((stage["peak_rss_mb"] for stage in self.stages), default=None),
+        }
+        if self.audio_seconds and record["seconds"] > 0:
+            record["real_time_factor"] = record["seconds"] / self.audio_seconds
+        if error is not None:
+            record["error"] = str(error)
+        record.update(fields)
+        self.recorder.write(record)
+        return record
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Serveur de modèles pour Emanet Subtitle Translator
+Garde Whisper et NLLB chargés dans un processus résident : l'interface et
+batch_process.py s'y connectent au lieu de recharger les modèles à chaque lancement
+
+Exemples :
+    python model_server.py --whisper base --nllb medium   # démarrer le serveur
+    python model_server.py --status
+    python model_server.py --stop
+"""
+
+import os
+import sys
+import time
+import queue
+import logging
+import argparse
+import threading
+from pathlib import Path
+from multiprocessing.connection import Listener, Client
+
+from config import ADVANCED, MODELS, SERVER
+
+
+class _Request:
+    """Requête d'un client en attente de traitement"""
+
+    def __init__(self, command, args, reply):
+        self.command = command
+        self.args = args
+        self.reply = reply
+        self.done = threading.Event()
+
+    def finish(self, result):
+        self.reply("result", result)
+        self.done.set()
+
+    def fail(self, error):
+        self.reply("error", str(error))
+        self.done.set()
+
+
+class ModelServer:
+    """Sert transcription, traduction et traitement complet sur un socket Unix
+
+    Les requêtes lourdes (chargement, transcription, vidéo complète) passent
+    par une file traitée dans l'ordre d'arrivée. Les traductions de plusieurs
+    clients arrivées à moins de SERVER["batch_wait"] secondes d'intervalle sont
+    regroupées en un seul appel à translate_segments pour remplir les lots NLLB.
+    """
+
+    def __init__(self, translator, address=None):
+        self.translator = translator
+        self.address = address or SERVER["socket"]
+        self.jobs = queue.Queue(maxsize=SERVER["queue_size"])
+        self.translations = queue.Queue(maxsize=SERVER["queue_size"])
+        self.started_at = None
+        self._listener = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def serve_forever(self):
+        """Accepte les clients jusqu'à shutdown()"""
+        if ModelClient.connect(self.address) is not None:
+            raise Exception(f"Un serveur de modèles écoute déjà sur {self.address}")
+
+        path = Path(self.address)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Socket d'une exécution précédente interrompue
+        path.unlink(missing_ok=True)
+        self._listener = Listener(self.address, family="AF_UNIX")
+        os.chmod(self.address, 0o600)
+        self.started_at = time.time()
+
+        for target in (self._job_worker, self._translation_worker):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        logging.info(f"Serveur de modèles à l'écoute sur {self.address}")
+        while not self._stop.is_set():
+            try:
+                connection = self._listener.accept()
+            except OSError:
+                # Listener fermé par shutdown()
+                break
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def shutdown(self):
+        """Arrête le serveur et supprime le socket"""
+        if self._stop.is_set():
+            return
+        logging.info("Arrêt du serveur de modèles")
+        self._stop.set()
+        self.jobs.put(None)
+        self.translations.put(None)
+        if self._listener is not None:
+            self._listener.close()
+        Path(self.address).unlink(missing_ok=True)
+
+    def status(self):
+        translator = self.translator
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at if self.started_at else 0.0,
+            "whisper": translator.whisper_model_size if translator.whisper_model else None,
+            "nllb": translator.translation_model_size if translator.translation_backend else None,
+            "pending_jobs": self.jobs.qsize(),
+            "pending_translations": self.translations.qsize(),
+        }
+
+    def _handle(self, connection):
+        """Une connexion client : une requête à la fois, réponses et progression sur la même connexion"""
+        send_lock = threading.Lock()
+
+        def reply(*message):
+            try:
+                with send_lock:
+                    connection.send(message)
+            except OSError:
+                # Client déconnecté : le travail en cours se termine quand même
+                pass
+
+        with connection:
+            while not self._stop.is_set():
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    break
+
+                command = message.pop("command", None)
+                if command == "ping":
+                    reply("result", self.status())
+                    continue
+                if command == "shutdown":
+                    reply("result", None)
+                    self.shutdown()
+                    break
+
+                request = _Request(command, message, reply)
+                if command == "translate":
+                    if not isinstance(message.get("segments"), list):
+                        request.fail("La traduction attend une liste de segments")
+                        continue
+                    self.translations.put(request)
+                elif command in ("load", "transcribe", "process_video"):
+                    self.jobs.put(request)
+                else:
+                    request.fail(f"Commande inconnue : {command}")
+                request.done.wait()
+
+    def _job_worker(self):
+        """Exécute les requêtes lourdes une par une"""
+        while True:
+            request = self.jobs.get()
+            if request is None:
+                break
+            try:
+                request.finish(self._run_job(request))
+            except Exception as e:
+                logging.error(f"Erreur dans la requête '{request.command}' : {e}")
+                request.fail(e)
+
+    def _run_job(self, request):
+        translator = self.translator
+        args = request.args
+
+        if request.command == "load":
+            whisper_size = args.get("whisper")
+            if whisper_size and (not translator.whisper_model or translator.whisper_model_size != whisper_size):
+                if not translator.load_whisper_model(whisper_size):
+                    raise Exception(f"Impossible de charger le modèle Whisper '{whisper_size}'")
+            nllb_size = args.get("nllb")
+            if nllb_size and (not translator.translation_backend or translator.translation_model_size != nllb_size):
+                if not translator.load_translation_model(nllb_size):
+                    raise Exception(f"Impossible de charger le modèle NLLB '{nllb_size}'")
+            return self.status()
+
+        if request.command == "transcribe":
+            return translator.transcribe_audio(args["audio"])
+
+        srt_path = translator.process_video(
+            args["url"],
+            args["model_size"],
+            args["translation_model_size"],
+            progress_callback=lambda message, value=None: request.reply("progress", message, value),
+            refresh_transcription=args.get("refresh_transcription", False),
+            stage_callback=lambda stage, value: request.reply("stage", stage, value),
+            subtitle_callback=lambda path, covered: request.reply("subtitles", str(Path(path).resolve()), covered)
+        )
+        # Le client ne partage pas forcément le dossier courant du serveur
+        return str(Path(srt_path).resolve())
+
+    def _translation_worker(self):
+        """Regroupe les traductions des différents clients en un seul appel"""
+        batch_size = max(1, ADVANCED["batch_size"])
+        while True:
+            request = self.translations.get()
+            if request is None:
+                break
+
+            batch = [request]
+            count = len(request.args["segments"])
+            deadline = time.time() + SERVER["batch_wait"]
+            stopping = False
+            while count < batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    other = self.translations.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if other is None:
+                    stopping = True
+                    break
+                batch.append(other)
+                count += len(other.args["segments"])
+
+            if len(batch) > 1:
+                logging.info(f"Traduction groupée de {len(batch)} requêtes ({count} segments)")
+
+            # Un appel par ensemble de langues demandé
+            by_languages = {}
+            for item in batch:
+                by_languages.setdefault(tuple(item.args.get("target_languages") or ()), []).append(item)
+            for languages, items in by_languages.items():
+                segments = [segment for item in items for segment in item.args["segments"]]
+                # Les fragments de phrase ne sont regroupés qu'au sein d'une même requête
+                boundaries = []
+                position = 0
+                for item in items:
+                    boundaries.append(position)
+                    position += len(item.args["segments"])
+                try:
+                    translated = self.translator.translate_segments(
+                        segments, target_languages=languages or None, boundaries=boundaries
+                    )
+                except Exception as e:
+                    logging.error(f"Erreur lors de la traduction groupée : {e}")
+                    for item in items:
+                        item.fail(e)
+                else:
+                    position = 0
+                    for item in items:
+                        size = len(item.args["segments"])
+                        item.finish(translated[position:position + size])
+                        position += size
+
+            if stopping:
+                break
+
+
+class ModelClient:
+    """Client d'un ModelServer
+
+    Chaque thread a sa propre connexion : la transcription d'un épisode ne
+    bloque pas la traduction du précédent (voir scheduler.py). Les erreurs de
+    connexion sont levées en ConnectionError.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self._local = threading.local()
+
+    @classmethod
+    def connect(cls, address=None):
+        """Retourne un client connecté, ou None si aucun serveur n'écoute"""
+        client = cls(address or SERVER["socket"])
+        if not os.path.exists(client.address):
+            return None
+        try:
+            client._connection()
+        except OSError:
+            return None
+        return client
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = Client(self.address, family="AF_UNIX")
+            self._local.connection = connection
+        return connection
+
+    def request(self, command, progress_callback=None, stage_callback=None, subtitle_callback=None, **args):
+        """Envoie une requête et attend son résultat (en relayant la progression)"""
+        try:
+            connection = self._connection()
+            connection.send(dict(args, command=command))
+            while True:
+                kind, *payload = connection.recv()
+                if kind == "progress":
+                    if progress_callback:
+                        progress_callback(*payload)
+                elif kind == "stage":
+                    if stage_callback:
+                        stage_callback(*payload)
+                elif kind == "subtitles":
+                    if subtitle_callback:
+                        subtitle_callback(*payload)
+                elif kind == "error":
+                    raise Exception(f"Serveur de modèles : {payload[0]}")
+                else:
+                    return payload[0]
+        except (EOFError, OSError) as e:
+            self._local.connection = None
+            raise ConnectionError(f"Serveur de modèles injoignable ({self.address}) : {e}")
+
+    def ping(self):
+        return self.request("ping")
+
+    def load(self, whisper=None, nllb=None):
+        return self.request("load", whisper=whisper, nllb=nllb)
+
+    def transcribe(self, audio):
+        return self.request("transcribe", audio=audio)
+
+    def translate(self, segments, target_languages=None):
+        return self.request("translate", segments=segments, target_languages=target_languages)
+
+    def process_video(self, url, model_size, translation_model_size, progress_callback=None,
+                      refresh_transcription=False, stage_callback=None, subtitle_callback=None):
+        return self.request(
+            "process_video",
+            progress_callback=progress_callback,
+            stage_callback=stage_callback,
+            subtitle_callback=subtitle_callback,
+            url=url,
+            model_size=model_size,
+            translation_model_size=translation_model_size,
+            refresh_transcription=refresh_transcription
+        )
+
+    def shutdown(self):
+        return self.request("shutdown")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur de modèles d'Emanet Subtitle Translator")
+    parser.add_argument("--whisper", default=MODELS["whisper"]["default"], help="Modèle Whisper à charger")
+    parser.add_argument("--nllb", default=MODELS["nllb"]["default"], help="Modèle NLLB à charger")
+    parser.add_argument("--socket", default=SERVER["socket"], help="Chemin du socket Unix")
+    parser.add_argument("--status", action="store_true", help="Affiche l'état du serveur lancé")
+    parser.add_argument("--stop", action="store_true", help="Arrête le serveur lancé")
+    args = parser.parse_args()
+
+    if args.status or args.stop:
+        client = ModelClient.connect(args.socket)
+        if client is None:
+            print(f"Aucun serveur de modèles sur {args.socket}")
+            sys.exit(1)
+        if args.stop:
+            client.shutdown()
+            print("Serveur de modèles arrêté")
+        else:
+            for key, value in client.ping().items():
+                print(f"{key} : {value}")
+        return
+
+    # Import tardif : --status et --stop n'ont pas besoin des modèles
+    from emanet_translator import EmanetTranslator
+
+    translator = EmanetTranslator(use_server=False)
+    if not translator.load_whisper_model(args.whisper):
+        sys.exit(1)
+    if not translator.load_translation_model(args.nllb):
+        sys.exit(1)
+
+    server = ModelServer(translator, args.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Magasin de modèles préconvertis pour Emanet Subtitle Translator
+Whisper et NLLB sont convertis une seule fois en safetensors, dans le type
+utilisé à l'exécution : les chargements suivants projettent les poids en
+mémoire (mmap) depuis MODEL_STORE["dir"], sans passer par le Hub ni
+matérialiser deux copies des poids. Un chargement à froid est limité par le
+disque, un chargement à chaud (fichiers dans le cache du système) est presque
+immédiat.
+
+Exemples :
+    python model_store.py --whisper base --nllb small medium   # préparer le magasin
+    python model_store.py --nllb small --dtype float16          # version GPU
+    python model_store.py --list
+
+Ce module importe PyTorch : il n'est importé qu'au chargement des modèles.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import dataclasses
+from pathlib import Path
+
+import torch
+
+from config import MODEL_STORE, MODELS
+
+# Écrit en dernier : sa présence marque un modèle complet
+MANIFEST = "store.json"
+
+
+def store_path(kind, name, dtype):
+    """Dossier d'un modèle dans le magasin"""
+    return Path(MODEL_STORE["dir"]) / f"{kind}--{name.replace('/', '--')}--{dtype}"
+
+
+def read_manifest(path):
+    with open(Path(path) / MANIFEST, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _publish(tmp_dir, path, manifest):
+    """Rend visible un modèle converti dans tmp_dir"""
+    manifest = dict(manifest, created=time.time())
+    with open(tmp_dir / MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    tmp_dir.replace(path)
+
+
+def _tmp_dir(path):
+    tmp_dir = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    return tmp_dir
+
+
+def nllb_source(model_name, dtype=torch.float32):
+    """Dossier local de NLLB préconverti dans le type dtype (converti à la première utilisation)
+
+    Sans magasin (MODEL_STORE["enabled"] à False), retourne le nom du modèle sur le Hub.
+    """
+    if not MODEL_STORE["enabled"]:
+        return model_name
+    dtype_name = str(dtype).replace("torch.", "")
+    path = store_path("nllb", model_name, dtype_name)
+    if (path / MANIFEST).exists():
+        return path
+
+    import transformers
+
+    offline = MODEL_STORE["offline"]
+    logging.info(f"Conversion de {model_name} en safetensors {dtype_name} (première utilisation)...")
+    start = time.time()
+    try:
+        model = transformers.AutoModelForSeq2SeqLM.from_pretrained(
+            model_name, torch_dtype=dtype, low_cpu_mem_usage=True, local_files_only=offline
+        )
+        tokenizer = transformers.AutoTokenizer.from_pretrained(model_name, local_files_only=offline)
+    except Exception as e:
+        if offline:
+            raise Exception(f"Modèle {model_name} absent du magasin et du cache (mode hors ligne) : {e}")
+        raise
+
+    tmp_dir = _tmp_dir(path)
+    model.save_pretrained(tmp_dir, safe_serialization=True)
+    tokenizer.save_pretrained(tmp_dir)
+    _publish(tmp_dir, path, {"source": model_name, "dtype": dtype_name})
+    logging.info(f"Modèle converti en {time.time() - start:.1f}s : {path}")
+    return path
+
+
+def whisper_path(model_size):
+    """Dossier local de Whisper préconverti (converti à la première utilisation)
+
+    Les poids restent en float32 : les LayerNorm de Whisper calculent en
+    float32 et transcribe convertit lui-même l'entrée en float16 sur GPU.
+    """
+    path = store_path("whisper", model_size, "float32")
+    if (path / MANIFEST).exists():
+        return path
+
+    import whisper
+    from safetensors.torch import save_file
+
+    # Fichiers téléchargés par whisper.load_model (même emplacement par défaut)
+    download_root = os.path.join(os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "whisper")
+    if MODEL_STORE["offline"] and model_size in whisper._MODELS:
+        checkpoint = os.path.join(download_root, os.path.basename(whisper._MODELS[model_size]))
+        if not os.path.exists(checkpoint):
+            raise Exception(f"Modèle Whisper '{model_size}' absent du magasin et du cache (mode hors ligne)")
+
+    logging.info(f"Conversion de Whisper '{model_size}' en safetensors (première utilisation)...")
+    start = time.time()
+    model = whisper.load_model(model_size, device="cpu", download_root=download_root)
+    tmp_dir = _tmp_dir(path)
+    state = {name: tensor.contiguous() for name, tensor in model.state_dict().items()}
+    save_file(state, tmp_dir / "model.safetensors")
+    heads = whisper._ALIGNMENT_HEADS.get(model_size)
+    _publish(tmp_dir, path, {
+        "source": model_size,
+        "dtype": "float32",
+        "dims": dataclasses.asdict(model.dims),
+        "alignment_heads": heads.decode("ascii") if heads else None,
+    })
+    logging.info(f"Modèle converti en {time.time() - start:.1f}s : {path}")
+    return path
+
+
+def load_whisper(model_size, device=None):
+    """Charge Whisper depuis le magasin : poids projetés en mémoire, sans initialisation aléatoire
+
+    Les processus du pool de transcription partagent ainsi les pages du
+    fichier. Sans magasin, équivaut à whisper.load_model.
+    """
+    import whisper
+
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    if not MODEL_STORE["enabled"]:
+        return whisper.load_model(model_size, device=device)
+
+    from accelerate import init_empty_weights
+    from safetensors.torch import load_file
+
+    path = whisper_path(model_size)
+    manifest = read_manifest(path)
+    # Paramètres sur le device "meta" ; les buffers non enregistrés (masque) sont calculés
+    with init_empty_weights():
+        model = whisper.model.Whisper(whisper.model.ModelDimensions(**manifest["dims"]))
+    model.load_state_dict(load_file(path / "model.safetensors", device="cpu"), assign=True)
+    if manifest["alignment_heads"]:
+        model.set_alignment_heads(manifest["alignment_heads"].encode("ascii"))
+    return model.to(device)
+
+
+def list_models():
+    """Modèles complets du magasin : [(dossier, manifeste, taille en octets)]"""
+    root = Path(MODEL_STORE["dir"])
+    if not root.exists():
+        return []
+    models = []
+    for path in sorted(root.iterdir()):
+        if (path / MANIFEST).exists():
+            size = sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+            models.append((path, read_manifest(path), size))
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prépare le magasin de modèles préconvertis")
+    parser.add_argument("--whisper", nargs="*", default=[], help="Tailles Whisper à convertir (ex. base small)")
+    parser.add_argument("--nllb", nargs="*", default=[], choices=list(MODELS["nllb"]["models"]),
+                        help="Tailles NLLB à convertir")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"],
+                        help="Type des poids NLLB (float16 : GPU)")
+    parser.add_argument("--list", action="store_true", help="Affiche le contenu du magasin")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    for size in args.whisper:
+        whisper_path(size)
+    for size in args.nllb:
+        nllb_source(MODELS["nllb"]["models"][size], getattr(torch, args.dtype))
+
+    if args.list or not (args.whisper or args.nllb):
+        models = list_models()
+        if not models:
+            print(f"Magasin vide : {MODEL_STORE['dir']}")
+        for path, manifest, size in models:
+            print(f"{manifest['source']:40} {manifest['dtype']:8} {size / 1e6:8.0f} Mo  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,552 @@
+"""
+Ordonnanceur multi-épisodes pour Emanet Subtitle Translator
+Télécharge l'épisode N+1 pendant que l'épisode N est transcrit et que
+l'épisode N-1 est traduit, avec une limite de parallélisme par étape
+(EpisodeScheduler, batch_process.py). JobQueue est la file d'attente de
+l'interface : épisodes ajoutés, réordonnés ou annulés au fil de l'eau.
+"""
+
+import logging
+import queue
+import shutil
+import threading
+import time
+import uuid
+
+from config import ADVANCED, AUDIO, BATCH, LOW_MEMORY_MODE
+from audio_utils import audio_sha256
+from emanet_translator import extract_video_id
+
+
+class EpisodeJob:
+    """Un épisode à traiter et son état dans le pipeline"""
+
+    def __init__(self, index, url):
+        self.index = index
+        self.url = url
+        self.status = "en attente"
+        self.title = None
+        self.source_id = None
+        self.workdir = None
+        self.audio = None
+        self.segments = None
+        self.srt_path = None
+        # Un SRT par langue (LANGUAGES["targets"]), srt_path est le premier
+        self.srt_paths = []
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        # Durée passée dans chaque étape (secondes)
+        self.stage_times = {}
+        # Mesures détaillées de chaque étape (metrics.py)
+        self.metrics = None
+        # Point de reprise sur disque (checkpoint.py), None si désactivé
+        self.checkpoint = None
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+
+class _Stage:
+    """Une étape du pipeline : une file d'entrée et un nombre fixe de threads"""
+
+    def __init__(self, name, workers, maxsize=0):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.busy_time = 0.0
+        self._remaining = self.workers
+        self._lock = threading.Lock()
+
+    def add_busy_time(self, seconds):
+        with self._lock:
+            self.busy_time += seconds
+
+    def worker_finished(self):
+        """Retourne True quand le dernier thread de l'étape s'est arrêté"""
+        with self._lock:
+            self._remaining -= 1
+            return self._remaining == 0
+
+
+class EpisodeScheduler:
+    """Traite une liste d'épisodes en recouvrant téléchargement, transcription et traduction
+
+    Les modèles doivent déjà être chargés dans le traducteur. Les files entre
+    étapes sont bornées (BATCH["prefetch"]) pour ne pas télécharger toute la
+    saison d'avance. on_event(job, message) est appelé à chaque changement
+    d'état d'un épisode.
+    """
+
+    def __init__(self, translator, on_event=None, refresh_transcription=False):
+        self.translator = translator
+        self.on_event = on_event
+        self.refresh_transcription = refresh_transcription
+        self.jobs = []
+
+        prefetch = BATCH["prefetch"]
+        self.download = _Stage("téléchargement", BATCH["download_workers"])
+        self.transcription = _Stage("transcription", BATCH["transcription_workers"], maxsize=prefetch)
+        self.translation = _Stage("traduction", BATCH["translation_workers"], maxsize=prefetch)
+
+        self._threads = []
+        self._started_at = None
+        self._finished_at = None
+
+    def submit(self, url):
+        """Ajoute un épisode à la file de téléchargement"""
+        job = EpisodeJob(len(self.jobs) + 1, url)
+        job.metrics = self.translator.metrics.job(url)
+        job.metrics.plan = ["download", "transcription", "translation", "srt"]
+        self.jobs.append(job)
+        self.download.queue.put(job)
+        return job
+
+    def start(self):
+        """Démarre les threads de chaque étape"""
+        self._started_at = time.time()
+        stages = [
+            (self.download, self._download_job, self.transcription),
+            (self.transcription, self._transcribe_job, self.translation),
+            (self.translation, self._translate_job, None),
+        ]
+        for stage, handler, next_stage in stages:
+            for _ in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, handler, next_stage),
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def close(self):
+        """Indique qu'aucun autre épisode ne sera ajouté"""
+        for _ in range(self.download.workers):
+            self.download.queue.put(None)
+
+    def wait(self):
+        """Attend la fin de tous les épisodes"""
+        for thread in self._threads:
+            thread.join()
+        self._finished_at = time.time()
+
+    def run(self, urls):
+        """Traite toutes les URLs et retourne la liste des épisodes"""
+        for url in urls:
+            self.submit(url)
+        self.start()
+        self.close()
+        self.wait()
+        return self.jobs
+
+    def _emit(self, job, message):
+        job.status = message
+        logging.info(f"Episode {job.index} : {message}")
+        if self.on_event:
+            self.on_event(job, message)
+
+    def _worker(self, stage, handler, next_stage):
+        while True:
+            job = stage.queue.get()
+            if job is None:
+                break
+
+            start = time.time()
+            try:
+                target = handler(job)
+            except Exception as e:
+                job.error = e
+                target = None
+                self._finish(job, e)
+                self._emit(job, f"échec ({e})")
+            finally:
+                elapsed = time.time() - start
+                job.stage_times[stage.name] = job.stage_times.get(stage.name, 0) + elapsed
+                stage.add_busy_time(elapsed)
+
+            if target is not None:
+                target.queue.put(job)
+
+        # Le dernier thread d'une étape ferme l'étape suivante
+        if stage.worker_finished() and next_stage is not None:
+            for _ in range(next_stage.workers):
+                next_stage.queue.put(None)
+
+    def _download_job(self, job):
+        """Étape 1 : transcription en cache, sinon téléchargement dans un dossier propre à l'épisode"""
+        translator = self.translator
+        model_size = translator.whisper_model_size
+
+        video_id = extract_video_id(job.url)
+        job.source_id = f"youtube:{video_id}" if video_id else None
+        job.checkpoint = translator.open_checkpoint(job.source_id or job.url, model_size)
+        cached = translator.get_cached_transcription(job.source_id, model_size, self.refresh_transcription)
+        if cached:
+            job.title = cached['title']
+            job.segments = cached['segments']
+            self._emit(job, "transcription trouvée dans le cache")
+            return self.translation
+
+        downloaded = job.checkpoint.load_audio() if job.checkpoint is not None else None
+        self._emit(job, "reprise de l'audio déjà téléchargé" if downloaded else "téléchargement")
+        job.workdir = translator.temp_dir / f"job_{job.index:03d}_{video_id or uuid.uuid4().hex[:8]}"
+        with job.metrics.stage("download") as record:
+            if downloaded:
+                job.audio, job.title = downloaded
+            else:
+                job.audio, job.title = translator.download_video(job.url, output_dir=job.workdir)
+                if job.checkpoint is not None:
+                    job.audio = job.checkpoint.save_audio(job.audio, job.title)
+            record["audio_seconds"] = job.metrics.audio_seconds = len(job.audio) / AUDIO["sample_rate"]
+
+        if translator.transcription_cache is not None and not job.source_id:
+            job.source_id = f"sha256:{audio_sha256(job.audio)}"
+            cached = translator.get_cached_transcription(job.source_id, model_size, self.refresh_transcription)
+            if cached:
+                job.segments = cached['segments']
+                self._cleanup(job)
+                self._emit(job, "transcription trouvée dans le cache")
+                return self.translation
+
+        self._emit(job, "téléchargé, en attente de transcription")
+        return self.transcription
+
+    def _transcribe_job(self, job):
+        """Étape 2 : transcription Whisper"""
+        self._emit(job, "transcription")
+        try:
+            with job.metrics.stage("transcription", audio_seconds=job.metrics.audio_seconds) as record:
+                if job.checkpoint is not None:
+                    job.segments = self.translator.transcribe_checkpointed(job.audio, job.checkpoint)
+                else:
+                    job.segments = self.translator.transcribe_audio(job.audio)
+                record["segments"] = len(job.segments)
+        finally:
+            self._cleanup(job)
+        self.translator.save_transcription(
+            job.source_id, self.translator.whisper_model_size, job.title, job.segments
+        )
+        self._emit(job, "transcrit, en attente de traduction")
+        return self.translation
+
+    def _translate_job(self, job):
+        """Étape 3 : traduction NLLB et fichier SRT"""
+        self._emit(job, "traduction")
+        translator = self.translator
+        if job.metrics.audio_seconds is None and job.segments:
+            # Transcription en cache : durée d'après le dernier segment
+            job.metrics.audio_seconds = job.segments[-1]['end']
+        # SRT publié au fil de la traduction : l'épisode peut être regardé avant la fin
+        writer = translator.open_srt_writers(job.title)
+        try:
+            with job.metrics.stage("translation", audio_seconds=job.metrics.audio_seconds) as record:
+                tokens = translator._generated_tokens()
+                translated_segments = translator.translate_in_chunks(
+                    job.segments, job.checkpoint, on_translated=writer.write
+                )
+                translator._count_translation(record, job.segments, tokens)
+            with job.metrics.stage("srt", segments=len(translated_segments)):
+                writer.close()
+        finally:
+            writer.abort()
+        job.srt_path = writer.path
+        job.srt_paths = writer.paths
+        # Libérer la mémoire des segments une fois le SRT écrit
+        job.segments = None
+        self._finish(job)
+        self._emit(job, "terminé")
+        return None
+
+    def _finish(self, job, error=None):
+        job.finished_at = time.time()
+        self._cleanup(job)
+        if error is None:
+            # Un épisode en échec garde son point de reprise pour la prochaine exécution
+            if job.checkpoint is not None:
+                job.checkpoint.clear()
+            job.metrics.finish("ok", srt=str(job.srt_path))
+        else:
+            job.metrics.finish("error", error=error)
+
+    def _cleanup(self, job):
+        """Libère l'audio et supprime le dossier de travail de l'épisode"""
+        job.audio = None
+        if job.workdir and not ADVANCED["keep_temp_files"]:
+            shutil.rmtree(job.workdir, ignore_errors=True)
+
+    def eta(self):
+        """Secondes restantes estimées d'après le débit des épisodes déjà terminés"""
+        finished = sum(1 for job in self.jobs if job.done)
+        if not finished or not self._started_at:
+            return None
+        elapsed = time.time() - self._started_at
+        return elapsed / finished * (len(self.jobs) - finished)
+    
+    def summary(self):
+        """Résumé du débit de la dernière exécution"""
+        elapsed = (self._finished_at or time.time()) - (self._started_at or time.time())
+        successful = sum(1 for job in self.jobs if job.done and job.error is None)
+        failed = sum(1 for job in self.jobs if job.error is not None)
+        episodes_per_hour = successful / elapsed * 3600 if elapsed > 0 else 0.0
+        return {
+            "successful": successful,
+            "failed": failed,
+            "elapsed": elapsed,
+            "episodes_per_hour": episodes_per_hour,
+            "stage_busy": {
+                stage.name: stage.busy_time
+                for stage in (self.download, self.transcription, self.translation)
+            },
+        }
+
+
+class QueuedJob(EpisodeJob):
+    """Épisode de la file d'attente de l'interface, avec les modèles choisis à l'ajout"""
+
+    def __init__(self, index, url, model_size, translation_model_size):
+        super().__init__(index, url)
+        self.model_size = model_size
+        self.translation_model_size = translation_model_size
+        self.started_at = None
+        self.cancelled = False
+        # Téléchargement anticipé (thread), pendant le traitement de l'épisode précédent
+        self.prefetch = None
+
+    @property
+    def elapsed(self):
+        """Secondes de traitement (jusqu'à maintenant si l'épisode est en cours)"""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def speed(self):
+        """Secondes d'audio traitées par seconde (None tant que la durée est inconnue)"""
+        audio_seconds = self.metrics.audio_seconds if self.metrics is not None else None
+        if not audio_seconds or not self.done or self.error is not None:
+            return None
+        return audio_seconds / self.elapsed if self.elapsed > 0 else None
+
+
+class JobQueue:
+    """File d'épisodes traités un par un avec process_video
+
+    Contrairement à EpisodeScheduler, chaque épisode garde tout le pipeline
+    de process_video (flux audio, transcription et traduction en parallèle,
+    sous-titres publiés au fil de l'eau) ; seul le téléchargement de l'épisode
+    suivant recouvre le traitement du courant. Les épisodes en attente peuvent
+    être déplacés ou annulés ; l'épisode en cours va jusqu'au bout. Les modèles
+    déjà chargés sont réutilisés tant que les tailles demandées ne changent pas.
+
+    on_event(job, message) est appelé à chaque changement d'état ;
+    progress_callback(job, message, valeur), stage_callback(job, étape, valeur)
+    et subtitle_callback(job, chemin, secondes) relaient ceux de process_video.
+    Tous sont appelés depuis les threads de la file.
+    """
+
+    def __init__(self, translator, on_event=None, progress_callback=None, stage_callback=None,
+                 subtitle_callback=None):
+        self.translator = translator
+        self.on_event = on_event
+        self.progress_callback = progress_callback
+        self.stage_callback = stage_callback
+        self.subtitle_callback = subtitle_callback
+        self.jobs = []
+        self.current = None
+        self._pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        # Épisode en cours de téléchargement anticipé (un seul à la fois)
+        self._prefetching = None
+
+    @property
+    def pending(self):
+        with self._condition:
+            return list(self._pending)
+
+    def submit(self, url, model_size, translation_model_size):
+        """Ajoute un épisode en fin de file"""
+        with self._condition:
+            job = QueuedJob(len(self.jobs) + 1, url, model_size, translation_model_size)
+            self.jobs.append(job)
+            self._pending.append(job)
+            self._condition.notify_all()
+        self._emit(job, "en attente")
+        self._prefetch_next()
+        return job
+
+    def move(self, job, offset):
+        """Déplace un épisode en attente de offset places (négatif : vers le début)"""
+        with self._condition:
+            if job not in self._pending:
+                return False
+            position = self._pending.index(job)
+            target = min(max(position + offset, 0), len(self._pending) - 1)
+            self._pending.insert(target, self._pending.pop(position))
+        self._prefetch_next()
+        return target != position
+
+    def cancel(self, job):
+        """Retire un épisode en attente ; retourne False pour l'épisode en cours ou terminé"""
+        with self._condition:
+            if job not in self._pending:
+                return False
+            self._pending.remove(job)
+            job.cancelled = True
+            job.finished_at = time.time()
+        if job.prefetch is None or not job.prefetch.is_alive():
+            self._cleanup(job)
+        self._emit(job, "annulé")
+        self._prefetch_next()
+        return True
+
+    def start(self):
+        """Démarre le thread de traitement"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread après l'épisode en cours ; les épisodes en attente restent"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _emit(self, job, message):
+        job.status = message
+        logging.info(f"Episode {job.index} : {message}")
+        if self.on_event:
+            self.on_event(job, message)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    break
+                job = self.current = self._pending.pop(0)
+            self._prefetch_next()
+            try:
+                self._process(job)
+            finally:
+                with self._condition:
+                    self.current = None
+
+    def _process(self, job):
+        translator = self.translator
+        job.started_at = time.time()
+        self._emit(job, "traitement")
+        if job.prefetch is not None:
+            # Attendre le téléchargement anticipé plutôt que de télécharger deux fois
+            job.prefetch.join()
+        downloaded = (job.audio, job.title) if job.audio is not None else None
+
+        def progress(message, value=None):
+            if self.progress_callback:
+                self.progress_callback(job, message, value)
+
+        def stage(name, value):
+            if self.stage_callback:
+                self.stage_callback(job, name, value)
+
+        def subtitles(path, covered):
+            if self.subtitle_callback:
+                self.subtitle_callback(job, path, covered)
+
+        job.metrics = translator.metrics.job(job.url, progress)
+        try:
+            job.srt_path = translator.process_video(
+                job.url,
+                model_size=job.model_size,
+                translation_model_size=job.translation_model_size,
+                progress_callback=progress,
+                stage_callback=stage,
+                subtitle_callback=subtitles,
+                downloaded=downloaded,
+                metrics=job.metrics
+            )
+        except Exception as e:
+            job.error = e
+            job.finished_at = time.time()
+            self._emit(job, f"échec ({e})")
+        else:
+            job.finished_at = time.time()
+            self._emit(job, "terminé")
+        finally:
+            self._cleanup(job)
+
+    def _prefetch_next(self):
+        """Télécharge d'avance le premier épisode en attente pendant le traitement du courant
+
+        Appelé à chaque changement de la file (ajout, déplacement, annulation,
+        début d'un épisode) et à la fin de chaque téléchargement anticipé : un
+        seul téléchargement à la fois. Un épisode téléchargé d'avance qui n'est
+        plus en tête de file libère son audio ; il sera retéléchargé à son tour.
+        """
+        released = []
+        with self._condition:
+            head = self._pending[0] if self.current is not None and self._pending else None
+            for job in self._pending:
+                if job is head or job.prefetch is None or job is self._prefetching:
+                    continue
+                released.append((job, job.workdir, job.audio is not None))
+                job.audio = None
+                job.workdir = None
+                job.prefetch = None
+            if head is not None and self._prefetching is None:
+                self._start_prefetch(head)
+
+        for job, workdir, downloaded in released:
+            if workdir and not ADVANCED["keep_temp_files"]:
+                shutil.rmtree(workdir, ignore_errors=True)
+            if downloaded:
+                self._emit(job, "en attente")
+
+    def _start_prefetch(self, job):
+        """Démarre le téléchargement anticipé de job (appelé avec le verrou de la file)
+
+        Inutile avec le serveur de modèles (il télécharge lui-même), évité en
+        mode économie de mémoire et quand la transcription est en cache.
+        """
+        translator = self.translator
+        if job.prefetch is not None or translator.server is not None or LOW_MEMORY_MODE["enabled"]:
+            return
+        video_id = extract_video_id(job.url)
+        source_id = f"youtube:{video_id}" if video_id else None
+        if translator.get_cached_transcription(source_id, job.model_size):
+            return
+
+        def download():
+            try:
+                self._emit(job, "téléchargement anticipé")
+                job.workdir = translator.temp_dir / f"job_{job.index:03d}_{video_id or uuid.uuid4().hex[:8]}"
+                job.audio, job.title = translator.download_video(job.url, output_dir=job.workdir)
+                # Un épisode déjà démarré attend ce téléchargement : son état ne change pas
+                if not job.cancelled and job.started_at is None:
+                    self._emit(job, "téléchargé, en attente")
+            except Exception as e:
+                # process_video retentera le téléchargement
+                logging.warning(f"Episode {job.index} : téléchargement anticipé impossible ({e})")
+                if not job.cancelled and job.started_at is None:
+                    self._emit(job, "en attente")
+            finally:
+                if job.cancelled:
+                    self._cleanup(job)
+                with self._condition:
+                    self._prefetching = None
+                self._prefetch_next()
+
+        self._prefetching = job
+        job.prefetch = threading.Thread(target=download, daemon=True)
+        job.prefetch.start()
+
+    def _cleanup(self, job):
+        """Libère l'audio et supprime le dossier de travail de l'épisode"""
+        job.audio = None
+        if job.workdir and not ADVANCED["keep_temp_files"]:
+            shutil.rmtree(job.workdir, ignore_errors=True)
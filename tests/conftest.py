@@ -0,0 +1,58 @@
+"""
+Modèles factices partagés par les tests : ni Whisper, ni NLLB, ni réseau
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ADVANCED, METRICS
+
+
+class StubWhisper:
+    """Whisper factice : un segment toutes les 2 secondes d'audio"""
+
+    def transcribe(self, audio, **options):
+        seconds = len(audio) / 16000
+        return {'segments': [
+            {'start': float(start), 'end': float(min(start + 1.5, seconds)), 'text': f' Cümle {int(start)}.'}
+            for start in np.arange(0, seconds, 2.0)
+        ]}
+
+
+class StubBackend:
+    """Moteur de traduction factice : "<langue> <texte>" pour chaque texte"""
+
+    device = "cpu"
+    quantized = False
+    generated_tokens = 0
+
+    def token_lengths(self, texts, src_lang):
+        return [len(text.split()) for text in texts]
+
+    def translate_many(self, texts, src_lang, tgt_langs, generation_kwargs):
+        return {lang: [f"{lang} {text}" for text in texts] for lang in tgt_langs}
+
+
+@pytest.fixture
+def translator(tmp_path, monkeypatch):
+    """EmanetTranslator sans serveur ni caches, avec les modèles factices, dans un dossier temporaire"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(ADVANCED, "translation_memory", False)
+    monkeypatch.setitem(ADVANCED, "transcription_cache", False)
+    monkeypatch.setitem(ADVANCED, "cache_dir", str(tmp_path / ".cache"))
+    monkeypatch.setitem(METRICS, "enabled", False)
+
+    from emanet_translator import EmanetTranslator
+
+    translator = EmanetTranslator(use_server=False)
+    translator.whisper_model = StubWhisper()
+    translator.whisper_model_size = "base"
+    translator.translation_backend = StubBackend()
+    translator.translation_model_name = "stub"
+    translator.translation_model_size = "small"
+    return translator
@@ -0,0 +1,82 @@
+"""
+Tests des outils audio (audio_utils.py)
+Lancer depuis la racine du projet : python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_utils import SpeechCompressor, SpeechTimeline, detect_speech
+
+
+def make_timeline():
+    # Deux zones de parole : 10-12 s puis 20-25 s, séparées par 0,3 s de silence inséré
+    return SpeechTimeline([(0.0, 10.0, 2.0), (2.3, 20.0, 5.0)])
+
+
+def test_segment_inside_one_region():
+    assert make_timeline().to_original_range(0.5, 1.5) == pytest.approx((10.5, 11.5))
+
+
+def test_segment_spanning_two_regions_keeps_its_end():
+    # La réplique continue après la pause : la fin est dans la seconde zone
+    assert make_timeline().to_original_range(1.0, 4.0) == pytest.approx((11.0, 21.7))
+
+
+def test_segment_ending_in_inserted_gap_is_cut_at_region_end():
+    assert make_timeline().to_original_range(1.0, 2.2) == pytest.approx((11.0, 12.0))
+
+
+def test_segment_ending_after_last_region_is_cut_at_its_end():
+    assert make_timeline().to_original_range(3.0, 9.0) == pytest.approx((20.7, 25.0))
+
+
+def speech_like(seconds, sample_rate, rng):
+    """Voyelles synthétiques : harmoniques dans la bande de la voix, syllabes de 0,2 s"""
+    t = np.arange(round(seconds * sample_rate)) / sample_rate
+    voice = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(2, 20))
+    syllables = 0.6 + 0.4 * np.sin(2 * np.pi * 5 * t)
+    return (0.3 * voice * syllables + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def make_episode(sample_rate=16000):
+    # Parole à cheval sur la limite de 30 s entre deux blocs du flux, pauses courtes et longues
+    rng = np.random.default_rng(0)
+    audio = (0.01 * rng.standard_normal(75 * sample_rate)).astype(np.float32)
+    for start, end in [(3.0, 9.0), (9.5, 12.0), (27.0, 34.5), (41.2, 41.4), (50.0, 60.1), (74.0, 75.0)]:
+        first, last = int(start * sample_rate), int(end * sample_rate)
+        audio[first:last] += speech_like((last - first) / sample_rate, sample_rate, rng)
+    return audio
+
+
+@pytest.mark.parametrize("block_seconds", [30, 7.3, 45])
+def test_stream_and_file_give_the_same_speech(block_seconds):
+    sample_rate = 16000
+    audio = make_episode(sample_rate)
+
+    whole = SpeechCompressor(sample_rate)
+    file_speech = np.concatenate([whole.push(audio), whole.finish()])
+
+    stream = SpeechCompressor(sample_rate)
+    block = int(block_seconds * sample_rate)
+    parts = [stream.push(audio[start:start + block]) for start in range(0, len(audio), block)]
+    stream_speech = np.concatenate(parts + [stream.finish()])
+
+    assert whole.regions >= 4
+    assert stream.regions == whole.regions
+    assert stream.timeline.pieces == whole.timeline.pieces
+    np.testing.assert_array_equal(stream_speech, file_speech)
+
+
+def test_speech_across_block_edge_is_one_region():
+    sample_rate = 16000
+    regions = detect_speech(make_episode(sample_rate), sample_rate)
+    # La réplique de 27 à 34,5 s n'est pas coupée à 30 s
+    assert any(start <= 27.0 * sample_rate and end >= 34.5 * sample_rate for start, end in regions)
+    # La région trop courte (0,2 s) est ignorée
+    assert not any(start <= 41.3 * sample_rate <= end for start, end in regions)
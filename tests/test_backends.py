@@ -0,0 +1,91 @@
+"""
+Parité des moteurs de traduction (translation_backends.py)
+Un modèle M2M100 minuscule aux poids aléatoires remplace NLLB : les moteurs
+ONNX et INT8 doivent traduire comme le modèle Transformers float32.
+"""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from config import ADVANCED, MODEL_STORE
+
+TEXTS = ["Merhaba dünya", "Nereye gidiyorsun bu gece?", "Evet", "Bu akşam yemeğe kalacak mısın, Emanet?"]
+GENERATION = {'max_new_tokens': 12, 'num_beams': 5, 'do_sample': False}
+
+
+class StubTokenizer:
+    """Tokenizer factice : un token par caractère, sans fichier de vocabulaire"""
+
+    src_lang = None
+    pad_token_id = 1
+
+    def __call__(self, texts, return_tensors=None, padding=False, truncation=False, max_length=None,
+                 add_special_tokens=True):
+        ids = [[5 + ord(char) % 150 for char in text][:20] + [2] * add_special_tokens for text in texts]
+        if return_tensors is None:
+            return {'input_ids': ids}
+        longest = max(len(row) for row in ids)
+        input_ids = torch.tensor([row + [self.pad_token_id] * (longest - len(row)) for row in ids])
+        return transformers.BatchEncoding({
+            'input_ids': input_ids,
+            'attention_mask': (input_ids != self.pad_token_id).long(),
+        })
+
+    def convert_tokens_to_ids(self, token):
+        return 3
+
+    def batch_decode(self, sequences, skip_special_tokens=True):
+        return [" ".join(str(token) for token in sequence.tolist() if token > 2) for sequence in sequences]
+
+    def save_pretrained(self, path):
+        # L'export ONNX enregistre le tokenizer à côté du modèle
+        return ()
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """Dossier d'un modèle M2M100 (architecture de NLLB) de quelques centaines de Ko"""
+    path = tmp_path_factory.mktemp("tiny-nllb")
+    torch.manual_seed(0)
+    config = transformers.M2M100Config(
+        vocab_size=200, d_model=64, encoder_layers=2, decoder_layers=2,
+        encoder_ffn_dim=128, decoder_ffn_dim=128, encoder_attention_heads=4, decoder_attention_heads=4,
+        max_position_embeddings=64, pad_token_id=1, eos_token_id=2, bos_token_id=0, decoder_start_token_id=2,
+    )
+    transformers.M2M100ForConditionalGeneration(config).eval().save_pretrained(path)
+    return str(path)
+
+
+@pytest.fixture
+def create_backend(tmp_path, monkeypatch):
+    monkeypatch.setitem(ADVANCED, "cache_dir", str(tmp_path / ".cache"))
+    monkeypatch.setitem(MODEL_STORE, "enabled", False)
+    monkeypatch.setattr(transformers.AutoTokenizer, "from_pretrained", lambda *args, **kwargs: StubTokenizer())
+
+    from translation_backends import create_backend
+
+    return lambda backend, model, quantized=False: create_backend(backend, model, torch.device("cpu"), quantized)
+
+
+def translate(backend):
+    return backend.translate(TEXTS, "tur_Latn", "fra_Latn", dict(GENERATION))
+
+
+def test_onnx_translates_like_transformers(create_backend, tiny_model):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("optimum.onnxruntime")
+
+    reference = translate(create_backend("transformers", tiny_model))
+    assert all(reference)
+    assert translate(create_backend("onnx", tiny_model)) == reference
+    assert translate(create_backend("onnx", tiny_model, quantized=True)) == reference
+
+
+def test_int8_translates_like_float32(create_backend, tiny_model):
+    reference = translate(create_backend("transformers", tiny_model))
+    quantized = create_backend("transformers", tiny_model, quantized=True)
+
+    assert quantized.quantized
+    assert translate(quantized) == reference
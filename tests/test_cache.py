@@ -0,0 +1,46 @@
+"""
+Tests des caches persistants (cache.py)
+"""
+
+from cache import TranscriptionCache
+from config import AUDIO, DECODING
+
+
+def test_transcription_cache_key_includes_settings(tmp_path):
+    cache = TranscriptionCache(tmp_path)
+    cache.put("youtube:abc", "base", "tr", "Bölüm 1", [{'start': 0, 'end': 1, 'text': 'Merhaba'}], {"beam": None})
+    assert cache.get("youtube:abc", "base", "tr", {"beam": None})["title"] == "Bölüm 1"
+    assert cache.get("youtube:abc", "base", "tr", {"beam": 5}) is None
+    assert cache.invalidate("youtube:abc") == 1
+
+
+def test_profile_or_vad_change_does_not_reuse_transcription(translator, monkeypatch, tmp_path):
+    translator.transcription_cache = TranscriptionCache(tmp_path / "transcriptions")
+    segments = [{'start': 0.0, 'end': 1.0, 'text': 'Merhaba'}]
+    monkeypatch.setitem(DECODING, "profile", "balanced")
+    translator.save_transcription("youtube:abc", "base", "Bölüm 1", segments)
+    assert translator.get_cached_transcription("youtube:abc", "base")["segments"] == segments
+
+    monkeypatch.setitem(DECODING, "profile", "quality")
+    assert translator.get_cached_transcription("youtube:abc", "base") is None
+
+    monkeypatch.setitem(DECODING, "profile", "balanced")
+    monkeypatch.setitem(AUDIO, "vad", dict(AUDIO["vad"], energy_margin_db=12.0))
+    assert translator.get_cached_transcription("youtube:abc", "base") is None
+
+
+def test_episode_redone_for_new_settings_is_transcribed_again(translator, monkeypatch, tmp_path):
+    from ingest import EpisodeIndex, output_settings
+
+    translator.transcription_cache = TranscriptionCache(tmp_path / "transcriptions")
+    episode = {"id": "youtube:abc", "url": "https://www.youtube.com/watch?v=abc", "title": None}
+    srt = tmp_path / "abc.srt"
+    srt.write_text("1\n", encoding="utf-8")
+    monkeypatch.setitem(DECODING, "profile", "balanced")
+    index = EpisodeIndex(tmp_path / "index.json")
+    index.record(episode, "Bölüm 1", [srt], output_settings(translator, "base"))
+    translator.save_transcription("youtube:abc", "base", "Bölüm 1", [{'start': 0.0, 'end': 1.0, 'text': 'Merhaba'}])
+
+    monkeypatch.setitem(DECODING, "profile", "quality")
+    assert index.pending([episode], output_settings(translator, "base")) == [episode]
+    assert translator.get_cached_transcription("youtube:abc", "base") is None
@@ -0,0 +1,127 @@
+"""
+Tests de l'ingestion par lot (ingest.py)
+"""
+
+import ingest
+from ingest import EpisodeIndex, enumerate_episodes
+
+CHANNEL = "https://www.youtube.com/@emanet"
+VIDEOS_TAB = "https://www.youtube.com/@emanet/videos"
+PLAYLIST = "https://www.youtube.com/playlist?list=PLsezon1"
+
+
+def video(video_id, title=None):
+    return {"_type": "url", "ie_key": "Youtube", "id": video_id,
+            "url": f"https://www.youtube.com/watch?v={video_id}", "title": title}
+
+
+def playlist(url):
+    return {"_type": "url", "ie_key": "YoutubeTab", "url": url}
+
+
+class StubExtractor:
+    """Réponses yt-dlp (extract_flat) d'une chaîne factice, sans réseau"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def __call__(self, url):
+        self.calls.append(url)
+        return {"_type": "playlist", "webpage_url": url, "entries": self.pages[url]}
+
+
+def channel_pages():
+    return {
+        CHANNEL: [playlist(VIDEOS_TAB)],
+        VIDEOS_TAB: [playlist(PLAYLIST), video("ep00000003A", "Bölüm 3")],
+        PLAYLIST: [video("ep00000001A", "Bölüm 1"), video("ep00000002A", "Bölüm 2"),
+                   None, video("ep00000003A", "Bölüm 3")],
+    }
+
+
+def test_channel_playlists_are_followed_without_duplicates():
+    extractor = StubExtractor(channel_pages())
+    episodes = enumerate_episodes([CHANNEL, "https://youtu.be/ep00000001A"], extractor=extractor)
+
+    assert [episode["id"] for episode in episodes] == [
+        "youtube:ep00000001A", "youtube:ep00000002A", "youtube:ep00000003A",
+    ]
+    assert episodes[0] == {
+        "id": "youtube:ep00000001A",
+        "url": "https://www.youtube.com/watch?v=ep00000001A",
+        "title": "Bölüm 1",
+    }
+    # L'URL de vidéo est prise telle quelle, sans requête
+    assert extractor.calls == [CHANNEL, VIDEOS_TAB, PLAYLIST]
+
+
+def test_playlists_nested_too_deep_are_skipped():
+    depth = ingest.MAX_DEPTH + 2
+    urls = [f"https://www.youtube.com/playlist?list=PL{level}" for level in range(depth + 1)]
+    pages = {url: [playlist(child), video(f"ep{level:09d}")]
+             for level, (url, child) in enumerate(zip(urls, urls[1:]))}
+    pages[urls[-1]] = [video(f"ep{depth:09d}")]
+    extractor = StubExtractor(pages)
+
+    episodes = enumerate_episodes([urls[0]], extractor=extractor)
+
+    assert extractor.calls == urls[:ingest.MAX_DEPTH + 1]
+    assert [episode["id"] for episode in episodes] == [
+        f"youtube:ep{level:09d}" for level in reversed(range(ingest.MAX_DEPTH + 1))
+    ]
+
+
+def test_url_file_skips_comments_and_blank_lines(tmp_path):
+    url_file = tmp_path / "episodes.txt"
+    url_file.write_text(
+        "# Sezon 1\n"
+        "\n"
+        "https://www.youtube.com/watch?v=ep00000001A  # pilote\n"
+        "   # https://www.youtube.com/watch?v=ep00000009A\n"
+        f"{PLAYLIST}\n",
+        encoding="utf-8",
+    )
+    extractor = StubExtractor(channel_pages())
+
+    episodes = enumerate_episodes([str(url_file)], extractor=extractor)
+
+    assert [episode["id"] for episode in episodes] == [
+        "youtube:ep00000001A", "youtube:ep00000002A", "youtube:ep00000003A",
+    ]
+    assert extractor.calls == [PLAYLIST]
+
+
+def recorded_index(tmp_path, settings):
+    episode = {"id": "youtube:ep00000001A", "url": "https://www.youtube.com/watch?v=ep00000001A", "title": None}
+    srt = tmp_path / "ep00000001A.srt"
+    srt.write_text("1\n00:00:00,000 --> 00:00:01,000\nBonjour\n", encoding="utf-8")
+    index = EpisodeIndex(tmp_path / "index.json")
+    index.record(episode, "Bölüm 1", [srt], settings)
+    return index, episode, srt
+
+
+def test_episode_with_same_settings_is_not_pending(tmp_path):
+    settings = {"transcription": {"whisper": "base"}, "translation": {"model": "small"}}
+    index, episode, _ = recorded_index(tmp_path, settings)
+    new = {"id": "youtube:ep00000002A", "url": "https://www.youtube.com/watch?v=ep00000002A", "title": None}
+
+    assert index.pending([episode, new], settings) == [new]
+    # L'index est relu depuis le disque
+    assert EpisodeIndex(tmp_path / "index.json").pending([episode], settings) == []
+
+
+def test_episode_with_changed_settings_is_pending(tmp_path):
+    settings = {"transcription": {"whisper": "base"}, "translation": {"model": "small"}}
+    index, episode, _ = recorded_index(tmp_path, settings)
+
+    changed = {"transcription": {"whisper": "small"}, "translation": {"model": "small"}}
+    assert index.pending([episode], changed) == [episode]
+
+
+def test_episode_with_missing_srt_is_pending(tmp_path):
+    settings = {"transcription": {"whisper": "base"}, "translation": {"model": "small"}}
+    index, episode, srt = recorded_index(tmp_path, settings)
+
+    srt.unlink()
+    assert index.pending([episode], settings) == [episode]
@@ -0,0 +1,73 @@
+"""
+Mode économie de mémoire (EmanetTranslator.process_low_memory)
+Les modèles factices occupent chacun MODEL_MB de mémoire : le pic de chaque
+étape doit rester sous le budget, ce qui n'est possible que si un seul
+modèle est chargé à la fois.
+"""
+
+import logging
+
+import numpy as np
+import pytest
+
+from config import AUDIO, LOW_MEMORY_MODE
+from metrics import PeakMemory
+from tests.conftest import StubBackend, StubWhisper
+
+MODEL_MB = 300
+AUDIO_SECONDS = 300
+
+
+class HeavyWhisper(StubWhisper):
+    def __init__(self):
+        self.weights = np.ones(MODEL_MB * 10**6 // 8)
+
+
+class HeavyBackend(StubBackend):
+    def __init__(self):
+        self.weights = np.ones(MODEL_MB * 10**6 // 8)
+
+
+def test_low_memory_peak_stays_under_budget(translator, monkeypatch, caplog):
+    # Importé par la transcription : chargé avant de mesurer la mémoire de départ
+    pytest.importorskip("whisper")
+
+    def load_whisper_model(model_size="base"):
+        translator.whisper_model = HeavyWhisper()
+        translator.whisper_model_size = model_size
+
+    def load_translation_model(model_size="small"):
+        translator.translation_backend = HeavyBackend()
+        translator.translation_model_size = model_size
+        return True
+
+    monkeypatch.setattr(translator, "load_whisper_model", load_whisper_model)
+    monkeypatch.setattr(translator, "load_translation_model", load_translation_model)
+    translator.whisper_model = None
+    load_translation_model("small")
+
+    def load_audio():
+        # Une seconde de voyelles synthétiques, une seconde de bruit faible, répétées
+        rng = np.random.default_rng(0)
+        t = np.arange(AUDIO["sample_rate"]) / AUDIO["sample_rate"]
+        voice = 0.3 * sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(2, 6))
+        noise = 0.01 * rng.standard_normal(2 * AUDIO["sample_rate"])
+        pattern = (np.concatenate([voice, np.zeros_like(voice)]) + noise).astype(np.float32)
+        return np.tile(pattern, AUDIO_SECONDS // 2), "Bölüm 1"
+
+    # Budget : mémoire actuelle (un modèle factice chargé), l'audio et ses copies,
+    # mais pas un second modèle
+    audio_mb = AUDIO_SECONDS * AUDIO["sample_rate"] * 4 / 1e6
+    budget = PeakMemory.current_mb() + MODEL_MB / 2 + 3 * audio_mb
+    monkeypatch.setitem(LOW_MEMORY_MODE, "memory_budget_mb", budget)
+    metrics = translator.metrics.job("Bölüm 1")
+
+    with caplog.at_level(logging.WARNING):
+        segments, title, srt_path = translator.process_low_memory("base", "small", load_audio=load_audio,
+                                                                  metrics=metrics)
+
+    assert segments and srt_path.exists()
+    peaks = {stage["stage"]: stage["peak_rss_mb"] for stage in metrics.stages}
+    assert max(peaks.values()) < budget
+    assert set(peaks) == {"load_whisper", "download", "transcription", "load_translation", "translation"}
+    assert "au-delà du budget" not in caplog.text
@@ -0,0 +1,61 @@
+"""
+Tests de la traduction des segments (emanet_translator.py, model_server.py)
+"""
+
+import queue
+import threading
+
+from emanet_translator import group_sentence_fragments
+
+
+def segment(start, end, text):
+    return {'start': start, 'end': end, 'text': text}
+
+
+def test_fragments_of_one_sentence_are_grouped():
+    segments = [segment(0.0, 1.0, "Nereye"), segment(1.2, 2.0, "gidiyorsun"), segment(2.1, 3.0, "bu gece?")]
+    assert group_sentence_fragments(segments) == [[0, 1, 2]]
+
+
+def test_segment_starting_before_previous_end_is_not_grouped():
+    # Segments de deux épisodes différents, concaténés par le serveur de modèles
+    segments = [segment(1990.0, 1995.0, "…ama"), segment(3.0, 5.0, "Nereye gidiyorsun?")]
+    assert group_sentence_fragments(segments) == [[0], [1]]
+
+
+def test_boundaries_start_a_new_group():
+    segments = [segment(0.0, 1.0, "bir"), segment(1.2, 2.0, "iki"), segment(2.1, 3.0, "üç")]
+    assert group_sentence_fragments(segments, boundaries=[2]) == [[0, 1], [2]]
+
+
+def test_server_never_groups_fragments_of_two_requests(translator):
+    from model_server import ModelServer, _Request
+
+    server = ModelServer(translator, address="unused.sock")
+    replies = []
+    first = _Request("translate", {"segments": [segment(0.0, 1.0, "Ben de")]},
+                     lambda *reply: replies.append(("first",) + reply))
+    # Commence juste après la fin de la première requête : regroupé sans les limites
+    second = _Request("translate", {"segments": [segment(1.2, 2.0, "gidiyorum.")]},
+                      lambda *reply: replies.append(("second",) + reply))
+    server.translations = queue.Queue()
+    for request in (first, second, None):
+        server.translations.put(request)
+
+    worker = threading.Thread(target=server._translation_worker)
+    worker.start()
+    worker.join(timeout=10)
+
+    results = {name: result for name, status, result in replies if status == "result"}
+    assert results["first"][0]['text'] == "fra_Latn Ben de"
+    assert results["second"][0]['text'] == "fra_Latn gidiyorum."
+
+
+def test_default_profile_keeps_original_nllb_decoding(translator, monkeypatch):
+    from config import DECODING
+
+    monkeypatch.setitem(DECODING, "profile", "balanced")
+    kwargs = translator._generation_kwargs()
+    assert kwargs['num_beams'] == 5
+    assert kwargs['max_length_ratio'] is None
+    assert 'length_penalty' not in kwargs and 'early_stopping' not in kwargs
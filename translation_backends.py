@@ -0,0 +1,318 @@
+"""
+Moteurs de traduction pour Emanet Subtitle Translator
+Un moteur charge un modèle NLLB et traduit des lots de textes ; EmanetTranslator
+choisit le moteur selon MODELS["nllb"]["backend"]
+
+Ce module importe PyTorch et Transformers : il n'est importé qu'au chargement
+du modèle de traduction.
+"""
+
+import time
+import logging
+import threading
+from pathlib import Path
+
+import torch
+import transformers
+from transformers.modeling_outputs import BaseModelOutput
+
+from config import ADVANCED, MODELS
+from model_store import nllb_source
+
+# Moteurs disponibles pour MODELS["nllb"]["backend"]
+BACKENDS = ("transformers", "onnx")
+
+
+class TranslationBackend:
+    """Interface commune des moteurs de traduction
+
+    Un moteur expose son tokenizer (tri des segments par longueur) et
+    translate(texts, src_lang, tgt_lang, generation_kwargs), qui traduit un
+    lot de textes en un seul appel (translate_many : vers plusieurs langues).
+    Un seul lot est traduit à la fois.
+    Modèle et tokenizer sont lus depuis le magasin de modèles (model_store.py)
+    dans le type dtype.
+    """
+
+    name = None
+
+    def __init__(self, model_name, dtype=torch.float32):
+        self.model_name = model_name
+        self.source = nllb_source(model_name, dtype)
+        self.tokenizer = transformers.AutoTokenizer.from_pretrained(self.source)
+        self.model = None
+        self.quantized = False
+        self.device = torch.device("cpu")
+        # Tokens générés depuis le chargement (débit mesuré par metrics.py)
+        self.generated_tokens = 0
+        self._lock = threading.Lock()
+
+    def token_lengths(self, texts, src_lang):
+        """Nombre de tokens de chaque texte (sans les tokens spéciaux)"""
+        self.tokenizer.src_lang = src_lang
+        encoded = self.tokenizer(texts, add_special_tokens=False)['input_ids']
+        return [len(ids) for ids in encoded]
+
+    def translate(self, texts, src_lang, tgt_lang, generation_kwargs):
+        """Traduit une liste de textes en un seul appel à generate"""
+        return self.translate_many(texts, src_lang, [tgt_lang], generation_kwargs)[tgt_lang]
+
+    def translate_many(self, texts, src_lang, tgt_langs, generation_kwargs):
+        """Traduit une liste de textes vers chaque langue de tgt_langs : {langue: traductions}
+
+        L'encodeur ne passe qu'une fois sur le lot ; sa sortie est réutilisée
+        par un appel à generate par langue (forced_bos_token_id de la langue).
+        Avec max_length_ratio dans generation_kwargs, max_new_tokens est réduit
+        à ratio x longueur de la plus longue source du lot + max_length_margin.
+        """
+        generation_kwargs = dict(generation_kwargs)
+        ratio = generation_kwargs.pop('max_length_ratio', None)
+        margin = generation_kwargs.pop('max_length_margin', 0)
+
+        with self._lock:
+            # Tokenizer avec le code de langue source (lot complété par padding)
+            self.tokenizer.src_lang = src_lang
+            inputs = self.tokenizer(
+                texts,
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+                max_length=MODELS["nllb"]["max_length"]
+            ).to(self.device)
+
+            if ratio:
+                limit = int(inputs['input_ids'].shape[1] * ratio) + margin
+                generation_kwargs['max_new_tokens'] = min(generation_kwargs.get('max_new_tokens', limit), limit)
+
+            results = {}
+            with torch.no_grad():
+                encoder_hidden_states = None
+                if len(tgt_langs) > 1:
+                    encoder_hidden_states = self.model.get_encoder()(**inputs).last_hidden_state
+                for tgt_lang in tgt_langs:
+                    if encoder_hidden_states is not None:
+                        # Nouvel objet à chaque langue : generate l'étend sur place pour le beam search
+                        generation_kwargs['encoder_outputs'] = BaseModelOutput(last_hidden_state=encoder_hidden_states)
+                    translated_tokens = self.model.generate(
+                        **inputs,
+                        forced_bos_token_id=self.tokenizer.convert_tokens_to_ids(tgt_lang),
+                        **generation_kwargs
+                    )
+                    self.generated_tokens += int((translated_tokens != self.tokenizer.pad_token_id).sum())
+                    results[tgt_lang] = self.tokenizer.batch_decode(translated_tokens, skip_special_tokens=True)
+
+            return results
+
+
+class TransformersBackend(TranslationBackend):
+    """Modèle PyTorch de Transformers : float16 sur GPU, float32 ou INT8 sur CPU"""
+
+    name = "transformers"
+
+    def __init__(self, model_name, device, quantized=False):
+        if quantized and device.type != "cpu":
+            logging.warning("La quantification INT8 ne concerne que le CPU : modèle chargé en float16 sur le GPU")
+            quantized = False
+        dtype = torch.float16 if device.type == "cuda" else torch.float32
+        super().__init__(model_name, dtype)
+        self.device = device
+
+        if quantized:
+            self.model = load_quantized_model(model_name, self.source)
+        else:
+            # Poids safetensors projetés en mémoire, sans copie intermédiaire
+            self.model = transformers.AutoModelForSeq2SeqLM.from_pretrained(
+                self.source,
+                torch_dtype=dtype,
+                low_cpu_mem_usage=True
+            ).to(device)
+        self.quantized = quantized
+
+
+class OnnxBackend(TranslationBackend):
+    """Encodeur et décodeur NLLB exportés en ONNX, exécutés par ONNX Runtime sur le CPU
+
+    L'export (décodeur avec cache clé/valeur) est fait une seule fois dans
+    ADVANCED["cache_dir"]/onnx. Une seule session traduit un lot à la fois
+    avec tous les cœurs (MODELS["nllb"]["onnx_threads"]).
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name, quantized=False):
+        try:
+            import onnxruntime
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError:
+            raise Exception(
+                "Le moteur ONNX nécessite ONNX Runtime et Optimum : pip install onnxruntime optimum-onnx"
+            )
+        super().__init__(model_name)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        # Parallélisme à l'intérieur des opérateurs (0 : un thread par cœur physique)
+        options.intra_op_num_threads = MODELS["nllb"]["onnx_threads"]
+        options.inter_op_num_threads = 1
+
+        export_dir = export_onnx_model(model_name, self.source)
+        if quantized:
+            export_dir = quantize_onnx_model(export_dir)
+        self.model = ORTModelForSeq2SeqLM.from_pretrained(
+            export_dir,
+            use_cache=True,
+            provider="CPUExecutionProvider",
+            session_options=options
+        )
+        self.quantized = quantized
+
+
+def create_backend(backend, model_name, device, quantized=False):
+    """Instancie le moteur de traduction demandé ("transformers" ou "onnx")"""
+    start = time.time()
+    if backend == "transformers":
+        engine = TransformersBackend(model_name, device, quantized)
+    elif backend == "onnx":
+        engine = OnnxBackend(model_name, quantized)
+    else:
+        raise Exception(f"Moteur de traduction inconnu : {backend} (choix : {', '.join(BACKENDS)})")
+    logging.info(f"Moteur de traduction '{backend}' prêt en {time.time() - start:.1f}s")
+    return engine
+
+
+def export_onnx_model(model_name, source=None):
+    """Exporte NLLB en ONNX (encodeur, décodeur avec cache clé/valeur), une seule fois
+
+    source : dossier local du modèle (magasin de modèles), sinon model_name sur le Hub.
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    export_dir = Path(ADVANCED["cache_dir"]) / "onnx" / model_name.replace('/', '--')
+    if (export_dir / "config.json").exists():
+        return export_dir
+
+    logging.info(f"Export ONNX de {model_name} (première utilisation, plusieurs minutes)...")
+    start = time.time()
+    model = ORTModelForSeq2SeqLM.from_pretrained(source or model_name, export=True, use_cache=True)
+    tmp_dir = export_dir.with_name(export_dir.name + ".tmp")
+    model.save_pretrained(tmp_dir)
+    tmp_dir.replace(export_dir)
+    logging.info(f"Modèle ONNX enregistré en {time.time() - start:.1f}s : {export_dir}")
+    return export_dir
+
+
+def quantize_onnx_model(export_dir):
+    """Version INT8 (quantification dynamique des poids) d'un export ONNX"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_dir = export_dir.with_name(export_dir.name + "-int8")
+    if (quantized_dir / "config.json").exists():
+        return quantized_dir
+
+    start = time.time()
+    tmp_dir = quantized_dir.with_name(quantized_dir.name + ".tmp")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    for path in export_dir.glob("*.onnx"):
+        quantize_dynamic(
+            path, tmp_dir / path.name,
+            weight_type=QuantType.QInt8,
+            # Les décodeurs des grands modèles dépassent la limite de 2 Go d'un fichier ONNX
+            use_external_data_format=True
+        )
+    # La configuration est copiée en dernier : sa présence marque un export complet
+    for path in export_dir.glob("*.json"):
+        (tmp_dir / path.name).write_bytes(path.read_bytes())
+    tmp_dir.replace(quantized_dir)
+    logging.info(f"Modèle ONNX quantifié en INT8 en {time.time() - start:.1f}s")
+    return quantized_dir
+
+
+def load_quantized_model(model_name, source=None):
+    """NLLB avec couches linéaires quantifiées en INT8 (quantification dynamique, CPU)
+
+    Les poids quantifiés et la configuration sont enregistrés dans
+    ADVANCED["cache_dir"] : les chargements suivants évitent le modèle
+    float32 et la conversion. source : dossier local du modèle float32.
+    """
+    cache_dir = Path(ADVANCED["cache_dir"]) / "quantized" / (
+        f"{model_name.replace('/', '--')}-int8"
+        f"-torch{torch.__version__}-transformers{transformers.__version__}"
+    )
+    weights_path = cache_dir / "weights.pt"
+
+    if weights_path.exists():
+        start = time.time()
+        try:
+            state = torch.load(weights_path, map_location="cpu", weights_only=True)
+            model = _build_quantized_model(cache_dir, state)
+            logging.info(f"Modèle INT8 chargé depuis le cache en {time.time() - start:.1f}s")
+            return model
+        except Exception as e:
+            logging.warning(f"Cache du modèle INT8 illisible ({e}) : nouvelle quantification")
+
+    start = time.time()
+    model = transformers.AutoModelForSeq2SeqLM.from_pretrained(
+        source or model_name, torch_dtype=torch.float32, low_cpu_mem_usage=True
+    )
+    model = torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+    logging.info(f"Modèle quantifié en INT8 en {time.time() - start:.1f}s")
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    model.config.save_pretrained(cache_dir)
+    tmp_path = weights_path.with_suffix(".tmp")
+    torch.save(_quantized_state_dict(model), tmp_path)
+    tmp_path.replace(weights_path)
+    logging.info(f"Modèle INT8 enregistré : {cache_dir}")
+    return model
+
+
+def _quantized_state_dict(model):
+    """Poids du modèle INT8 en tenseurs ordinaires (valeurs int8, échelle, zéro)"""
+    state = {}
+    for name, module in model.named_modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight = module.weight()
+            state[f"{name}.weight_int8"] = weight.int_repr()
+            state[f"{name}.weight_scale"] = torch.tensor(weight.q_scale())
+            state[f"{name}.weight_zero_point"] = torch.tensor(weight.q_zero_point())
+            if module.bias() is not None:
+                state[f"{name}.bias"] = module.bias()
+    # Embeddings et normalisations (restent en float32)
+    for name, parameter in model.named_parameters(remove_duplicate=False):
+        state[name] = parameter.detach()
+    return state
+
+
+def _build_quantized_model(cache_dir, state):
+    """Reconstruit le modèle INT8 depuis le cache sans allouer les poids float32"""
+    from accelerate import init_empty_weights
+    from accelerate.utils import set_module_tensor_to_device
+
+    config = transformers.AutoConfig.from_pretrained(cache_dir)
+    with init_empty_weights():
+        model = transformers.AutoModelForSeq2SeqLM.from_config(config)
+
+    for module_name, module in list(model.named_modules()):
+        for name, child in list(module.named_children()):
+            if type(child) is not torch.nn.Linear:
+                continue
+            key = f"{module_name}.{name}" if module_name else name
+            scale = float(state[f"{key}.weight_scale"])
+            zero_point = int(state[f"{key}.weight_zero_point"])
+            weight = torch.quantize_per_tensor(
+                (state[f"{key}.weight_int8"].float() - zero_point) * scale,
+                scale, zero_point, torch.qint8
+            )
+            quantized = torch.ao.nn.quantized.dynamic.Linear(
+                child.in_features, child.out_features,
+                bias_=child.bias is not None, dtype=torch.qint8
+            )
+            quantized.set_weight_bias(weight, state.get(f"{key}.bias"))
+            setattr(module, name, quantized)
+
+    # Les autres poids sont encore sur le device "meta"
+    for name, parameter in list(model.named_parameters(remove_duplicate=False)):
+        if parameter.is_meta:
+            set_module_tensor_to_device(model, name, "cpu", value=state[name])
+    return model.eval()